@@ -38,6 +38,19 @@ python manage.py migrate --noinput || {
 
 echo "Migrations completed successfully."
 
+# Worker-only container: process queued pricing batches instead of serving HTTP
+if [ "$PROCESS_TYPE" = "worker" ]; then
+    echo "Starting pricing batch worker..."
+    exec python manage.py run_pricing_worker
+fi
+
+# Pricing batches run outside the request; start an embedded worker unless a
+# separate worker service is deployed
+if [ "$PRICING_WORKER_EMBEDDED" != "false" ]; then
+    echo "Starting embedded pricing batch worker..."
+    python manage.py run_pricing_worker &
+fi
+
 # Start Gunicorn server
 echo "Starting Gunicorn server on 0.0.0.0:8000..."
 exec gunicorn core.wsgi:application \
@@ -20,6 +20,7 @@ class PricingAnalysisResultFilter(filters.FilterSet):
     created_after = filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     created_before = filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
     min_profit_margin = filters.NumberFilter(field_name='potential_profit_margin', lookup_expr='gte')
+    is_latest = filters.BooleanFilter()
 
     class Meta:
         model = PricingAnalysisResult
@@ -33,6 +34,7 @@ class PricingAnalysisResultFilter(filters.FilterSet):
             'created_after',
             'created_before',
             'min_profit_margin',
+            'is_latest',
         ]
 
 
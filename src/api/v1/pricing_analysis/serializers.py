@@ -30,6 +30,7 @@ class PricingAnalysisResultSerializer(serializers.ModelSerializer):
             'usa_keepa_data',
             'mx_keepa_data',
             'analysis_config',
+            'repriced_from',
             # Inputs
             'usa_cost',
             'usa_cost_currency',
@@ -58,9 +59,12 @@ class PricingAnalysisResultSerializer(serializers.ModelSerializer):
             'potential_profit_margin',
             'confidence_score',
             'analysis_notes',
+            'input_fingerprint',
+            'is_latest',
             # Timestamps
             'created_at',
             'updated_at',
+            'last_confirmed_at',
         ]
         read_only_fields = fields
 
@@ -80,6 +84,11 @@ class AnalyzeASINSerializer(serializers.Serializer):
         allow_null=True,
         help_text='Optional shipping cost override in MXN'
     )
+    force_refresh = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text='Ignore stored Keepa data and fetch fresh prices'
+    )
 
 
 class AnalyzeBulkSerializer(serializers.Serializer):
@@ -102,6 +111,11 @@ class AnalyzeBulkSerializer(serializers.Serializer):
         allow_null=True,
         help_text='Optional shipping cost override in MXN'
     )
+    force_refresh = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text='Ignore stored Keepa data and fetch fresh prices'
+    )
 
     def validate_asins(self, value):
         """Validate that ASINs list is not empty."""
@@ -115,6 +129,8 @@ class AnalyzeBulkSerializer(serializers.Serializer):
 class PricingAnalysisBatchSerializer(serializers.ModelSerializer):
     """Serializer for PricingAnalysisBatch."""
 
+    error_log = serializers.JSONField(source='get_error_log', read_only=True)
+
     class Meta:
         model = PricingAnalysisBatch
         fields = [
@@ -127,10 +143,12 @@ class PricingAnalysisBatchSerializer(serializers.ModelSerializer):
             'successful_analyses',
             'failed_analyses',
             'unavailable_in_usa_count',
+            'deferred_asins',
             'results',
             'error_log',
             'started_at',
             'completed_at',
+            'estimated_completion_at',
             'created_at',
             'updated_at',
         ]
@@ -163,6 +181,7 @@ class KeepaProductDataSerializer(serializers.ModelSerializer):
             'sync_successful',
             'sync_error_message',
             'last_synced_at',
+            'fetch_profile',
             'created_at',
             'updated_at',
         ]
@@ -13,8 +13,11 @@ from apps.pricing_analysis.models import (
     ExchangeRate,
 )
 from apps.pricing_analysis.services import PricingAnalysisService, KeepaService
+from apps.pricing_analysis.services.job_queue import enqueue_batch, submit_batch
+from apps.pricing_analysis.services.keepa_resilience import get_keepa_health
 from apps.pricing_analysis.services.exceptions import (
     KeepaAPIError,
+    KeepaUnavailableError,
     TokenLimitExceededError,
     ExchangeRateNotFoundError,
     AnalysisConfigNotFoundError,
@@ -37,6 +40,18 @@ from .filters import (
 )
 
 
+def _token_limit_response(error: TokenLimitExceededError) -> Response:
+    """429 response for a request Keepa tokens cannot cover right now."""
+    headers = {}
+    if error.retry_after is not None:
+        headers['Retry-After'] = str(error.retry_after)
+    return Response(
+        {'error': str(error)},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers=headers,
+    )
+
+
 class PricingAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Pricing Analysis Results.
@@ -69,7 +84,8 @@ class PricingAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
         POST /api/v1/pricing-analysis/analyze-asin/
         {
             "asin": "B07XYZ1234",
-            "shipping_cost_mxn": 85  // Optional
+            "shipping_cost_mxn": 85,  // Optional
+            "force_refresh": false  // Optional
         }
         """
         serializer = AnalyzeASINSerializer(data=request.data)
@@ -77,26 +93,30 @@ class PricingAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
 
         asin = serializer.validated_data['asin']
         shipping_cost_mxn = serializer.validated_data.get('shipping_cost_mxn')
+        force_refresh = serializer.validated_data.get('force_refresh', False)
 
         try:
             service = PricingAnalysisService()
             result = service.analyze_single_asin(
                 asin=asin,
-                shipping_cost_mxn=shipping_cost_mxn
+                shipping_cost_mxn=shipping_cost_mxn,
+                force_refresh=force_refresh
             )
 
             result_serializer = PricingAnalysisResultSerializer(result)
             return Response(result_serializer.data, status=status.HTTP_200_OK)
 
         except TokenLimitExceededError as e:
+            return _token_limit_response(e)
+        except (ExchangeRateNotFoundError, AnalysisConfigNotFoundError) as e:
             return Response(
                 {'error': str(e)},
-                status=status.HTTP_429_TOO_MANY_REQUESTS
+                status=status.HTTP_400_BAD_REQUEST
             )
-        except (ExchangeRateNotFoundError, AnalysisConfigNotFoundError) as e:
+        except KeepaUnavailableError as e:
             return Response(
                 {'error': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
         except KeepaAPIError as e:
             return Response(
@@ -112,14 +132,18 @@ class PricingAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['post'])
     def analyze_bulk(self, request):
         """
-        Analyze multiple ASINs in a batch.
+        Queue multiple ASINs for analysis in a batch.
 
         POST /api/v1/pricing-analysis/analyze-bulk/
         {
             "asins": ["B07XYZ1234", "B08ABC5678"],
             "batch_name": "Weekly Review",
-            "shipping_cost_mxn": 85  // Optional
+            "shipping_cost_mxn": 85,  // Optional
+            "force_refresh": false  // Optional
         }
+
+        Returns 202 with the PENDING batch; a worker processes it and its
+        progress is read from GET /api/v1/pricing-analysis-batches/{id}/.
         """
         serializer = AnalyzeBulkSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -127,17 +151,18 @@ class PricingAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
         asins = serializer.validated_data['asins']
         batch_name = serializer.validated_data['batch_name']
         shipping_cost_mxn = serializer.validated_data.get('shipping_cost_mxn')
+        force_refresh = serializer.validated_data.get('force_refresh', False)
 
         try:
-            service = PricingAnalysisService()
-            batch = service.analyze_multiple_asins(
+            batch = submit_batch(
                 asins=asins,
                 batch_name=batch_name,
-                shipping_cost_mxn=shipping_cost_mxn
+                shipping_cost_mxn=shipping_cost_mxn,
+                force_refresh=force_refresh
             )
 
             batch_serializer = PricingAnalysisBatchSerializer(batch)
-            return Response(batch_serializer.data, status=status.HTTP_200_OK)
+            return Response(batch_serializer.data, status=status.HTTP_202_ACCEPTED)
 
         except (ExchangeRateNotFoundError, AnalysisConfigNotFoundError) as e:
             return Response(
@@ -153,13 +178,13 @@ class PricingAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def feasible(self, request):
         """
-        Get all feasible products.
+        Get all feasible products (latest result of each ASIN).
 
         GET /api/v1/pricing-analysis/feasible/?min_margin=0.15
         """
         min_margin = request.query_params.get('min_margin')
 
-        queryset = self.get_queryset().filter(is_feasible=True)
+        queryset = self.get_queryset().filter(is_latest=True, is_feasible=True)
 
         if min_margin:
             try:
@@ -193,12 +218,15 @@ class PricingAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
             service = PricingAnalysisService()
             result = service.analyze_single_asin(
                 asin=analysis.asin,
-                shipping_cost_mxn=analysis.shipping_cost_used.amount if analysis.shipping_cost_used else None
+                shipping_cost_mxn=analysis.shipping_cost_used.amount if analysis.shipping_cost_used else None,
+                force_refresh=True
             )
 
             result_serializer = PricingAnalysisResultSerializer(result)
             return Response(result_serializer.data, status=status.HTTP_200_OK)
 
+        except TokenLimitExceededError as e:
+            return _token_limit_response(e)
         except Exception as e:
             return Response(
                 {'error': f'Refresh failed: {str(e)}'},
@@ -215,6 +243,27 @@ class PricingAnalysisBatchViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['created_at', 'started_at', 'completed_at']
     ordering = ['-created_at']
 
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """
+        Queue an interrupted batch again.
+
+        POST /api/v1/pricing-analysis-batches/{id}/resume/
+
+        Analyzed ASINs are kept; pending, deferred and retryable failed ASINs
+        are analyzed by a worker. Returns 202 with the batch.
+        """
+        batch = self.get_object()
+        try:
+            enqueue_batch(batch)
+        except AnalysisConfigNotFoundError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        batch.refresh_from_db()
+        return Response(PricingAnalysisBatchSerializer(batch).data, status=status.HTTP_202_ACCEPTED)
+
 
 class KeepaProductDataViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for Keepa Product Data."""
@@ -244,15 +293,17 @@ class KeepaProductDataViewSet(viewsets.ReadOnlyModelViewSet):
 
         try:
             service = KeepaService()
-            keepa_data = service.fetch_product_data(asin, marketplace)
+            keepa_data = service.fetch_product_data(asin, marketplace, force_refresh=True)
 
             data_serializer = KeepaProductDataSerializer(keepa_data)
             return Response(data_serializer.data, status=status.HTTP_200_OK)
 
         except TokenLimitExceededError as e:
+            return _token_limit_response(e)
+        except KeepaUnavailableError as e:
             return Response(
                 {'error': str(e)},
-                status=status.HTTP_429_TOO_MANY_REQUESTS
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
         except KeepaAPIError as e:
             return Response(
@@ -265,6 +316,15 @@ class KeepaProductDataViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'])
+    def health(self, request):
+        """
+        Keepa call health: circuit breaker state and retry/failure counters.
+
+        GET /api/v1/keepa-data/health/
+        """
+        return Response(get_keepa_health(), status=status.HTTP_200_OK)
+
 
 class BreakEvenConfigViewSet(viewsets.ModelViewSet):
     """ViewSet for Break Even Analysis Config."""
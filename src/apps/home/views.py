@@ -27,8 +27,9 @@ class HomeView(LoginRequiredMixin, TemplateView):
             'recent_analyses': PricingAnalysisResult.objects.filter(
                 created_at__gte=last_7_days
             ).count(),
+            # Current result of each ASIN, not every historical run
             'feasible_products': PricingAnalysisResult.objects.filter(
-                is_feasible=True, is_available_usa=True
+                is_latest=True, is_feasible=True, is_available_usa=True
             ).count(),
             'total_brands': BrandRestriction.objects.count(),
             'allowed_brands': BrandRestriction.objects.filter(is_allowed=True).count(),
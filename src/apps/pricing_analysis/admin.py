@@ -11,6 +11,7 @@ from .models import (
     BreakEvenAnalysisConfig,
     PricingAnalysisResult,
     PricingAnalysisBatch,
+    PricingAnalysisJob,
     KeepaAPILog,
 )
 
@@ -112,6 +113,7 @@ class KeepaProductDataAdmin(BaseAdmin):
         'marketplace',
         'is_available',
         'sync_successful',
+        'fetch_profile',
         'last_synced_at',
     ]
     search_fields = ['asin', 'title', 'brand']
@@ -120,6 +122,7 @@ class KeepaProductDataAdmin(BaseAdmin):
         'created_at',
         'updated_at',
         'raw_data',
+        'fetch_profile',
     ]
     raw_id_fields = ['product']
 
@@ -150,6 +153,7 @@ class KeepaProductDataAdmin(BaseAdmin):
                 'sync_successful',
                 'sync_error_message',
                 'last_synced_at',
+                'fetch_profile',
             )
         }),
         ('Raw Data', {
@@ -262,6 +266,7 @@ class PricingAnalysisResultAdmin(BaseAdmin):
         'confidence_score',
     ]
     list_filter = [
+        'is_latest',
         'is_feasible',
         'is_available_usa',
         'confidence_score',
@@ -270,6 +275,9 @@ class PricingAnalysisResultAdmin(BaseAdmin):
     ]
     search_fields = ['asin', 'product__sku', 'product__title']
     readonly_fields = [
+        'is_latest',
+        'input_fingerprint',
+        'last_confirmed_at',
         'created_at',
         'updated_at',
     ]
@@ -278,6 +286,7 @@ class PricingAnalysisResultAdmin(BaseAdmin):
         'usa_keepa_data',
         'mx_keepa_data',
         'analysis_config',
+        'repriced_from',
     ]
 
     fieldsets = (
@@ -285,7 +294,7 @@ class PricingAnalysisResultAdmin(BaseAdmin):
             'fields': ('product', 'asin')
         }),
         ('Keepa Data', {
-            'fields': ('usa_keepa_data', 'mx_keepa_data', 'analysis_config')
+            'fields': ('usa_keepa_data', 'mx_keepa_data', 'analysis_config', 'repriced_from')
         }),
         ('Input Data', {
             'fields': (
@@ -313,10 +322,11 @@ class PricingAnalysisResultAdmin(BaseAdmin):
                 'potential_profit_margin',
                 'confidence_score',
                 'analysis_notes',
+                'is_latest',
             )
         }),
         ('Timestamps', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('created_at', 'updated_at', 'last_confirmed_at', 'input_fingerprint'),
             'classes': ('collapse',)
         }),
     )
@@ -370,8 +380,8 @@ class PricingAnalysisBatchForm(forms.ModelForm):
     execute_now = forms.BooleanField(
         required=False,
         initial=False,
-        label='✓ Ejecutar análisis inmediatamente al guardar',
-        help_text='Si se marca, el análisis comenzará automáticamente'
+        label='✓ Encolar análisis al guardar',
+        help_text='Si se marca, un worker procesará el batch en segundo plano'
     )
 
     class Meta:
@@ -458,19 +468,21 @@ class PricingAnalysisBatchAdmin(BaseAdmin):
 
     def get_readonly_fields(self, request, obj=None):
         """Make fields readonly based on batch status."""
-        base_readonly = ['created_at', 'updated_at', 'error_log']
+        base_readonly = ['created_at', 'updated_at', 'error_log_display', 'deferred_asins']
 
         if obj and obj.status != 'PENDING':
             # Batch already processed, everything readonly except name
             return base_readonly + [
                 'status', 'total_asins', 'processed_asins',
                 'successful_analyses', 'failed_analyses',
-                'unavailable_in_usa_count', 'started_at', 'completed_at'
+                'unavailable_in_usa_count', 'started_at', 'completed_at',
+                'estimated_completion_at'
             ]
         return base_readonly + [
             'status', 'total_asins', 'processed_asins',
             'successful_analyses', 'failed_analyses',
-            'unavailable_in_usa_count', 'started_at', 'completed_at'
+            'unavailable_in_usa_count', 'started_at', 'completed_at',
+            'estimated_completion_at'
         ]
 
     fieldsets = (
@@ -496,11 +508,11 @@ class PricingAnalysisBatchAdmin(BaseAdmin):
             'classes': ('collapse',)
         }),
         ('Tiempos', {
-            'fields': ('started_at', 'completed_at'),
+            'fields': ('started_at', 'estimated_completion_at', 'completed_at'),
             'classes': ('collapse',)
         }),
         ('Log de Errores', {
-            'fields': ('error_log',),
+            'fields': ('error_log_display', 'deferred_asins'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -510,7 +522,12 @@ class PricingAnalysisBatchAdmin(BaseAdmin):
     )
 
     filter_horizontal = ['results']
-    actions = ['execute_batch_analysis']
+    actions = ['execute_batch_analysis', 'resume_batch_analysis']
+
+    @admin.display(description='Error log')
+    def error_log_display(self, obj):
+        """Display batch-level and per-ASIN errors."""
+        return obj.get_error_log() if obj.pk else {}
 
     def save_model(self, request, obj, form, change):
         """Handle execute_now checkbox."""
@@ -522,7 +539,7 @@ class PricingAnalysisBatchAdmin(BaseAdmin):
             self._execute_analysis(request, obj, shipping_cost)
 
     def execute_batch_analysis(self, request, queryset):
-        """Admin action to execute batch analysis for PENDING batches."""
+        """Admin action to queue the selected PENDING batches."""
         # Filtrar solo batches PENDING
         pending_batches = queryset.filter(status='PENDING')
 
@@ -534,55 +551,42 @@ class PricingAnalysisBatchAdmin(BaseAdmin):
             )
             return
 
-        if pending_batches.count() > 1:
+        for batch in pending_batches:
+            self._execute_analysis(request, batch)
+
+    execute_batch_analysis.short_description = '▶️ Encolar análisis de los batches seleccionados'
+
+    def resume_batch_analysis(self, request, queryset):
+        """Admin action to queue interrupted batches again from their checkpoints."""
+        started_batches = queryset.exclude(status='PENDING')
+
+        if started_batches.count() == 0:
             self.message_user(
                 request,
-                '❌ Por favor seleccione solo un batch a la vez para evitar exceder límites de API.',
-                level='error'
+                '⚠️ Seleccione batches ya iniciados (los PENDING se ejecutan con la otra acción).',
+                level='warning'
             )
             return
 
-        batch = pending_batches.first()
-        self._execute_analysis(request, batch)
+        for batch in started_batches:
+            self._execute_analysis(request, batch)
 
-    execute_batch_analysis.short_description = '▶️ Ejecutar análisis de batch seleccionado'
+    resume_batch_analysis.short_description = '🔁 Reanudar batches seleccionados (solo ASINs pendientes)'
 
     def _execute_analysis(self, request, batch, shipping_cost_mxn=None):
-        """Internal method to execute batch analysis."""
-        from apps.pricing_analysis.services.analysis_service import PricingAnalysisService
-        from apps.pricing_analysis.services.exceptions import (
-            ExchangeRateNotFoundError,
-            AnalysisConfigNotFoundError,
-            TokenLimitExceededError,
-        )
+        """Queue a batch for the pricing workers (manage.py run_pricing_worker)."""
+        from apps.pricing_analysis.services.exceptions import AnalysisConfigNotFoundError
+        from apps.pricing_analysis.services.job_queue import enqueue_batch
 
         try:
-            service = PricingAnalysisService()
-            service.analyze_multiple_asins(
-                asins=batch.asins,
-                batch_name=batch.name,
-                shipping_cost_mxn=shipping_cost_mxn
-            )
-
-            # Refresh para obtener los resultados actualizados
-            batch.refresh_from_db()
-
+            enqueue_batch(batch, shipping_cost_mxn=shipping_cost_mxn)
             self.message_user(
                 request,
-                f'✅ Análisis completado exitosamente!\n'
-                f'  • {batch.successful_analyses} análisis exitosos\n'
-                f'  • {batch.failed_analyses} fallidos\n'
-                f'  • {batch.unavailable_in_usa_count} no disponibles en USA',
+                f'✅ Batch "{batch.name}" encolado: {len(batch.asins)} ASINs se analizarán en segundo plano. '
+                'Revise el progreso en esta página.',
                 level='success'
             )
 
-        except ExchangeRateNotFoundError:
-            self.message_user(
-                request,
-                '❌ Error: No hay tipo de cambio USD→MXN configurado. '
-                'Por favor configure uno en Pricing Analysis → Exchange Rates.',
-                level='error'
-            )
         except AnalysisConfigNotFoundError:
             self.message_user(
                 request,
@@ -590,13 +594,6 @@ class PricingAnalysisBatchAdmin(BaseAdmin):
                 'Por favor configure una en Pricing Analysis → Break Even Analysis Configs.',
                 level='error'
             )
-        except TokenLimitExceededError as e:
-            self.message_user(
-                request,
-                f'❌ Límite de tokens Keepa excedido: {str(e)}\n'
-                'Espere hasta mañana o ajuste el límite en Keepa Configuration.',
-                level='error'
-            )
         except Exception as e:
             self.message_user(
                 request,
@@ -639,6 +636,39 @@ class PricingAnalysisBatchAdmin(BaseAdmin):
         return '0/0'
 
 
+@admin.register(PricingAnalysisJob)
+class PricingAnalysisJobAdmin(BaseAdmin):
+    list_display = [
+        'id',
+        'batch',
+        'status',
+        'attempts',
+        'worker',
+        'heartbeat_at',
+        'finished_at',
+    ]
+    list_filter = ['status', 'created_at']
+    search_fields = ['batch__name', 'worker', 'error']
+    readonly_fields = [
+        'batch',
+        'status',
+        'shipping_cost_mxn',
+        'force_refresh',
+        'attempts',
+        'worker',
+        'claimed_at',
+        'heartbeat_at',
+        'finished_at',
+        'error',
+        'created_at',
+        'updated_at',
+    ]
+
+    def has_add_permission(self, request):
+        """Jobs are created by enqueuing a batch."""
+        return False
+
+
 @admin.register(KeepaAPILog)
 class KeepaAPILogAdmin(BaseAdmin):
     list_display = [
@@ -8,4 +8,4 @@ class PricingAnalysisConfig(AppConfig):
 
     def ready(self):
         """Import signals when app is ready."""
-        pass
+        from apps.pricing_analysis import signals  # noqa: F401
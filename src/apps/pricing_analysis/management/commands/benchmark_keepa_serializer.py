@@ -0,0 +1,160 @@
+"""
+Benchmark the Keepa raw_data serializer.
+
+Compares the single-pass to_json_compatible against the previous two-pass
+implementation (recursive conversion + json.dumps/json.loads round trip) on
+products built from tests/fixtures/keepa_responses.json, expanded into parsed
+histories like keepa.Keepa.query returns them.
+
+Usage:
+    python manage.py benchmark_keepa_serializer --points 2000 --repeat 5
+"""
+
+import copy
+import json
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from keepa.interface import csv_indices, parse_csv
+
+from apps.pricing_analysis.services.serialization import to_json_compatible
+
+FIXTURES_PATH = Path(__file__).resolve().parents[2] / 'tests' / 'fixtures' / 'keepa_responses.json'
+# Keepa minutes for 2024-01-01, spaced one hour apart
+HISTORY_START_MINUTES = 6_362_000
+HISTORY_STEP_MINUTES = 60
+# csv indexes holding NEW_FBM_SHIPPING and BUY_BOX_SHIPPING
+SHIPPING_CSV_INDEXES = (7, 18)
+
+
+def legacy_convert(obj):
+    """Previous KeepaService._convert_to_json_serializable, kept for comparison."""
+    def first_pass(value):
+        if isinstance(value, np.ndarray):
+            return first_pass(value.tolist())
+        elif isinstance(value, (np.integer, np.floating)):
+            if isinstance(value, np.floating) and (np.isnan(value) or np.isinf(value)):
+                return None
+            return value.item()
+        elif isinstance(value, float):
+            return None if math.isnan(value) or math.isinf(value) else value
+        elif isinstance(value, (bytes, bytearray)):
+            try:
+                return value.decode('utf-8', errors='ignore')
+            except Exception:
+                return str(value)
+        elif value.__class__.__name__ == 'DataFrame' and value.__class__.__module__.startswith('pandas'):
+            try:
+                return first_pass(value.to_dict(orient='list'))
+            except Exception:
+                return {}
+        elif value.__class__.__name__ == 'Series' and value.__class__.__module__.startswith('pandas'):
+            try:
+                return first_pass(value.to_list())
+            except Exception:
+                return []
+        elif isinstance(value, dict):
+            return {k: first_pass(v) for k, v in value.items()}
+        elif isinstance(value, (list, tuple)):
+            return [first_pass(item) for item in value]
+        else:
+            return value
+
+    converted = first_pass(obj)
+
+    images_csv = ''
+    if isinstance(obj, dict) and isinstance(obj.get('imagesCSV'), str):
+        images_csv = obj.get('imagesCSV', '')
+
+    try:
+        json_str = json.dumps(converted, cls=DjangoJSONEncoder, allow_nan=False)
+        return json.loads(json_str)
+    except (TypeError, ValueError):
+        return {'imagesCSV': images_csv} if images_csv else {}
+
+
+def build_products(points, seed=0):
+    """
+    Expand the fixture products into parsed Keepa products.
+
+    Every non-null csv value becomes a history of `points` entries around
+    that value (with some out-of-stock gaps) and is parsed with keepa's own
+    parse_csv, producing the numpy arrays, datetimes and DataFrames stored
+    in raw_data.
+    """
+    rng = np.random.default_rng(seed)
+    fixtures = json.loads(FIXTURES_PATH.read_text())
+    products = []
+    for fixture in fixtures.values():
+        product = copy.deepcopy(fixture)
+        csv = []
+        for value in fixture['csv']:
+            if value is None:
+                csv.append(None)
+                continue
+            minutes = HISTORY_START_MINUTES + HISTORY_STEP_MINUTES * np.arange(points)
+            base = max(value, 100)
+            prices = (base * (1 + rng.normal(0, 0.05, points))).astype(int)
+            prices[rng.random(points) < 0.05] = -1
+            # Keepa's *_SHIPPING histories are [time, price, shipping] triples
+            width = 3 if len(csv) in SHIPPING_CSV_INDEXES else 2
+            history = np.zeros(points * width, dtype=int)
+            history[0::width] = minutes
+            history[1::width] = prices
+            csv.append(history.tolist())
+        # Keepa returns every csv index, padded with nulls
+        csv.extend([None] * (len(csv_indices) - len(csv)))
+        product['csv'] = csv
+        product['data'] = parse_csv(csv)
+        products.append(product)
+    return products
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the single-pass Keepa serializer against the previous implementation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--points',
+            type=int,
+            default=2000,
+            help='History points per price array (default: 2000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per implementation (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        products = build_products(options['points'])
+
+        # Both implementations must produce the same stored value
+        for product in products:
+            if legacy_convert(product) != to_json_compatible(product):
+                self.stderr.write(self.style.ERROR(f'Output mismatch for {product["asin"]}'))
+                return
+
+        legacy_time = self._best_time(legacy_convert, products, options['repeat'])
+        single_pass_time = self._best_time(to_json_compatible, products, options['repeat'])
+
+        self.stdout.write(f'Products: {len(products)}, points per history: {options["points"]}')
+        self.stdout.write(f'Legacy (two-pass):  {legacy_time * 1000:.1f} ms')
+        self.stdout.write(f'Single-pass:        {single_pass_time * 1000:.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {legacy_time / single_pass_time:.1f}x'))
+
+    @staticmethod
+    def _best_time(func, products, repeat):
+        """Best wall-clock time of converting every product."""
+        timings = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            for product in products:
+                func(product)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,118 @@
+"""
+Reprice stored pricing analyses.
+
+Recomputes the latest priced result of every ASIN under a candidate config
+and/or USD to MXN rate from the stored inputs, without calling Keepa. By
+default only previews the impact; --apply stores the repriced results as new
+PricingAnalysisResult rows (linked through repriced_from).
+
+Usage:
+    python manage.py reprice_results --exchange-rate 18.5
+    python manage.py reprice_results --config 3 --csv /tmp/repricing.csv
+    python manage.py reprice_results --config 3 --asin B000000001 --apply
+"""
+
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.pricing_analysis.models import BreakEvenAnalysisConfig
+from apps.pricing_analysis.services.exceptions import AnalysisConfigNotFoundError
+from apps.pricing_analysis.services.repricing_service import RepricingService
+
+CSV_FIELDS = [
+    'result_id',
+    'asin',
+    'old_break_even_price',
+    'new_break_even_price',
+    'old_recommended_price',
+    'new_recommended_price',
+    'old_profit_margin',
+    'new_profit_margin',
+    'was_feasible',
+    'is_feasible',
+]
+
+
+class Command(BaseCommand):
+    help = 'Reprice stored analyses under a candidate config or exchange rate (no Keepa calls)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--config',
+            type=int,
+            help='Id of the BreakEvenAnalysisConfig to reprice with (default: the config of each result)',
+        )
+        parser.add_argument(
+            '--exchange-rate',
+            help='USD to MXN rate to reprice with (default: the rate of each result)',
+        )
+        parser.add_argument(
+            '--asin',
+            action='append',
+            dest='asins',
+            help='Only reprice this ASIN (repeatable; default: every ASIN)',
+        )
+        parser.add_argument(
+            '--csv',
+            help='Write the preview to this CSV file',
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Store the repriced results as new analyses',
+        )
+
+    def handle(self, *args, **options):
+        config = None
+        if options['config'] is not None:
+            try:
+                config = BreakEvenAnalysisConfig.objects.get(pk=options['config'])
+            except BreakEvenAnalysisConfig.DoesNotExist:
+                raise CommandError(f'Config {options["config"]} does not exist')
+        exchange_rate = None
+        if options['exchange_rate'] is not None:
+            try:
+                exchange_rate = Decimal(options['exchange_rate'])
+            except InvalidOperation:
+                raise CommandError(f'Invalid exchange rate: {options["exchange_rate"]}')
+            if exchange_rate <= 0:
+                raise CommandError('The exchange rate must be positive')
+
+        service = RepricingService(config=config, exchange_rate=exchange_rate)
+        results = service.latest_results(options['asins'])
+
+        try:
+            if options['apply']:
+                created = service.persist(results)
+                self.stdout.write(self.style.SUCCESS(f'Repriced results stored: {created}'))
+                return
+            self._preview(service, results, options['csv'])
+        except AnalysisConfigNotFoundError as e:
+            raise CommandError(str(e))
+
+    def _preview(self, service, results, csv_path):
+        """Print the impact of the repricing and optionally write every row to CSV."""
+        total = became_feasible = became_unfeasible = feasible = 0
+        csv_file = open(csv_path, 'w', newline='') if csv_path else None
+        try:
+            writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS) if csv_file else None
+            if writer:
+                writer.writeheader()
+            for row in service.preview(results):
+                total += 1
+                feasible += row['is_feasible']
+                became_feasible += row['is_feasible'] and not row['was_feasible']
+                became_unfeasible += row['was_feasible'] and not row['is_feasible']
+                if writer:
+                    writer.writerow(row)
+        finally:
+            if csv_file:
+                csv_file.close()
+
+        self.stdout.write(f'Results repriced: {total}')
+        self.stdout.write(f'Feasible: {feasible}')
+        self.stdout.write(f'Became feasible: {became_feasible}')
+        self.stdout.write(f'No longer feasible: {became_unfeasible}')
+        self.stdout.write(self.style.WARNING('Preview only: use --apply to store the repriced results'))
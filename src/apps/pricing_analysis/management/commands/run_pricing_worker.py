@@ -0,0 +1,72 @@
+"""
+Run a pricing batch worker.
+
+Claims queued PricingAnalysisJob rows (SELECT ... FOR UPDATE SKIP LOCKED)
+and processes their batches. Several workers can run at the same time, on
+one or many machines; the database is the only coordination point.
+
+Usage:
+    python manage.py run_pricing_worker
+    python manage.py run_pricing_worker --burst   # exit once the queue is empty
+"""
+
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.pricing_analysis.services.job_queue import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued pricing analysis batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting for new jobs',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Seconds between queue polls when idle (default: PRICING_JOB_POLL_SECONDS)',
+        )
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        poll_interval = options['poll_interval'] or settings.PRICING_JOB_POLL_SECONDS
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write(f'Pricing worker {worker} started')
+        while not self._stopping:
+            close_old_connections()
+            requeue_stale_jobs()
+            job = claim_next_job(worker)
+            if job is None:
+                if options['burst']:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f'Job {job.pk}: batch {job.batch_id} ({len(job.batch.asins)} ASINs)')
+            finished = run_job(job)
+            if finished is None:
+                self.stdout.write(self.style.WARNING(f'Job {job.pk} taken over by another worker'))
+            elif finished.status == finished.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f'Job {job.pk} done'))
+            else:
+                self.stderr.write(self.style.ERROR(f'Job {job.pk} failed: {finished.error}'))
+
+        self.stdout.write(f'Pricing worker {worker} stopped')
+
+    def _stop(self, signum, frame):
+        """Finish the current job, then exit."""
+        self._stopping = True
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0005_brandrestriction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricinganalysisbatch',
+            name='estimated_completion_at',
+            field=models.DateTimeField(blank=True, help_text='Fecha estimada de finalización según los tokens de Keepa', null=True),
+        ),
+    ]
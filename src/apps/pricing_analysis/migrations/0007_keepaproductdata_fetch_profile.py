@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0006_pricinganalysisbatch_estimated_completion_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='keepaproductdata',
+            name='fetch_profile',
+            field=models.CharField(choices=[('full', 'Full'), ('lean', 'Lean')], default='full', help_text='Perfil de consulta: full incluye historial de precios, lean solo precios actuales', max_length=10),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0007_keepaproductdata_fetch_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeepaFetchLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('asin', models.CharField(help_text='ASIN del producto', max_length=20)),
+                ('marketplace', models.CharField(choices=[('US', 'Amazon USA'), ('MX', 'Amazon MX')], help_text='Marketplace de Amazon', max_length=2)),
+                ('owner', models.CharField(help_text='Identificador del worker que consulta Keepa', max_length=32)),
+                ('expires_at', models.DateTimeField(help_text='Después de esta fecha otro worker puede tomar el lease')),
+            ],
+            options={
+                'verbose_name': 'Keepa Fetch Lease',
+                'verbose_name_plural': 'Keepa Fetch Leases',
+                'constraints': [models.UniqueConstraint(fields=('asin', 'marketplace'), name='unique_keepa_fetch_lease')],
+            },
+        ),
+    ]
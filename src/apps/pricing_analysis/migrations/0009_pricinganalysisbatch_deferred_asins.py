@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0008_keepafetchlease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricinganalysisbatch',
+            name='deferred_asins',
+            field=models.JSONField(blank=True, default=list, help_text='ASINs pospuestos porque Keepa no estaba disponible'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-17 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0009_pricinganalysisbatch_deferred_asins'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingAnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], db_index=True, default='QUEUED', help_text='Estado del trabajo', max_length=20)),
+                ('shipping_cost_mxn', models.DecimalField(blank=True, decimal_places=2, help_text='Costo de envío a usar en lugar del de la configuración', max_digits=10, null=True)),
+                ('force_refresh', models.BooleanField(default=False, help_text='Consultar Keepa aunque haya datos recientes')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Veces que un worker tomó el trabajo')),
+                ('worker', models.CharField(blank=True, help_text='Worker que procesa el trabajo', max_length=100)),
+                ('claimed_at', models.DateTimeField(blank=True, help_text='Fecha en que un worker tomó el trabajo', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, help_text='Fecha de finalización del trabajo', null=True)),
+                ('error', models.TextField(blank=True, help_text='Error del último intento')),
+                ('batch', models.ForeignKey(help_text='Batch a procesar', on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='pricing_analysis.pricinganalysisbatch')),
+            ],
+            options={
+                'verbose_name': 'Pricing Analysis Job',
+                'verbose_name_plural': 'Pricing Analysis Jobs',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
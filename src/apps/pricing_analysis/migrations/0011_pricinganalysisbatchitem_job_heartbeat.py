@@ -0,0 +1,40 @@
+# Generated by Django 5.0.6 on 2026-10-17 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0010_pricinganalysisjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricinganalysisjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Última señal de vida del worker; sin señal reciente el trabajo se reasigna', null=True),
+        ),
+        migrations.CreateModel(
+            name='PricingAnalysisBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('position', models.PositiveIntegerField(help_text='Posición del ASIN en la lista del batch')),
+                ('asin', models.CharField(help_text='ASIN a analizar', max_length=20)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('DONE', 'Done'), ('FAILED', 'Failed'), ('DEFERRED', 'Deferred')], default='PENDING', help_text='Estado del análisis de este ASIN', max_length=20)),
+                ('retryable', models.BooleanField(default=False, help_text='El fallo fue de Keepa y se reintenta al reanudar el batch')),
+                ('error', models.TextField(blank=True, help_text='Error del último intento')),
+                ('batch', models.ForeignKey(help_text='Batch al que pertenece el ASIN', on_delete=django.db.models.deletion.CASCADE, related_name='items', to='pricing_analysis.pricinganalysisbatch')),
+                ('result', models.ForeignKey(blank=True, help_text='Resultado del análisis', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pricing_analysis.pricinganalysisresult')),
+            ],
+            options={
+                'verbose_name': 'Pricing Analysis Batch Item',
+                'verbose_name_plural': 'Pricing Analysis Batch Items',
+                'ordering': ['batch', 'position'],
+                'constraints': [models.UniqueConstraint(fields=('batch', 'position'), name='unique_pricing_batch_item_position')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0011_pricinganalysisbatchitem_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricinganalysisresult',
+            name='repriced_from',
+            field=models.ForeignKey(blank=True, help_text='Resultado original recalculado (sin consultar Keepa) para obtener este resultado', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='repricings', to='pricing_analysis.pricinganalysisresult'),
+        ),
+    ]
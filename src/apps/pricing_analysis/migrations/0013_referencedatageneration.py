@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:10
+
+from django.db import migrations, models
+
+
+PRICING_REFERENCE_KEY = 'pricing_reference'
+
+
+def create_generation_row(apps, schema_editor):
+    """Create the counter so bumps are a single UPDATE."""
+    ReferenceDataGeneration = apps.get_model('pricing_analysis', 'ReferenceDataGeneration')
+    ReferenceDataGeneration.objects.get_or_create(key=PRICING_REFERENCE_KEY)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0012_pricinganalysisresult_repriced_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceDataGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('key', models.CharField(help_text='Conjunto de tablas versionado', max_length=50, unique=True)),
+                ('generation', models.PositiveBigIntegerField(default=0, help_text='Versión actual; cambia con cada modificación de las tablas')),
+            ],
+            options={
+                'verbose_name': 'Reference Data Generation',
+                'verbose_name_plural': 'Reference Data Generations',
+            },
+        ),
+        migrations.RunPython(create_generation_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0013_referencedatageneration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricinganalysisresult',
+            name='input_fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Huella (SHA-256) de los inputs del análisis; vacía en resultados recalculados', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pricinganalysisresult',
+            name='last_confirmed_at',
+            field=models.DateTimeField(blank=True, help_text='Último re-análisis con los mismos inputs (no se guardó un resultado nuevo)', null=True),
+        ),
+    ]
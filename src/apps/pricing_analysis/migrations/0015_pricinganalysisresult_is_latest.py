@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:05
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def flag_latest_results(apps, schema_editor):
+    """Flag the newest result (highest id) of every ASIN."""
+    PricingAnalysisResult = apps.get_model('pricing_analysis', 'PricingAnalysisResult')
+    latest_ids = PricingAnalysisResult.objects.values('asin').annotate(
+        latest_id=Max('id')
+    ).values('latest_id')
+    PricingAnalysisResult.objects.filter(id__in=latest_ids).update(is_latest=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0014_pricinganalysisresult_input_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricinganalysisresult',
+            name='is_latest',
+            field=models.BooleanField(default=False, help_text='Resultado actual del ASIN (el más reciente); los demás son historial'),
+        ),
+        migrations.RunPython(flag_latest_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pricinganalysisresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_latest', True)), fields=('asin',), name='pricing_result_one_latest_per_asin'),
+        ),
+        migrations.AddIndex(
+            model_name='pricinganalysisresult',
+            index=models.Index(condition=models.Q(('is_latest', True)), fields=['is_feasible', '-created_at'], name='pricing_result_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Keep the oldest queued or running job of every batch and fail the rest."""
+    PricingAnalysisJob = apps.get_model('pricing_analysis', 'PricingAnalysisJob')
+    seen = set()
+    duplicates = []
+    for job_id, batch_id in PricingAnalysisJob.objects.filter(
+        status__in=['QUEUED', 'RUNNING']
+    ).order_by('created_at', 'id').values_list('id', 'batch_id'):
+        if batch_id in seen:
+            duplicates.append(job_id)
+        seen.add(batch_id)
+    PricingAnalysisJob.objects.filter(id__in=duplicates).update(
+        status='FAILED', error='Duplicate job of the same batch'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing_analysis', '0015_pricinganalysisresult_is_latest'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pricinganalysisjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['QUEUED', 'RUNNING'])), fields=('batch',), name='pricing_job_one_active_per_batch'),
+        ),
+    ]
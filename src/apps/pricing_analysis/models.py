@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Max, Q
+from django.db.models.functions import Greatest
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from djmoney.models.fields import MoneyField
@@ -42,9 +44,12 @@ class KeepaConfiguration(BaseModel):
         """Reset token counter if date has changed."""
         today = timezone.now().date()
         if self.last_reset_date < today:
-            self.tokens_used_today = 0
-            self.last_reset_date = today
-            self.save(update_fields=['tokens_used_today', 'last_reset_date'])
+            # Conditional update so only one worker resets the counter
+            KeepaConfiguration.objects.filter(
+                pk=self.pk,
+                last_reset_date__lt=today,
+            ).update(tokens_used_today=0, last_reset_date=today)
+            self.refresh_from_db(fields=['tokens_used_today', 'last_reset_date'])
 
     def can_consume_tokens(self, required_tokens):
         """Check if there are enough tokens available."""
@@ -52,10 +57,50 @@ class KeepaConfiguration(BaseModel):
         return (self.tokens_used_today + required_tokens) <= self.daily_token_limit
 
     def consume_tokens(self, tokens):
-        """Consume tokens and update counter."""
+        """Consume tokens and update counter atomically."""
         self.reset_tokens_if_needed()
-        self.tokens_used_today += tokens
-        self.save(update_fields=['tokens_used_today'])
+        KeepaConfiguration.objects.filter(pk=self.pk).update(
+            tokens_used_today=F('tokens_used_today') + tokens
+        )
+        self.refresh_from_db(fields=['tokens_used_today'])
+
+    def reserve_tokens(self, tokens):
+        """
+        Reserve up to `tokens` tokens from today's budget.
+
+        Reserved tokens are counted as used until they are released, so
+        concurrent workers cannot spend them.
+
+        Returns:
+            Number of tokens actually reserved (0 if the budget is exhausted)
+        """
+        self.reset_tokens_if_needed()
+        with transaction.atomic():
+            config = KeepaConfiguration.objects.select_for_update().get(pk=self.pk)
+            granted = max(0, min(tokens, config.daily_token_limit - config.tokens_used_today))
+            if granted:
+                KeepaConfiguration.objects.filter(pk=self.pk).update(
+                    tokens_used_today=F('tokens_used_today') + granted
+                )
+        self.refresh_from_db(fields=['tokens_used_today', 'last_reset_date'])
+        return granted
+
+    def release_tokens(self, tokens, reset_date=None):
+        """
+        Return unused reserved tokens to today's budget.
+
+        Args:
+            tokens: Number of tokens to release
+            reset_date: Day the tokens were reserved; nothing is released if
+                the counter was reset since then
+        """
+        if tokens <= 0:
+            return
+        queryset = KeepaConfiguration.objects.filter(pk=self.pk)
+        if reset_date is not None:
+            queryset = queryset.filter(last_reset_date=reset_date)
+        queryset.update(tokens_used_today=Greatest(F('tokens_used_today') - tokens, 0))
+        self.refresh_from_db(fields=['tokens_used_today', 'last_reset_date'])
 
 
 class ExchangeRate(BaseModel):
@@ -210,11 +255,22 @@ class KeepaProductData(BaseModel):
     )
 
     # Data cruda y sync
+    FETCH_PROFILE_CHOICES = [
+        ('full', 'Full'),
+        ('lean', 'Lean'),
+    ]
+
     raw_data = models.JSONField(
         default=dict,
         blank=True,
         help_text='Respuesta completa de Keepa para debugging'
     )
+    fetch_profile = models.CharField(
+        max_length=10,
+        choices=FETCH_PROFILE_CHOICES,
+        default='full',
+        help_text='Perfil de consulta: full incluye historial de precios, lean solo precios actuales'
+    )
     last_synced_at = models.DateTimeField(
         auto_now=True,
         help_text='Última sincronización exitosa'
@@ -404,6 +460,11 @@ class PricingAnalysisResult(BaseModel):
         ('LOW', 'Low'),
     ]
 
+    REFRESH_LATEST_CHUNK_SIZE = 500
+    # Attempts to move the latest flag when concurrent writers of the same
+    # ASIN hit pricing_result_one_latest_per_asin
+    LATEST_FLAG_ATTEMPTS = 3
+
     product = models.ForeignKey(
         'products.Product',
         on_delete=models.CASCADE,
@@ -435,6 +496,14 @@ class PricingAnalysisResult(BaseModel):
         null=True,
         help_text='Configuración utilizada'
     )
+    repriced_from = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='repricings',
+        help_text='Resultado original recalculado (sin consultar Keepa) para obtener este resultado'
+    )
 
     # Inputs capturados
     usa_cost = MoneyField(
@@ -553,6 +622,23 @@ class PricingAnalysisResult(BaseModel):
         help_text='Notas y recomendaciones del análisis'
     )
 
+    # Deduplicación de re-análisis
+    input_fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text='Huella (SHA-256) de los inputs del análisis; vacía en resultados recalculados'
+    )
+    last_confirmed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Último re-análisis con los mismos inputs (no se guardó un resultado nuevo)'
+    )
+    is_latest = models.BooleanField(
+        default=False,
+        help_text='Resultado actual del ASIN (el más reciente); los demás son historial'
+    )
+
     class Meta:
         verbose_name = 'Pricing Analysis Result'
         verbose_name_plural = 'Pricing Analysis Results'
@@ -561,11 +647,101 @@ class PricingAnalysisResult(BaseModel):
             models.Index(fields=['asin', '-created_at']),
             models.Index(fields=['is_feasible', '-created_at']),
             models.Index(fields=['is_available_usa']),
+            models.Index(
+                fields=['is_feasible', '-created_at'],
+                condition=Q(is_latest=True),
+                name='pricing_result_latest_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['asin'],
+                condition=Q(is_latest=True),
+                name='pricing_result_one_latest_per_asin',
+            ),
         ]
 
     def __str__(self):
         return f'{self.asin} - {"Feasible" if self.is_feasible else "Not Feasible"} ({self.created_at.date()})'
 
+    def save(self, *args, **kwargs):
+        """Insert a new result as the latest of its ASIN (one UPDATE unflags the previous one)."""
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        def insert_latest():
+            PricingAnalysisResult.objects.filter(asin=self.asin, is_latest=True).update(is_latest=False)
+            self.is_latest = True
+            super(PricingAnalysisResult, self).save(*args, **kwargs)
+
+        self._retry_latest_conflicts(insert_latest)
+
+    @classmethod
+    def _retry_latest_conflicts(cls, write):
+        """
+        Run write() in a savepoint, again if another writer flagged the same ASIN first.
+
+        Two transactions inserting results of one ASIN can both unflag the
+        previous result before either commits; the second one then violates
+        pricing_result_one_latest_per_asin. The retry runs after the first one
+        committed, so its UPDATE sees (and unflags) that result.
+
+        Args:
+            write: Callable moving the latest flag
+
+        Raises:
+            IntegrityError: If the conflict persists after LATEST_FLAG_ATTEMPTS,
+                or right away for any other violation (FK, NOT NULL, ...)
+        """
+        for attempt in range(cls.LATEST_FLAG_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    write()
+                return
+            except IntegrityError as e:
+                if not cls._is_latest_conflict(e) or attempt == cls.LATEST_FLAG_ATTEMPTS - 1:
+                    raise
+
+    @classmethod
+    def _is_latest_conflict(cls, error: IntegrityError) -> bool:
+        """Whether an error violates pricing_result_one_latest_per_asin."""
+        message = str(error)
+        # PostgreSQL names the constraint; SQLite names the column of its
+        # only unique index on asin alone
+        return (
+            'pricing_result_one_latest_per_asin' in message or
+            f'UNIQUE constraint failed: {cls._meta.db_table}.asin' in message
+        )
+
+    @classmethod
+    def refresh_latest(cls, asins):
+        """
+        Flag the newest result (highest id) of each ASIN as is_latest.
+
+        Call it inside the transaction that writes results without save()
+        (bulk_create); deletions are handled by a post_delete signal.
+
+        Args:
+            asins: ASINs whose results changed
+        """
+        asins = sorted(set(asins))
+
+        def flag_chunk(chunk):
+            latest_ids = cls.objects.filter(asin__in=chunk).values('asin').annotate(
+                latest_id=Max('id')
+            ).values('latest_id')
+            # Unflag first: at most one flagged row per ASIN at any time
+            cls.objects.filter(asin__in=chunk, is_latest=True).exclude(
+                id__in=latest_ids
+            ).update(is_latest=False)
+            cls.objects.filter(id__in=latest_ids, is_latest=False).update(is_latest=True)
+
+        with transaction.atomic():
+            for start in range(0, len(asins), cls.REFRESH_LATEST_CHUNK_SIZE):
+                chunk = asins[start:start + cls.REFRESH_LATEST_CHUNK_SIZE]
+                cls._retry_latest_conflicts(lambda: flag_chunk(chunk))
+
 
 class PricingAnalysisBatch(BaseModel):
     """Agrupa múltiples análisis en un batch."""
@@ -613,6 +789,11 @@ class PricingAnalysisBatch(BaseModel):
         default=0,
         help_text='Productos no disponibles en USA'
     )
+    deferred_asins = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='ASINs pospuestos porque Keepa no estaba disponible'
+    )
 
     results = models.ManyToManyField(
         'PricingAnalysisResult',
@@ -636,6 +817,11 @@ class PricingAnalysisBatch(BaseModel):
         blank=True,
         help_text='Fecha de finalización'
     )
+    estimated_completion_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha estimada de finalización según los tokens de Keepa'
+    )
 
     class Meta:
         verbose_name = 'Pricing Analysis Batch'
@@ -645,6 +831,181 @@ class PricingAnalysisBatch(BaseModel):
     def __str__(self):
         return f'{self.name} - {self.get_status_display()} ({self.processed_asins}/{self.total_asins})'
 
+    def get_error_log(self):
+        """
+        Errors of the batch keyed by ASIN.
+
+        Per-ASIN errors are stored in the batch items (so recording one does
+        not rewrite the batch row); error_log keeps batch-level errors.
+        """
+        item_errors = self.items.filter(
+            status=PricingAnalysisBatchItem.STATUS_FAILED
+        ).values_list('asin', 'error')
+        return {**self.error_log, **dict(item_errors)}
+
+
+class PricingAnalysisBatchItem(BaseModel):
+    """
+    Checkpoint de un ASIN dentro de un PricingAnalysisBatch.
+
+    Permite reanudar un batch interrumpido procesando solo los ASINs
+    pendientes, pospuestos o con fallos reintentables.
+    """
+
+    STATUS_PENDING = 'PENDING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_DEFERRED = 'DEFERRED'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_DEFERRED, 'Deferred'),
+    ]
+
+    batch = models.ForeignKey(
+        PricingAnalysisBatch,
+        on_delete=models.CASCADE,
+        related_name='items',
+        help_text='Batch al que pertenece el ASIN'
+    )
+    position = models.PositiveIntegerField(
+        help_text='Posición del ASIN en la lista del batch'
+    )
+    asin = models.CharField(
+        max_length=20,
+        help_text='ASIN a analizar'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        help_text='Estado del análisis de este ASIN'
+    )
+    retryable = models.BooleanField(
+        default=False,
+        help_text='El fallo fue de Keepa y se reintenta al reanudar el batch'
+    )
+    result = models.ForeignKey(
+        'PricingAnalysisResult',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='Resultado del análisis'
+    )
+    error = models.TextField(
+        blank=True,
+        help_text='Error del último intento'
+    )
+
+    class Meta:
+        verbose_name = 'Pricing Analysis Batch Item'
+        verbose_name_plural = 'Pricing Analysis Batch Items'
+        ordering = ['batch', 'position']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['batch', 'position'],
+                name='unique_pricing_batch_item_position'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.batch_id} #{self.position} {self.asin} ({self.get_status_display()})'
+
+
+class PricingAnalysisJob(BaseModel):
+    """
+    Trabajo en cola para procesar un PricingAnalysisBatch en segundo plano.
+
+    Los workers (manage.py run_pricing_worker) toman los trabajos en cola con
+    SELECT ... FOR UPDATE SKIP LOCKED; el progreso se lee de los contadores
+    del batch.
+    """
+
+    STATUS_QUEUED = 'QUEUED'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    # A batch has at most one job in these statuses
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    batch = models.ForeignKey(
+        PricingAnalysisBatch,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        help_text='Batch a procesar'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+        db_index=True,
+        help_text='Estado del trabajo'
+    )
+    shipping_cost_mxn = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text='Costo de envío a usar en lugar del de la configuración'
+    )
+    force_refresh = models.BooleanField(
+        default=False,
+        help_text='Consultar Keepa aunque haya datos recientes'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text='Veces que un worker tomó el trabajo'
+    )
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text='Worker que procesa el trabajo'
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha en que un worker tomó el trabajo'
+    )
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Última señal de vida del worker; sin señal reciente el trabajo se reasigna'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha de finalización del trabajo'
+    )
+    error = models.TextField(
+        blank=True,
+        help_text='Error del último intento'
+    )
+
+    class Meta:
+        verbose_name = 'Pricing Analysis Job'
+        verbose_name_plural = 'Pricing Analysis Jobs'
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['batch'],
+                condition=Q(status__in=['QUEUED', 'RUNNING']),
+                name='pricing_job_one_active_per_batch',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Job {self.pk} - {self.batch.name} ({self.get_status_display()})'
+
 
 class KeepaAPILog(BaseModel):
     """Log de todas las llamadas a Keepa API."""
@@ -691,3 +1052,70 @@ class KeepaAPILog(BaseModel):
 
     def __str__(self):
         return f'{self.endpoint} - Status {self.response_status} ({self.created_at})'
+
+
+class KeepaFetchLease(BaseModel):
+    """
+    Lease de una consulta a Keepa en curso para un ASIN y marketplace.
+
+    El worker que crea el lease consulta Keepa; los demás esperan a que lo
+    libere y reutilizan el KeepaProductData que guardó.
+    """
+
+    asin = models.CharField(
+        max_length=20,
+        help_text='ASIN del producto'
+    )
+    marketplace = models.CharField(
+        max_length=2,
+        choices=KeepaProductData.MARKETPLACE_CHOICES,
+        help_text='Marketplace de Amazon'
+    )
+    owner = models.CharField(
+        max_length=32,
+        help_text='Identificador del worker que consulta Keepa'
+    )
+    expires_at = models.DateTimeField(
+        help_text='Después de esta fecha otro worker puede tomar el lease'
+    )
+
+    class Meta:
+        verbose_name = 'Keepa Fetch Lease'
+        verbose_name_plural = 'Keepa Fetch Leases'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['asin', 'marketplace'],
+                name='unique_keepa_fetch_lease'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.asin} ({self.marketplace}) - {self.owner}'
+
+
+class ReferenceDataGeneration(BaseModel):
+    """
+    Contador de versión de tablas que cada proceso guarda en memoria.
+
+    'pricing_reference' se incrementa al guardar o borrar
+    BreakEvenAnalysisConfig, ExchangeRate o BrandRestriction, y
+    'keepa_configuration' al guardar o borrar KeepaConfiguration; cada proceso
+    recarga su copia en memoria de esas tablas cuando el contador cambia.
+    """
+
+    key = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text='Conjunto de tablas versionado'
+    )
+    generation = models.PositiveBigIntegerField(
+        default=0,
+        help_text='Versión actual; cambia con cada modificación de las tablas'
+    )
+
+    class Meta:
+        verbose_name = 'Reference Data Generation'
+        verbose_name_plural = 'Reference Data Generations'
+
+    def __str__(self):
+        return f'{self.key} (gen {self.generation})'
@@ -1,8 +1,10 @@
 from .pricing_calculator import PricingCalculator
 from .keepa_service import KeepaService
 from .analysis_service import PricingAnalysisService
+from .repricing_service import RepricingService
 from .exceptions import (
     KeepaAPIError,
+    KeepaUnavailableError,
     TokenLimitExceededError,
     ExchangeRateNotFoundError,
     ProductNotAvailableError,
@@ -13,7 +15,9 @@ __all__ = [
     'PricingCalculator',
     'KeepaService',
     'PricingAnalysisService',
+    'RepricingService',
     'KeepaAPIError',
+    'KeepaUnavailableError',
     'TokenLimitExceededError',
     'ExchangeRateNotFoundError',
     'ProductNotAvailableError',
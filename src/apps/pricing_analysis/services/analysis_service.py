@@ -10,21 +10,28 @@ Main orchestrator that coordinates the entire analysis flow:
 6. Save results
 """
 
+import hashlib
+import json
+from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
+from django.db.models import Count, F, Q
 from django.utils import timezone
 from djmoney.money import Money
 
 from apps.pricing_analysis.models import (
-    ExchangeRate,
     BreakEvenAnalysisConfig,
     PricingAnalysisResult,
     PricingAnalysisBatch,
-    BrandRestriction,
+    PricingAnalysisBatchItem,
 )
+from apps.products.models import Product
+from .keepa_resilience import keepa_counters
 from .keepa_service import KeepaService
 from .pricing_calculator import PricingCalculator
+from .reference_data import ReferenceSnapshot, get_reference_snapshot
 from .exceptions import (
+    KeepaAPIError,
     ExchangeRateNotFoundError,
     AnalysisConfigNotFoundError,
     ProductNotAvailableError,
@@ -34,16 +41,23 @@ from .exceptions import (
 class PricingAnalysisService:
     """Main service for orchestrating pricing analysis."""
 
-    def __init__(self):
-        """Initialize services."""
-        self.keepa_service = KeepaService()
+    def __init__(self, background: bool = False):
+        """
+        Initialize services.
+
+        Args:
+            background: Whether the service runs in a job worker (see KeepaService)
+        """
+        self.keepa_service = KeepaService(background=background)
         self.calculator = PricingCalculator()
 
     def analyze_single_asin(
         self,
         asin: str,
         shipping_cost_mxn: Optional[Decimal] = None,
-        config: Optional[BreakEvenAnalysisConfig] = None
+        config: Optional[BreakEvenAnalysisConfig] = None,
+        max_age: Optional[timedelta] = None,
+        force_refresh: bool = False
     ) -> PricingAnalysisResult:
         """
         Analyze a single ASIN for pricing viability.
@@ -52,6 +66,8 @@ class PricingAnalysisService:
             asin: Product ASIN
             shipping_cost_mxn: Optional shipping cost override
             config: Optional config override (uses active if not provided)
+            max_age: Optional max age of stored Keepa data to reuse
+            force_refresh: Always fetch fresh Keepa data
 
         Returns:
             PricingAnalysisResult instance
@@ -61,38 +77,86 @@ class PricingAnalysisService:
             AnalysisConfigNotFoundError: If no active config
         """
         # 1. Get configuration
+        reference = get_reference_snapshot()
         if config is None:
             try:
-                config = BreakEvenAnalysisConfig.get_active_config()
+                config = reference.get_active_config()
             except ValueError as e:
                 raise AnalysisConfigNotFoundError(str(e))
 
-        # 2. Fetch Keepa data for USA and MX
-        usa_keepa_data = self.keepa_service.fetch_product_data(asin, 'US')
-        mx_keepa_data = self.keepa_service.fetch_product_data(asin, 'MX')
+        # 2. Fetch Keepa data for USA and MX concurrently
+        keepa_data = self.keepa_service.fetch_product_data_for_marketplaces(
+            asin, ('US', 'MX'), max_age=max_age, force_refresh=force_refresh
+        )
+
+        return self._analyze_keepa_data(
+            asin=asin,
+            usa_keepa_data=keepa_data['US'],
+            mx_keepa_data=keepa_data['MX'],
+            shipping_cost_mxn=shipping_cost_mxn,
+            config=config,
+            reference=reference,
+        )
+
+    def _analyze_keepa_data(
+        self,
+        asin: str,
+        usa_keepa_data,
+        mx_keepa_data,
+        shipping_cost_mxn: Optional[Decimal],
+        config: BreakEvenAnalysisConfig,
+        product: Optional[Product] = None,
+        reference: Optional[ReferenceSnapshot] = None,
+        latest_results: Optional[Dict[str, PricingAnalysisResult]] = None
+    ) -> PricingAnalysisResult:
+        """
+        Run the analysis for an ASIN whose Keepa data was already fetched.
+
+        When the inputs match the latest result of the ASIN (see
+        _store_result) that result is confirmed instead of creating a new one.
 
+        Args:
+            asin: Product ASIN
+            usa_keepa_data: KeepaProductData for US marketplace
+            mx_keepa_data: KeepaProductData for MX marketplace
+            shipping_cost_mxn: Optional shipping cost override
+            config: Analysis configuration
+            product: Product resolved in advance when the Keepa data has none
+            reference: Reference snapshot read by the caller (exchange rate
+                and brand rules); the current one by default
+            latest_results: Latest result per ASIN prefetched by the caller
+                (see _latest_results); looked up per ASIN by default
+
+        Returns:
+            PricingAnalysisResult instance (new or confirmed)
+        """
         # 3. Determine USA cost
         usa_cost, usa_cost_source = self.keepa_service.determine_usa_cost(usa_keepa_data)
 
         # 4. Handle unavailable products
         if usa_cost_source == 'unavailable':
-            if mx_keepa_data and mx_keepa_data.sync_error_message and 'Buybox already owned' in mx_keepa_data.sync_error_message:
+            if self._is_buybox_owned(mx_keepa_data):
                 return self._create_buybox_owned_result(
                     asin=asin,
                     usa_keepa_data=usa_keepa_data,
                     mx_keepa_data=mx_keepa_data,
                     config=config,
+                    product=product,
+                    latest_results=latest_results,
                 )
             return self._create_unavailable_result(
                 asin=asin,
                 usa_keepa_data=usa_keepa_data,
                 mx_keepa_data=mx_keepa_data,
                 config=config,
+                product=product,
+                latest_results=latest_results,
             )
 
         # 5. Get exchange rate
+        reference = reference or get_reference_snapshot()
         try:
-            exchange_rate = ExchangeRate.get_active_usd_mxn_rate()
+            exchange_rate = reference.get_usd_mxn_rate()
         except ValueError as e:
             raise ExchangeRateNotFoundError(str(e))
 
@@ -133,7 +197,9 @@ class PricingAnalysisService:
         )
 
         # 10.5 Brand restriction check
-        brand_status = self._get_brand_status(usa_keepa_data, usa_keepa_data.product or mx_keepa_data.product)
+        brand_status = self._get_brand_status(
+            usa_keepa_data, usa_keepa_data.product or mx_keepa_data.product, reference
+        )
         if brand_status['is_blocked']:
             competitiveness['is_feasible'] = False
             competitiveness['confidence_score'] = 'LOW'
@@ -151,7 +217,7 @@ class PricingAnalysisService:
             analysis_notes = f'⛔ Marca bloqueada: {brand_status["brand"]}\n\n' + analysis_notes
 
         # 12. Create result
-        product = usa_keepa_data.product or mx_keepa_data.product
+        product = usa_keepa_data.product or mx_keepa_data.product or product
         if product is None:
             # This should not happen, but handle it
             product = self.keepa_service.get_or_create_product(
@@ -159,12 +225,28 @@ class PricingAnalysisService:
                 usa_keepa_data.raw_data or {}
             )
 
-        result = PricingAnalysisResult.objects.create(
+        input_fingerprint = self._fingerprint_inputs(
+            kind='priced',
+            product=product.pk,
+            usa_keepa_data=usa_keepa_data.pk,
+            mx_keepa_data=mx_keepa_data.pk,
+            config=(config.pk, config.updated_at),
+            usa_cost=usa_cost,
+            usa_cost_source=usa_cost_source,
+            mx_current_price=mx_current_price,
+            exchange_rate=exchange_rate,
+            shipping_cost_mxn=shipping_cost_mxn,
+            usa_tax_multiplier=usa_tax_multiplier,
+            blocked_brand=brand_status['brand'] if brand_status['is_blocked'] else '',
+        )
+        return self._store_result(
+            latest_results,
             product=product,
             asin=asin,
             usa_keepa_data=usa_keepa_data,
             mx_keepa_data=mx_keepa_data,
             analysis_config=config,
+            input_fingerprint=input_fingerprint,
             # Inputs
             usa_cost=Money(usa_cost, 'USD'),
             usa_cost_source=usa_cost_source,
@@ -186,38 +268,36 @@ class PricingAnalysisService:
             analysis_notes=analysis_notes,
         )
 
-        return result
-
     def _create_unavailable_result(
         self,
         asin: str,
         usa_keepa_data,
         mx_keepa_data,
-        config: BreakEvenAnalysisConfig
+        config: BreakEvenAnalysisConfig,
+        product: Optional[Product] = None,
+        latest_results: Optional[Dict[str, PricingAnalysisResult]] = None
     ) -> PricingAnalysisResult:
-        """Create result for unavailable product."""
+        """Create (or confirm) the result for an unavailable product."""
         # Try to get product
-        product = usa_keepa_data.product or mx_keepa_data.product
+        product = usa_keepa_data.product or mx_keepa_data.product or product
         if product is None:
             # Create a placeholder product
-            from apps.products.models import Product
-            product, _ = Product.objects.get_or_create(
-                external_id=asin,
-                defaults={
-                    'sku': f'KEEPA-{asin}',
-                    'title': f'Unavailable Product {asin}',
-                    'description': 'Product not available in Amazon USA',
-                    'category': 'Uncategorized',
-                    'inventory_quantity': 0,
-                }
-            )
+            product = self._resolve_unavailable_products([asin])[asin]
 
-        result = PricingAnalysisResult.objects.create(
+        return self._store_result(
+            latest_results,
             product=product,
             asin=asin,
             usa_keepa_data=usa_keepa_data,
             mx_keepa_data=mx_keepa_data,
             analysis_config=config,
+            input_fingerprint=self._fingerprint_inputs(
+                kind='unavailable',
+                product=product.pk,
+                usa_keepa_data=usa_keepa_data.pk,
+                mx_keepa_data=mx_keepa_data.pk,
+                config=(config.pk, config.updated_at),
+            ),
             usa_cost=Money(Decimal('0'), 'USD'),
             usa_cost_source='unavailable',
             is_available_usa=False,
@@ -231,29 +311,37 @@ class PricingAnalysisService:
             ),
         )
 
-        return result
-
     def _create_buybox_owned_result(
         self,
         asin: str,
         usa_keepa_data,
         mx_keepa_data,
-        config: BreakEvenAnalysisConfig
+        config: BreakEvenAnalysisConfig,
+        product: Optional[Product] = None,
+        latest_results: Optional[Dict[str, PricingAnalysisResult]] = None
     ) -> PricingAnalysisResult:
-        """Create result when buybox is already owned by this seller."""
-        product = usa_keepa_data.product or mx_keepa_data.product
+        """Create (or confirm) the result when buybox is already owned by this seller."""
+        product = usa_keepa_data.product or mx_keepa_data.product or product
         if product is None:
             product = self.keepa_service.get_or_create_product(
                 asin,
                 usa_keepa_data.raw_data or {}
             )
 
-        return PricingAnalysisResult.objects.create(
+        return self._store_result(
+            latest_results,
             product=product,
             asin=asin,
             usa_keepa_data=usa_keepa_data,
             mx_keepa_data=mx_keepa_data,
             analysis_config=config,
+            input_fingerprint=self._fingerprint_inputs(
+                kind='buybox_owned',
+                product=product.pk,
+                usa_keepa_data=usa_keepa_data.pk,
+                mx_keepa_data=mx_keepa_data.pk,
+                config=(config.pk, config.updated_at),
+            ),
             usa_cost=Money(Decimal('0'), 'USD'),
             usa_cost_source='unavailable',
             is_available_usa=True,
@@ -264,26 +352,140 @@ class PricingAnalysisService:
             ),
         )
 
+    @staticmethod
+    def _fingerprint_inputs(**inputs) -> str:
+        """
+        Deterministic fingerprint of the inputs of an analysis.
+
+        Decimals are normalized (17.5 and 17.5000 match) and datetimes are
+        compared by their ISO format.
+
+        Args:
+            **inputs: JSON-serializable values, Decimals and datetimes
+
+        Returns:
+            SHA-256 hex digest
+        """
+        def canonical(value):
+            if isinstance(value, Decimal):
+                return format(value.normalize(), 'f')
+            if isinstance(value, datetime):
+                return value.isoformat()
+            raise TypeError(f'Cannot fingerprint {type(value).__name__}')
+
+        payload = json.dumps(inputs, sort_keys=True, default=canonical)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _latest_results(asins: List[str]) -> Dict[str, PricingAnalysisResult]:
+        """Latest result of each ASIN (one query), for _store_result."""
+        return {
+            result.asin: result
+            for result in PricingAnalysisResult.objects.filter(asin__in=asins, is_latest=True)
+        }
+
+    @staticmethod
+    def _store_result(
+        latest_results: Optional[Dict[str, PricingAnalysisResult]],
+        **fields
+    ) -> PricingAnalysisResult:
+        """
+        Create a result unless the latest result of the ASIN has the same inputs.
+
+        A re-analysis with an unchanged input_fingerprint only stamps
+        last_confirmed_at on the latest result instead of inserting a
+        duplicate row.
+
+        Args:
+            latest_results: Latest result per ASIN (see _latest_results), or
+                None to look it up; updated with the stored result
+            **fields: PricingAnalysisResult fields, including asin and
+                input_fingerprint
+
+        Returns:
+            The confirmed or created PricingAnalysisResult
+        """
+        asin = fields['asin']
+        if latest_results is None:
+            latest = PricingAnalysisResult.objects.filter(asin=asin, is_latest=True).first()
+        else:
+            latest = latest_results.get(asin)
+
+        if latest is not None and latest.input_fingerprint == fields['input_fingerprint']:
+            now = timezone.now()
+            PricingAnalysisResult.objects.filter(pk=latest.pk).update(
+                last_confirmed_at=now, updated_at=now
+            )
+            latest.last_confirmed_at = now
+            latest.updated_at = now
+            return latest
+
+        result = PricingAnalysisResult.objects.create(**fields)
+        if latest_results is not None:
+            latest_results[asin] = result
+        return result
+
+    def _is_buybox_owned(self, mx_keepa_data) -> bool:
+        """Whether the MX Buy Box of the product already belongs to this seller."""
+        return bool(
+            mx_keepa_data and
+            mx_keepa_data.sync_error_message and
+            'Buybox already owned' in mx_keepa_data.sync_error_message
+        )
+
+    def _resolve_unavailable_products(self, asins: List[str]) -> Dict[str, Product]:
+        """Get or create the placeholder Products of ASINs not available in USA."""
+        return self.keepa_service.resolve_products(
+            {asin: {} for asin in asins},
+            placeholder_title='Unavailable Product',
+            placeholder_description='Product not available in Amazon USA',
+        )
+
+    def _resolve_result_products(self, asins: List[str], usa_data: dict, mx_data: dict) -> Dict[str, Product]:
+        """
+        Resolve in bulk the Products of ASINs whose Keepa data has none.
+
+        Unavailable and buybox-owned results need a Product even though no
+        Keepa product was stored for them.
+
+        Args:
+            asins: ASINs of the group
+            usa_data: Dictionary mapping ASIN to US KeepaProductData
+            mx_data: Dictionary mapping ASIN to MX KeepaProductData
+
+        Returns:
+            Dictionary mapping ASIN to Product
+        """
+        with_keepa_data = {}
+        unavailable = []
+        for asin in asins:
+            usa_keepa_data, mx_keepa_data = usa_data.get(asin), mx_data.get(asin)
+            if usa_keepa_data is None or mx_keepa_data is None:
+                continue
+            if usa_keepa_data.product_id or mx_keepa_data.product_id:
+                continue
+            _, usa_cost_source = self.keepa_service.determine_usa_cost(usa_keepa_data)
+            if usa_cost_source == 'unavailable' and not self._is_buybox_owned(mx_keepa_data):
+                unavailable.append(asin)
+            else:
+                with_keepa_data[asin] = usa_keepa_data.raw_data or {}
+
+        products = self.keepa_service.resolve_products(with_keepa_data)
+        products.update(self._resolve_unavailable_products(unavailable))
+        return products
 
-    def _get_brand_status(self, usa_keepa_data, product) -> dict:
+    @staticmethod
+    def _get_brand_status(usa_keepa_data, product, reference: ReferenceSnapshot) -> dict:
+        """Restriction status of the product's brand (see ReferenceSnapshot.get_brand_status)."""
         brand = ''
         if usa_keepa_data and usa_keepa_data.brand:
             brand = usa_keepa_data.brand
         elif product and getattr(product, 'brand', None):
             brand = product.brand
+        return reference.get_brand_status(brand)
 
-        normalized = (brand or '').strip().lower()
-        if not normalized:
-            return {'brand': '', 'is_blocked': False}
-
-        restriction = BrandRestriction.objects.filter(normalized_name=normalized).first()
-        if restriction is None:
-            return {'brand': brand, 'is_blocked': False}
-
-        return {'brand': brand, 'is_blocked': not restriction.is_allowed}
-
-
-    def _get_usa_tax_multiplier(self, usa_keepa_data, product) -> Decimal:
+    @staticmethod
+    def _get_usa_tax_multiplier(usa_keepa_data, product) -> Decimal:
         """Return USA tax multiplier based on category rules."""
         category = ''
         if usa_keepa_data and usa_keepa_data.product_category:
@@ -297,8 +499,8 @@ class PricingAnalysisService:
 
         return Decimal('1.0825')
 
+    @staticmethod
     def _generate_analysis_notes(
-        self,
         competitiveness: dict,
         usa_cost: Decimal,
         usa_cost_source: str,
@@ -353,33 +555,86 @@ class PricingAnalysisService:
         asins: List[str],
         batch_name: str,
         shipping_cost_mxn: Optional[Decimal] = None,
-        config: Optional[BreakEvenAnalysisConfig] = None
+        config: Optional[BreakEvenAnalysisConfig] = None,
+        max_age: Optional[timedelta] = None,
+        force_refresh: bool = False
     ) -> PricingAnalysisBatch:
         """
-        Analyze multiple ASINs in a batch.
+        Analyze multiple ASINs in a batch, synchronously.
+
+        Web requests should enqueue the batch instead (see job_queue), since
+        large batches outlive the request timeout.
 
         Args:
             asins: List of ASINs to analyze
             batch_name: Name for the batch
             shipping_cost_mxn: Optional shipping cost override
             config: Optional config override
+            max_age: Optional max age of stored Keepa data to reuse
+            force_refresh: Always fetch fresh Keepa data
 
         Returns:
             PricingAnalysisBatch instance
         """
-        # Create batch
         batch = PricingAnalysisBatch.objects.create(
             name=batch_name,
             asins=asins,
-            status='PROCESSING',
             total_asins=len(asins),
-            started_at=timezone.now(),
         )
+        return self.process_batch(
+            batch,
+            shipping_cost_mxn=shipping_cost_mxn,
+            config=config,
+            max_age=max_age,
+            force_refresh=force_refresh,
+        )
+
+    def process_batch(
+        self,
+        batch: PricingAnalysisBatch,
+        shipping_cost_mxn: Optional[Decimal] = None,
+        config: Optional[BreakEvenAnalysisConfig] = None,
+        max_age: Optional[timedelta] = None,
+        force_refresh: bool = False,
+        heartbeat: Optional[Callable[[], None]] = None,
+        profile: str = KeepaService.PROFILE_FULL
+    ) -> PricingAnalysisBatch:
+        """
+        Analyze the ASINs of an existing batch.
+
+        Every ASIN is checkpointed in a PricingAnalysisBatchItem after each
+        group of ASINs, so processing a batch again resumes it: analyzed ASINs
+        are kept and only pending, deferred and retryable failed ASINs (Keepa
+        errors) are analyzed. Progress is written to the batch counters.
+
+        If the Keepa circuit breaker opens mid-batch, the remaining ASINs are
+        stored in deferred_asins (to be analyzed again later) instead of being
+        counted as failed.
+
+        Args:
+            batch: Batch to process
+            shipping_cost_mxn: Optional shipping cost override
+            config: Optional config override
+            max_age: Optional max age of stored Keepa data to reuse
+            force_refresh: Always fetch fresh Keepa data
+            heartbeat: Optional callable run before every group of ASINs and
+                while its Keepa queries wait for tokens (e.g. to renew the
+                worker's lease); its exceptions stop the batch
+            profile: Keepa fetch profile; 'lean' skips the price history and
+                is only meant for refresh-only runs (the detail chart needs 'full')
+
+        Returns:
+            The processed batch
+
+        Raises:
+            AnalysisConfigNotFoundError: If there is no active config
+        """
+        items = self._prepare_batch_items(batch)
 
         # Get config once
         if config is None:
             try:
-                config = BreakEvenAnalysisConfig.get_active_config()
+                config = get_reference_snapshot().get_active_config()
             except ValueError as e:
                 batch.status = 'FAILED'
                 batch.error_log = {'error': str(e)}
@@ -387,40 +642,209 @@ class PricingAnalysisService:
                 batch.save()
                 raise AnalysisConfigNotFoundError(str(e))
 
-        # Process each ASIN
-        for asin in asins:
-            try:
-                result = self.analyze_single_asin(
-                    asin=asin,
-                    shipping_cost_mxn=shipping_cost_mxn,
-                    config=config
+        # Process ASINs in groups so the US and MX queries of every chunk in a
+        # group run concurrently (one Keepa query per marketplace and chunk).
+        # Groups are sized from the tokens available before each group.
+        index = 0
+        while index < len(items):
+            concurrency = self.keepa_service.tuned_concurrency()
+            group_size = KeepaService.BULK_QUERY_LIMIT * max(1, concurrency // 2)
+            if heartbeat is not None:
+                heartbeat()
+            if self.keepa_service.circuit_breaker.is_open:
+                # Keepa is unhealthy: do not burn the rest of the batch
+                self._defer_items(batch, items[index:])
+                break
+            group = items[index:index + group_size]
+            chunk = [item.asin for item in group]
+            self._update_estimated_completion(batch, len(items) - index)
+            # Exchange rate and brand rules are read once per group
+            reference = get_reference_snapshot()
+            # Reserve the worst case of this group only (US + MX per ASIN):
+            # unused tokens go back to the daily budget as soon as it is fetched,
+            # so a large batch never holds the budget of interactive requests
+            with self.keepa_service.token_reservation(len(group) * 2 * KeepaService.TOKENS_PER_PRODUCT):
+                keepa_data = self.keepa_service.fetch_bulk_product_data_for_marketplaces(
+                    chunk,
+                    ('US', 'MX'),
+                    max_age=max_age,
+                    force_refresh=force_refresh,
+                    profile=profile,
+                    heartbeat=heartbeat,
                 )
+            usa_data, usa_errors = keepa_data['US']
+            mx_data, mx_errors = keepa_data['MX']
+            try:
+                products = self._resolve_result_products(chunk, usa_data, mx_data)
+            except Exception:
+                # Resolved (and reported) ASIN by ASIN below
+                products = {}
+            latest_results = self._latest_results(chunk)
+
+            deferred = []
+            analyzed = []
+            for item in group:
+                asin = item.asin
+                try:
+                    fetch_error = usa_errors.get(asin) or mx_errors.get(asin)
+                    if fetch_error and self.keepa_service.circuit_breaker.is_open:
+                        deferred.append(item)
+                        continue
+                    if fetch_error:
+                        raise KeepaAPIError(fetch_error)
+
+                    item.result = self._analyze_keepa_data(
+                        asin=asin,
+                        usa_keepa_data=usa_data[asin],
+                        mx_keepa_data=mx_data[asin],
+                        shipping_cost_mxn=shipping_cost_mxn,
+                        config=config,
+                        product=products.get(asin),
+                        reference=reference,
+                        latest_results=latest_results,
+                    )
+                    item.status = PricingAnalysisBatchItem.STATUS_DONE
+                    item.error = ''
+                    item.retryable = False
+
+                except Exception as e:
+                    item.result = None
+                    item.status = PricingAnalysisBatchItem.STATUS_FAILED
+                    item.error = str(e)
+                    # Keepa errors are retried when the batch is resumed
+                    item.retryable = isinstance(e, KeepaAPIError)
+                analyzed.append(item)
+
+            self._flush_progress(batch, analyzed)
+            self._defer_items(batch, deferred)
+            index += group_size
 
-                # Add to batch
-                batch.results.add(result)
-                batch.processed_asins += 1
-
-                if result.is_available_usa:
-                    batch.successful_analyses += 1
-                else:
-                    batch.unavailable_in_usa_count += 1
+        # Mark as completed
+        batch.status = 'COMPLETED'
+        batch.completed_at = timezone.now()
+        batch.save(update_fields=['status', 'completed_at', 'updated_at'])
 
-                batch.save()
+        return batch
 
-            except Exception as e:
-                batch.failed_analyses += 1
-                batch.processed_asins += 1
+    def _prepare_batch_items(self, batch: PricingAnalysisBatch) -> List[PricingAnalysisBatchItem]:
+        """
+        Create or resume the per-ASIN checkpoints of a batch.
 
-                # Log error
-                if not batch.error_log:
-                    batch.error_log = {}
-                batch.error_log[asin] = str(e)
+        A batch without checkpoints starts from scratch. Otherwise deferred
+        and retryable failed ASINs go back to pending, and the batch counters
+        are rebuilt from the checkpoints.
 
-                batch.save()
+        Args:
+            batch: Batch about to be processed
 
-        # Mark as completed
-        batch.status = 'COMPLETED'
-        batch.completed_at = timezone.now()
+        Returns:
+            Pending items, in batch order
+        """
+        Item = PricingAnalysisBatchItem
+        if not batch.items.exists():
+            batch.results.clear()
+            Item.objects.bulk_create(
+                [Item(batch=batch, position=position, asin=asin) for position, asin in enumerate(batch.asins)]
+            )
+        else:
+            batch.items.filter(
+                Q(status=Item.STATUS_DEFERRED) | Q(status=Item.STATUS_FAILED, retryable=True)
+            ).update(status=Item.STATUS_PENDING, error='', retryable=False, updated_at=timezone.now())
+
+        done = Q(status=Item.STATUS_DONE)
+        counts = batch.items.aggregate(
+            successful=Count('id', filter=done & Q(result__is_available_usa=True)),
+            done=Count('id', filter=done),
+            failed=Count('id', filter=Q(status=Item.STATUS_FAILED)),
+        )
+        batch.status = 'PROCESSING'
+        batch.total_asins = len(batch.asins)
+        batch.successful_analyses = counts['successful']
+        batch.unavailable_in_usa_count = counts['done'] - counts['successful']
+        batch.failed_analyses = counts['failed']
+        batch.processed_asins = counts['done'] + counts['failed']
+        # ASIN errors live in the checkpoints (see PricingAnalysisBatch.get_error_log)
+        batch.error_log = {}
+        batch.deferred_asins = []
+        batch.started_at = batch.started_at or timezone.now()
+        batch.completed_at = None
         batch.save()
 
-        return batch
+        return list(batch.items.filter(status=Item.STATUS_PENDING).order_by('position'))
+
+    @staticmethod
+    def _flush_progress(batch: PricingAnalysisBatch, items: List[PricingAnalysisBatchItem]):
+        """
+        Write the outcome of a group of batch ASINs.
+
+        Checkpoints are written with one bulk update and results are linked
+        with one bulk insert into the M2M table. The counters are increased
+        with F() expressions, so the batch row (and its large JSON fields) is
+        never rewritten.
+
+        Args:
+            batch: Batch being processed (its counters are updated in memory too)
+            items: Checkpoints with their new status, result and error
+        """
+        if not items:
+            return
+        now = timezone.now()
+        for item in items:
+            item.updated_at = now
+        PricingAnalysisBatchItem.objects.bulk_update(
+            items, ['status', 'result', 'error', 'retryable', 'updated_at']
+        )
+
+        done = [item for item in items if item.status == PricingAnalysisBatchItem.STATUS_DONE]
+        Through = PricingAnalysisBatch.results.through
+        Through.objects.bulk_create(
+            [
+                Through(pricinganalysisbatch_id=batch.pk, pricinganalysisresult_id=item.result_id)
+                for item in done
+            ],
+            ignore_conflicts=True,
+        )
+
+        successful = sum(1 for item in done if item.result.is_available_usa)
+        increments = {
+            'processed_asins': len(items),
+            'successful_analyses': successful,
+            'unavailable_in_usa_count': len(done) - successful,
+            'failed_analyses': len(items) - len(done),
+        }
+        increments = {field: amount for field, amount in increments.items() if amount}
+        PricingAnalysisBatch.objects.filter(pk=batch.pk).update(
+            updated_at=now,
+            **{field: F(field) + amount for field, amount in increments.items()},
+        )
+        for field, amount in increments.items():
+            setattr(batch, field, getattr(batch, field) + amount)
+
+    def _defer_items(self, batch: PricingAnalysisBatch, items: List[PricingAnalysisBatchItem]):
+        """
+        Record ASINs skipped because the Keepa circuit breaker is open.
+
+        Args:
+            batch: Batch being processed
+            items: Checkpoints of the ASINs to analyze again once Keepa recovers
+        """
+        if not items:
+            return
+        PricingAnalysisBatchItem.objects.filter(pk__in=[item.pk for item in items]).update(
+            status=PricingAnalysisBatchItem.STATUS_DEFERRED, updated_at=timezone.now()
+        )
+        batch.deferred_asins = list(batch.deferred_asins) + [item.asin for item in items]
+        batch.save(update_fields=['deferred_asins', 'updated_at'])
+        keepa_counters.increment('deferred_asins', len(items))
+
+    def _update_estimated_completion(self, batch: PricingAnalysisBatch, remaining_asins: int):
+        """
+        Store the projected completion time of a batch.
+
+        Args:
+            batch: Batch being processed
+            remaining_asins: ASINs not fetched yet
+        """
+        seconds = self.keepa_service.estimate_completion_seconds(remaining_asins)
+        batch.estimated_completion_at = timezone.now() + timedelta(seconds=seconds)
+        batch.save(update_fields=['estimated_completion_at', 'updated_at'])
@@ -0,0 +1,220 @@
+"""
+Keepa API Log Buffer
+
+Buffered KeepaAPILog writer used by every Keepa caller:
+- Collects entries in memory, never touching the database on the call path
+- Writes them with bulk_create from a background thread when the batch is
+  full or the flush interval elapsed
+- Samples successful calls (errors are always kept)
+- Truncates large request/response bodies
+"""
+
+import atexit
+import json
+import logging
+import random
+import threading
+from collections import deque
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from apps.pricing_analysis.models import KeepaAPILog
+
+logger = logging.getLogger(__name__)
+
+
+class KeepaAPILogBuffer:
+    """In-memory KeepaAPILog sink flushed in batches by a daemon thread."""
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        sample_rate: Optional[float] = None,
+        max_body_chars: Optional[int] = None,
+        max_buffer: Optional[int] = None,
+        autostart: bool = True
+    ):
+        """
+        Initialize the buffer (defaults come from the KEEPA_API_LOG_* settings).
+
+        Args:
+            batch_size: Entries that trigger a flush
+            flush_interval: Maximum seconds an entry waits in memory
+            sample_rate: Fraction of successful calls logged (0-1)
+            max_body_chars: Maximum serialized size of request/response bodies
+            max_buffer: Entries kept in memory before the oldest are dropped
+            autostart: Start the writer thread on the first logged entry
+        """
+        self.batch_size = batch_size or settings.KEEPA_API_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.KEEPA_API_LOG_FLUSH_SECONDS
+        self.sample_rate = settings.KEEPA_API_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.max_body_chars = max_body_chars or settings.KEEPA_API_LOG_MAX_BODY_CHARS
+        self.autostart = autostart
+        self.dropped = 0
+        self._entries = deque(maxlen=max_buffer or self.batch_size * 20)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def log(
+        self,
+        endpoint: str,
+        request_params: dict,
+        response_status: Optional[int],
+        response_data: dict,
+        tokens_consumed: int = 0,
+        error_message: str = '',
+        execution_time_ms: int = 0
+    ) -> bool:
+        """
+        Queue one API call for logging.
+
+        Only appends to memory: sampling is a random draw and bodies are
+        truncated later by the writer thread.
+
+        Returns:
+            True if the entry was queued, False if it was sampled out
+        """
+        is_error = bool(error_message) or (response_status or 0) >= 400
+        if not is_error and random.random() >= self.sample_rate:
+            return False
+
+        entry = {
+            'endpoint': endpoint,
+            'request_params': request_params,
+            'response_status': response_status,
+            'response_data': response_data,
+            'tokens_consumed': tokens_consumed,
+            'error_message': error_message,
+            'execution_time_ms': execution_time_ms,
+        }
+        with self._lock:
+            if len(self._entries) == self._entries.maxlen:
+                self.dropped += 1
+            self._entries.append(entry)
+            pending = len(self._entries)
+
+        if self.autostart and self._thread is None:
+            self.start()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _truncate(self, body):
+        """Replace a body whose JSON exceeds max_body_chars with a preview."""
+        try:
+            serialized = json.dumps(body, default=str)
+        except (TypeError, ValueError):
+            return {'unserializable': True}
+        if len(serialized) <= self.max_body_chars:
+            return body
+        return {
+            'truncated': True,
+            'original_size': len(serialized),
+            'preview': serialized[:self.max_body_chars],
+        }
+
+    def flush(self) -> int:
+        """
+        Write every queued entry with a single bulk_create.
+
+        Returns:
+            Number of log rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries = list(self._entries)
+                self._entries.clear()
+            if not entries:
+                return 0
+
+            logs = [
+                KeepaAPILog(
+                    **{
+                        **entry,
+                        'request_params': self._truncate(entry['request_params']),
+                        'response_data': self._truncate(entry['response_data']),
+                    }
+                )
+                for entry in entries
+            ]
+            try:
+                KeepaAPILog.objects.bulk_create(logs, batch_size=self.batch_size)
+            except Exception as e:
+                logger.warning('Could not write %s Keepa API logs: %s', len(logs), e)
+                return 0
+            return len(logs)
+
+    def start(self):
+        """Start the writer thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name='keepa-api-log-writer', daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, flush: bool = True):
+        """
+        Stop the writer thread.
+
+        Args:
+            flush: Write the remaining entries before returning
+        """
+        thread = self._thread
+        if thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            thread.join(timeout=self.flush_interval)
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def _run(self):
+        """Writer loop: flush on a full batch or every flush_interval seconds."""
+        try:
+            while not self._stopping:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                if self._stopping:
+                    break
+                self.flush()
+        finally:
+            close_old_connections()
+
+
+_buffer: Optional[KeepaAPILogBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_api_log_buffer() -> KeepaAPILogBuffer:
+    """Get the process-wide KeepaAPILog buffer."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = KeepaAPILogBuffer()
+        return _buffer
+
+
+def log_keepa_api_call(**fields) -> bool:
+    """
+    Queue a Keepa API call in the process-wide log buffer.
+
+    Args:
+        **fields: KeepaAPILog fields (endpoint, request_params, response_status,
+            response_data, tokens_consumed, error_message, execution_time_ms)
+
+    Returns:
+        True if the entry was queued
+    """
+    if not settings.KEEPA_API_LOG_ENABLED:
+        return False
+    return get_api_log_buffer().log(**fields)
@@ -13,7 +13,17 @@ class KeepaAPIError(PricingAnalysisException):
 
 class TokenLimitExceededError(PricingAnalysisException):
     """Raised when Keepa API token limit is exceeded."""
-    pass
+
+    def __init__(self, message='', retry_after=None):
+        """
+        Initialize the error.
+
+        Args:
+            message: Error message
+            retry_after: Seconds until the request can be afforded, if known
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class ExchangeRateNotFoundError(PricingAnalysisException):
@@ -29,3 +39,13 @@ class ProductNotAvailableError(PricingAnalysisException):
 class AnalysisConfigNotFoundError(PricingAnalysisException):
     """Raised when no active analysis config is found."""
     pass
+
+
+class KeepaUnavailableError(KeepaAPIError):
+    """Raised when Keepa calls are short-circuited because the API is unhealthy."""
+    pass
+
+
+class JobLeaseLostError(PricingAnalysisException):
+    """Raised when a batch job was taken over by another worker."""
+    pass
@@ -0,0 +1,139 @@
+"""
+Keepa Fetch Leases
+
+Single-flight coordination of Keepa fetches across workers:
+- The first worker to fetch an (asin, marketplace) takes a lease row
+- Other workers wait for the lease to be released and reuse the stored data
+- Leases expire, so a crashed worker never blocks an ASIN for long
+"""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Set, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.pricing_analysis.models import KeepaFetchLease
+
+LeaseKey = Tuple[str, str]
+
+
+class KeepaFetchLeases:
+    """Lease rows held by one KeepaService while it queries Keepa."""
+
+    POLL_INTERVAL_SECONDS = 0.5
+
+    def __init__(
+        self,
+        lease_seconds: Optional[int] = None,
+        wait_seconds: Optional[int] = None,
+        sleep=time.sleep
+    ):
+        """
+        Initialize the leases (defaults come from the KEEPA_FETCH_* settings).
+
+        Args:
+            lease_seconds: Seconds before a lease can be taken over
+            wait_seconds: Maximum seconds a follower waits for a leader
+            sleep: Sleep function (injectable for tests)
+        """
+        self.owner = uuid.uuid4().hex
+        self.lease_seconds = lease_seconds or settings.KEEPA_FETCH_LEASE_SECONDS
+        self.wait_seconds = settings.KEEPA_FETCH_WAIT_SECONDS if wait_seconds is None else wait_seconds
+        self.sleep = sleep
+        # Start of the earliest fetch of another worker this one waits for
+        self.followed_since = None
+
+    @staticmethod
+    def _filter(keys: Iterable[LeaseKey]):
+        """Queryset covering (at least) the given keys."""
+        keys = list(keys)
+        return KeepaFetchLease.objects.filter(
+            asin__in={asin for asin, _ in keys},
+            marketplace__in={marketplace for _, marketplace in keys},
+        )
+
+    def acquire(self, keys: Iterable[LeaseKey]) -> Set[LeaseKey]:
+        """
+        Take the lease of every key nobody else is fetching.
+
+        Args:
+            keys: (asin, marketplace) pairs about to be fetched
+
+        Returns:
+            Keys leased by this worker; the others are being fetched elsewhere
+        """
+        keys = set(keys)
+        self.followed_since = None
+        if not keys:
+            return set()
+
+        now = timezone.now()
+        # Leases of crashed workers can be taken over
+        self._filter(keys).filter(expires_at__lt=now).delete()
+        KeepaFetchLease.objects.bulk_create(
+            [
+                KeepaFetchLease(
+                    asin=asin,
+                    marketplace=marketplace,
+                    owner=self.owner,
+                    expires_at=now + timedelta(seconds=self.lease_seconds),
+                )
+                for asin, marketplace in keys
+            ],
+            ignore_conflicts=True,
+        )
+        owned = set()
+        for asin, marketplace, owner, created_at in self._filter(keys).values_list(
+            'asin', 'marketplace', 'owner', 'created_at'
+        ):
+            if (asin, marketplace) not in keys:
+                continue
+            if owner == self.owner:
+                owned.add((asin, marketplace))
+            else:
+                self._record_start(created_at)
+        return owned
+
+    def _record_start(self, created_at: datetime):
+        """Remember the earliest start of a fetch this worker follows."""
+        if self.followed_since is None or created_at < self.followed_since:
+            self.followed_since = created_at
+
+    def wait(self, keys: Iterable[LeaseKey]) -> Optional[datetime]:
+        """
+        Wait until other workers release the leases of the given keys.
+
+        Args:
+            keys: Keys leased by other workers
+
+        Returns:
+            When the earliest followed fetch started (data stored since then
+            is fresh), or None if no lease was ever seen
+        """
+        keys = set(keys)
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            pending = False
+            for asin, marketplace, created_at in self._filter(keys).exclude(
+                owner=self.owner
+            ).values_list('asin', 'marketplace', 'created_at'):
+                if (asin, marketplace) in keys:
+                    pending = True
+                    self._record_start(created_at)
+            if not pending or time.monotonic() >= deadline:
+                return self.followed_since
+            self.sleep(self.POLL_INTERVAL_SECONDS)
+
+    def release(self, keys: Iterable[LeaseKey]):
+        """
+        Release leases held by this worker.
+
+        Args:
+            keys: Keys returned by acquire
+        """
+        keys = set(keys)
+        if keys:
+            self._filter(keys).filter(owner=self.owner).delete()
@@ -0,0 +1,250 @@
+"""
+Pricing Job Queue
+
+Database-backed queue for pricing batches (no external broker):
+- Web requests create the batch and enqueue a job, returning immediately
+- Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED
+- Running jobs renew a heartbeat lease; jobs of workers that died are
+  requeued (or failed after max attempts) and resume from their checkpoints
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.pricing_analysis.models import (
+    PricingAnalysisBatch,
+    PricingAnalysisJob,
+)
+from .analysis_service import PricingAnalysisService
+from .exceptions import AnalysisConfigNotFoundError, JobLeaseLostError
+from .reference_data import get_reference_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_batch(
+    batch: PricingAnalysisBatch,
+    shipping_cost_mxn: Optional[Decimal] = None,
+    force_refresh: bool = False
+) -> PricingAnalysisJob:
+    """
+    Queue an existing batch for processing by a worker.
+
+    A batch already queued or running keeps its current job (the batch row
+    is locked while checking, and a partial unique constraint backs it). A
+    batch that was interrupted or has deferred ASINs resumes from its
+    checkpoints.
+
+    Args:
+        batch: Batch to process
+        shipping_cost_mxn: Optional shipping cost override
+        force_refresh: Always fetch fresh Keepa data
+
+    Returns:
+        The queued PricingAnalysisJob
+
+    Raises:
+        AnalysisConfigNotFoundError: If there is no active config
+    """
+    # Fail in the request instead of in the worker
+    try:
+        get_reference_snapshot().get_active_config()
+    except ValueError as e:
+        raise AnalysisConfigNotFoundError(str(e))
+
+    try:
+        with transaction.atomic():
+            # Concurrent submits of the same batch wait here for each other
+            PricingAnalysisBatch.objects.select_for_update().filter(pk=batch.pk).first()
+            active = batch.jobs.filter(status__in=PricingAnalysisJob.ACTIVE_STATUSES).first()
+            if active is not None:
+                return active
+
+            job = PricingAnalysisJob.objects.create(
+                batch=batch,
+                shipping_cost_mxn=shipping_cost_mxn,
+                force_refresh=force_refresh,
+            )
+            batch.status = 'PENDING'
+            batch.total_asins = len(batch.asins)
+            batch.save(update_fields=['status', 'total_asins', 'updated_at'])
+    except IntegrityError:
+        # pricing_job_one_active_per_batch: another request queued it first
+        # (backends without row locks)
+        return batch.jobs.get(status__in=PricingAnalysisJob.ACTIVE_STATUSES)
+    return job
+
+
+def submit_batch(
+    asins: List[str],
+    batch_name: str,
+    shipping_cost_mxn: Optional[Decimal] = None,
+    force_refresh: bool = False
+) -> PricingAnalysisBatch:
+    """
+    Create a batch and queue it for processing by a worker.
+
+    Args:
+        asins: List of ASINs to analyze
+        batch_name: Name for the batch
+        shipping_cost_mxn: Optional shipping cost override
+        force_refresh: Always fetch fresh Keepa data
+
+    Returns:
+        The PENDING batch (progress is read from its counters)
+
+    Raises:
+        AnalysisConfigNotFoundError: If there is no active config
+    """
+    with transaction.atomic():
+        batch = PricingAnalysisBatch.objects.create(
+            name=batch_name,
+            asins=asins,
+            total_asins=len(asins),
+        )
+        enqueue_batch(batch, shipping_cost_mxn=shipping_cost_mxn, force_refresh=force_refresh)
+    return batch
+
+
+def requeue_stale_jobs(stale_seconds: Optional[int] = None) -> int:
+    """
+    Requeue jobs whose worker stopped renewing its lease.
+
+    A running job without a heartbeat for stale_seconds is assumed
+    abandoned. It is queued again (the next worker resumes the batch from
+    its checkpoints), or failed once it has used PRICING_JOB_MAX_ATTEMPTS.
+
+    Args:
+        stale_seconds: Seconds without heartbeat after which a job is
+            abandoned (default: PRICING_JOB_STALE_SECONDS)
+
+    Returns:
+        Number of jobs requeued or failed
+    """
+    stale_seconds = stale_seconds or settings.PRICING_JOB_STALE_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+    stale = PricingAnalysisJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, claimed_at__lt=cutoff),
+        status=PricingAnalysisJob.STATUS_RUNNING,
+    )
+    failed = stale.filter(attempts__gte=settings.PRICING_JOB_MAX_ATTEMPTS)
+    failed_batches = list(failed.values_list('batch_id', flat=True))
+    count = failed.update(
+        status=PricingAnalysisJob.STATUS_FAILED,
+        finished_at=timezone.now(),
+        error='Worker stopped responding',
+    )
+    if failed_batches:
+        PricingAnalysisBatch.objects.filter(id__in=failed_batches).update(
+            status='FAILED', completed_at=timezone.now()
+        )
+    count += stale.update(status=PricingAnalysisJob.STATUS_QUEUED, worker='')
+    return count
+
+
+def claim_next_job(worker: str) -> Optional[PricingAnalysisJob]:
+    """
+    Claim the oldest queued job.
+
+    SKIP LOCKED lets concurrent workers claim different jobs without waiting
+    on each other. Backends without row locks (SQLite) fall back to the
+    conditional status update, which only one worker can win.
+
+    Args:
+        worker: Identifier of the claiming worker
+
+    Returns:
+        The claimed job (now RUNNING), or None if the queue is empty
+    """
+    with transaction.atomic():
+        job = (
+            PricingAnalysisJob.objects.select_for_update(skip_locked=True)
+            .filter(status=PricingAnalysisJob.STATUS_QUEUED)
+            .order_by('created_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = PricingAnalysisJob.objects.filter(
+            pk=job.pk, status=PricingAnalysisJob.STATUS_QUEUED
+        ).update(
+            status=PricingAnalysisJob.STATUS_RUNNING,
+            worker=worker,
+            claimed_at=now,
+            heartbeat_at=now,
+            attempts=job.attempts + 1,
+            updated_at=now,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def renew_lease(job: PricingAnalysisJob):
+    """
+    Renew the heartbeat of a running job.
+
+    Args:
+        job: Job claimed by this worker
+
+    Raises:
+        JobLeaseLostError: If the job was requeued and claimed by another worker
+    """
+    renewed = PricingAnalysisJob.objects.filter(
+        pk=job.pk,
+        status=PricingAnalysisJob.STATUS_RUNNING,
+        worker=job.worker,
+        attempts=job.attempts,
+    ).update(heartbeat_at=timezone.now())
+    if not renewed:
+        raise JobLeaseLostError(f'Job {job.pk} was taken over by another worker')
+
+
+def run_job(job: PricingAnalysisJob, service=None) -> Optional[PricingAnalysisJob]:
+    """
+    Process the batch of a claimed job and record the outcome.
+
+    The job lease is renewed before every group of ASINs. If another worker
+    took the job over, processing stops and the job is left to that worker.
+    Errors, including failing to build the service (e.g. no active Keepa
+    configuration), fail the job instead of reaching the worker loop.
+
+    Args:
+        job: Job returned by claim_next_job
+        service: Optional PricingAnalysisService (a new one by default)
+
+    Returns:
+        The finished job (DONE or FAILED), or None if its lease was lost
+    """
+    try:
+        service = service or PricingAnalysisService(background=True)
+        service.process_batch(
+            job.batch,
+            shipping_cost_mxn=job.shipping_cost_mxn,
+            force_refresh=job.force_refresh,
+            heartbeat=lambda: renew_lease(job),
+        )
+        job.status = PricingAnalysisJob.STATUS_DONE
+        job.error = ''
+    except JobLeaseLostError as e:
+        logger.warning('%s; stopping', e)
+        return None
+    except Exception as e:
+        logger.exception('Pricing job %s failed', job.pk)
+        job.status = PricingAnalysisJob.STATUS_FAILED
+        job.error = str(e)
+        PricingAnalysisBatch.objects.filter(pk=job.batch_id).exclude(status='FAILED').update(
+            status='FAILED', completed_at=timezone.now()
+        )
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+    return job
@@ -0,0 +1,264 @@
+"""
+Keepa Client
+
+Thin wrapper around keepa.Keepa that tracks Keepa's live token bucket:
+- Records tokensLeft / refillRate / refillIn from every response
+- Projects the tokens available at any moment
+- Paces requests by sleeping exactly until enough tokens have refilled
+- Reuses HTTP connections through a pooled requests.Session
+- Keeps one client per API key for the whole process
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import keepa
+import requests
+from keepa.interface import SCODES
+
+from .exceptions import TokenLimitExceededError
+
+
+class KeepaTokenBucket:
+    """
+    Local projection of the Keepa token bucket.
+
+    Keepa adds `refillRate` tokens every minute (the next refill happens in
+    `refillIn` ms) up to one hour of refills. Requests deduct their estimated
+    cost locally and every response resets the projection with the real value.
+    """
+
+    REFILL_PERIOD_SECONDS = 60
+    # Keepa keeps at most one hour worth of refills
+    MAX_REFILL_PERIODS = 60
+
+    def __init__(self):
+        """Initialize an empty bucket (unknown state never blocks requests)."""
+        self._lock = threading.Lock()
+        self.tokens_left = None
+        self.refill_rate = None
+        self.next_refill_at = None
+
+    @property
+    def is_known(self) -> bool:
+        """Whether a Keepa response has been recorded yet."""
+        return bool(self.refill_rate) and self.tokens_left is not None
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of tokens the bucket can hold."""
+        return self.refill_rate * self.MAX_REFILL_PERIODS
+
+    def update(self, response: dict, now: Optional[float] = None):
+        """
+        Record the token state returned by a Keepa response.
+
+        Args:
+            response: Parsed Keepa response (any endpoint)
+            now: Optional current time (time.time())
+        """
+        if not isinstance(response, dict) or 'tokensLeft' not in response:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self.tokens_left = response['tokensLeft']
+            if response.get('refillRate'):
+                self.refill_rate = response['refillRate']
+            if response.get('refillIn') is not None:
+                self.next_refill_at = now + response['refillIn'] / 1000.0
+
+    def _refills_until(self, moment: float) -> int:
+        """Number of refills that happen between the last update and `moment`."""
+        if self.next_refill_at is None or moment < self.next_refill_at:
+            return 0
+        return 1 + int((moment - self.next_refill_at) // self.REFILL_PERIOD_SECONDS)
+
+    def _projected_tokens(self, moment: float) -> int:
+        """Tokens expected to be available at `moment`."""
+        tokens = self.tokens_left + self._refills_until(moment) * self.refill_rate
+        return min(tokens, max(self.capacity, self.tokens_left))
+
+    def _seconds_until(self, required: int, now: float) -> float:
+        """Seconds until `required` tokens are available."""
+        available = self._projected_tokens(now)
+        if available >= required:
+            return 0.0
+        periods = math.ceil((required - available) / self.refill_rate)
+        next_refill = self.next_refill_at
+        if next_refill is None:
+            next_refill = now + self.REFILL_PERIOD_SECONDS
+        elif next_refill <= now:
+            # Roll the refill schedule forward to the first refill after now
+            elapsed = now - next_refill
+            next_refill = now + self.REFILL_PERIOD_SECONDS - elapsed % self.REFILL_PERIOD_SECONDS
+        return next_refill + (periods - 1) * self.REFILL_PERIOD_SECONDS - now
+
+    def estimate_seconds(self, tokens: int, now: Optional[float] = None) -> float:
+        """
+        Projected time to spend `tokens` tokens at the current refill rate.
+
+        Args:
+            tokens: Total tokens still needed
+            now: Optional current time (time.time())
+
+        Returns:
+            Seconds until enough tokens will have been available (0 if unknown)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self.is_known or tokens <= 0:
+                return 0.0
+            return self._seconds_until(tokens, now)
+
+    def affordable_requests(self, cost: int, now: Optional[float] = None) -> Optional[int]:
+        """
+        Number of requests of `cost` tokens that can be sent without waiting.
+
+        Args:
+            cost: Estimated cost of one request
+            now: Optional current time (time.time())
+
+        Returns:
+            Number of requests (None if the bucket state is unknown)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self.is_known:
+                return None
+            cost = max(1, min(cost, self.capacity))
+            return max(0, self._projected_tokens(now) // cost)
+
+    def acquire(self, tokens: int, max_wait: float, sleep=time.sleep) -> float:
+        """
+        Wait until `tokens` tokens are available and deduct them.
+
+        The deduction happens before sleeping so concurrent callers queue
+        behind each other instead of waking up at the same refill.
+
+        Args:
+            tokens: Estimated cost of the request
+            max_wait: Maximum seconds to wait
+            sleep: Sleep function (injectable for tests)
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            TokenLimitExceededError: If the wait would exceed max_wait
+        """
+        now = time.time()
+        with self._lock:
+            if not self.is_known:
+                return 0.0
+            # A single request may exceed the capacity; Keepa lets the balance go negative
+            required = min(tokens, self.capacity)
+            wait = self._seconds_until(required, now)
+            if wait > max_wait:
+                raise TokenLimitExceededError(
+                    f'Keepa token bucket needs {wait:.0f}s to refill '
+                    f'{required} tokens (max wait {max_wait:.0f}s)',
+                    retry_after=math.ceil(wait),
+                )
+            self.tokens_left -= tokens
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+
+class KeepaClient(keepa.Keepa):
+    """keepa.Keepa with a pooled HTTP session that feeds a KeepaTokenBucket."""
+
+    def __init__(self, accesskey, token_bucket: Optional[KeepaTokenBucket] = None, **kwargs):
+        """
+        Initialize the client.
+
+        Args:
+            accesskey: Keepa API key
+            token_bucket: Bucket to update (a new one is created if omitted)
+        """
+        self.token_bucket = token_bucket or KeepaTokenBucket()
+        self.session = requests.Session()
+        super().__init__(accesskey, **kwargs)
+
+    def _request(self, request_type, payload, wait=True, raw_response=False):
+        """
+        Query the Keepa API server.
+
+        Same behavior as keepa.Keepa._request but sent through the client's
+        session (keep-alive connections) and recording the token state of
+        every response.
+        """
+        if wait:
+            self.wait_for_tokens()
+
+        while True:
+            raw = self.session.get(
+                f'https://api.keepa.com/{request_type}/?',
+                params=payload,
+                timeout=self._timeout,
+            )
+            status_code = str(raw.status_code)
+            if status_code != '200':
+                if status_code in SCODES:
+                    if status_code == '429' and wait:
+                        self.wait_for_tokens()
+                        continue
+                    raise RuntimeError(SCODES[status_code])
+                raise RuntimeError(f'REQUEST_FAILED: {status_code}')
+            break
+
+        response = raw.json()
+        self.token_bucket.update(response)
+
+        if response.get('error'):
+            raise Exception(response['error']['message'])
+
+        self.tokens_left = response['tokensLeft']
+
+        if raw_response:
+            return raw
+        return response
+
+
+_clients: Dict[str, KeepaClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_keepa_client(api_key: str) -> KeepaClient:
+    """
+    Get the process-wide Keepa client for an API key.
+
+    The client (and its token bucket and HTTP connections) is created on
+    first use and shared by every KeepaService in the process.
+
+    Args:
+        api_key: Keepa API key
+
+    Returns:
+        KeepaClient instance
+    """
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = KeepaClient(api_key)
+            _clients[api_key] = client
+        return client
+
+
+def clear_keepa_clients(keep: Iterable[str] = ()):
+    """
+    Drop the cached clients (e.g. after the configuration changed).
+
+    Sessions are not closed: services created before the change may still be
+    sending requests through them. A dropped client releases its connections
+    once the last service using it is garbage collected.
+
+    Args:
+        keep: API keys whose clients stay cached
+    """
+    keep = set(keep)
+    with _clients_lock:
+        for api_key in [api_key for api_key in _clients if api_key not in keep]:
+            del _clients[api_key]
@@ -0,0 +1,276 @@
+"""
+Keepa Key Pool
+
+Spreads Keepa requests across every active KeepaConfiguration:
+- Tracks each key's daily budget, reservation and live token bucket
+- Assigns each query to the key that can serve it soonest (round-robin on ties)
+- Fails over to another key when one runs out of tokens
+"""
+
+import threading
+from typing import Iterable, List, Optional
+
+from apps.pricing_analysis.models import KeepaConfiguration
+
+
+class KeepaKey:
+    """One Keepa subscription: configuration row, shared client and reservation."""
+
+    def __init__(self, config: KeepaConfiguration, client):
+        """
+        Initialize the key.
+
+        Args:
+            config: KeepaConfiguration row (private copy for this service)
+            client: Process-wide KeepaClient for the API key
+        """
+        self.config = config
+        self.api = client
+        self.token_bucket = client.token_bucket
+        # Tokens reserved up front by a reservation and not yet spent
+        self.reserved_tokens = 0
+        self.reservation_date = None
+        # Tokens and bucket cost of queries assigned but not yet sent
+        self.planned_tokens = 0
+        self.planned_cost = 0
+
+    @property
+    def label(self) -> str:
+        """Masked API key for logs."""
+        return f'{self.config.api_key[:8]}...'
+
+    @property
+    def remaining_tokens(self) -> int:
+        """Daily tokens still available to this service (from the last known counter)."""
+        return self.reserved_tokens + max(
+            0, self.config.daily_token_limit - self.config.tokens_used_today
+        )
+
+    def check_token_availability(self, required_tokens: int) -> bool:
+        """
+        Check today's budget for this key.
+
+        Tokens covered by the reservation are checked in memory without a
+        database round trip.
+
+        Args:
+            required_tokens: Number of tokens required
+
+        Returns:
+            True if tokens are available, False otherwise
+        """
+        if required_tokens <= self.reserved_tokens:
+            return True
+        self.config.refresh_from_db()
+        return self.config.can_consume_tokens(required_tokens - self.reserved_tokens)
+
+    def consume_tokens(self, tokens: int):
+        """
+        Record tokens spent with this key, taking them from the reservation first.
+
+        Args:
+            tokens: Number of tokens spent
+        """
+        from_reservation = min(tokens, self.reserved_tokens)
+        self.reserved_tokens -= from_reservation
+        if tokens > from_reservation:
+            self.config.consume_tokens(tokens - from_reservation)
+
+    def reserve_tokens(self, tokens: int) -> int:
+        """
+        Reserve up to `tokens` tokens of this key's daily budget.
+
+        Returns:
+            Number of tokens reserved
+        """
+        granted = self.config.reserve_tokens(tokens)
+        self.reserved_tokens += granted
+        self.reservation_date = self.config.last_reset_date
+        return granted
+
+    def release_tokens(self):
+        """Return the unused part of the reservation."""
+        unused = self.reserved_tokens
+        self.reserved_tokens = 0
+        self.config.release_tokens(unused, reset_date=self.reservation_date)
+
+
+class KeepaKeyPool:
+    """Assigns Keepa queries to the active keys."""
+
+    def __init__(self, keys: List[KeepaKey]):
+        """
+        Initialize the pool.
+
+        Args:
+            keys: Keys to spread requests over (the first one is the primary)
+        """
+        self.keys = keys
+        self._next_index = 0
+        self._lock = threading.Lock()
+
+    @property
+    def primary(self) -> KeepaKey:
+        """Key used for configuration-level defaults."""
+        return self.keys[0]
+
+    @property
+    def reserved_tokens(self) -> int:
+        """Tokens reserved across all keys."""
+        return sum(key.reserved_tokens for key in self.keys)
+
+    def _rotated_keys(self) -> List[KeepaKey]:
+        """Keys starting at the round-robin cursor."""
+        index = self._next_index % len(self.keys)
+        return self.keys[index:] + self.keys[:index]
+
+    def _advance(self, key: KeepaKey):
+        """Move the round-robin cursor past the chosen key."""
+        self._next_index = self.keys.index(key) + 1
+
+    def acquire_key(self, tokens: int, cost: int) -> Optional[KeepaKey]:
+        """
+        Choose the key for a query and plan the tokens on it.
+
+        Picks, among keys whose daily budget covers the query, the one whose
+        token bucket serves it soonest; ties go round-robin. May hit the
+        database, so only call it from the main thread.
+
+        Args:
+            tokens: Daily budget tokens the query consumes
+            cost: Bucket tokens the query consumes
+
+        Returns:
+            KeepaKey, or None if every key is exhausted
+        """
+        best = None
+        best_score = None
+        for key in self._rotated_keys():
+            if not key.check_token_availability(key.planned_tokens + tokens):
+                continue
+            score = (
+                key.token_bucket.estimate_seconds(key.planned_cost + cost),
+                key.planned_tokens - key.remaining_tokens,
+            )
+            if best_score is None or score < best_score:
+                best, best_score = key, score
+
+        if best is not None:
+            with self._lock:
+                best.planned_tokens += tokens
+                best.planned_cost += cost
+            self._advance(best)
+        return best
+
+    def failover_key(
+        self,
+        tokens: int,
+        cost: int,
+        max_wait: float,
+        exclude: Iterable[KeepaKey] = ()
+    ) -> Optional[KeepaKey]:
+        """
+        Choose another key after a query ran out of tokens.
+
+        Uses only in-memory state so it is safe from worker threads.
+
+        Args:
+            tokens: Daily budget tokens the query consumes
+            cost: Bucket tokens the query consumes
+            max_wait: Maximum acceptable bucket wait in seconds
+            exclude: Keys already tried
+
+        Returns:
+            KeepaKey, or None if no other key can serve the query
+        """
+        exclude = set(exclude)
+        with self._lock:
+            candidates = []
+            for key in self.keys:
+                if key in exclude or key.remaining_tokens - key.planned_tokens < tokens:
+                    continue
+                wait = key.token_bucket.estimate_seconds(key.planned_cost + cost)
+                if wait <= max_wait:
+                    candidates.append(
+                        (wait, key.planned_tokens - key.remaining_tokens, self.keys.index(key), key)
+                    )
+            if not candidates:
+                return None
+            key = min(candidates)[-1]
+            key.planned_tokens += tokens
+            key.planned_cost += cost
+            return key
+
+    def reset_plan(self):
+        """Forget planned tokens once the planned queries have run."""
+        with self._lock:
+            for key in self.keys:
+                key.planned_tokens = 0
+                key.planned_cost = 0
+
+    def reserve_tokens(self, tokens: int) -> int:
+        """
+        Reserve tokens across keys, largest remaining budget first.
+
+        Returns:
+            Total tokens reserved
+        """
+        granted = 0
+        for key in sorted(self.keys, key=lambda key: -key.remaining_tokens):
+            if granted >= tokens:
+                break
+            granted += key.reserve_tokens(tokens - granted)
+        return granted
+
+    def release_tokens(self):
+        """Release every key's unused reservation."""
+        for key in self.keys:
+            key.release_tokens()
+
+    def estimate_seconds(self, cost: int) -> float:
+        """
+        Projected time to spend `cost` bucket tokens spread over the keys.
+
+        The work is split proportionally to each key's refill rate.
+
+        Args:
+            cost: Total bucket tokens still needed
+
+        Returns:
+            Estimated seconds (0 if no bucket state is known yet)
+        """
+        known = [key for key in self.keys if key.token_bucket.is_known]
+        if not known or cost <= 0:
+            return 0.0
+        total_rate = sum(key.token_bucket.refill_rate for key in known)
+        return max(
+            key.token_bucket.estimate_seconds(-(-cost * key.token_bucket.refill_rate // total_rate))
+            for key in known
+        )
+
+    def affordable_queries(self, cost: int) -> Optional[int]:
+        """
+        Number of queries of `cost` bucket tokens the keys can send right away.
+
+        Every key counts for at least one query, since a single query only
+        waits on its bucket for the next refill.
+
+        Args:
+            cost: Bucket cost of one query
+
+        Returns:
+            Number of queries (None if no bucket state is known yet)
+        """
+        known = [key for key in self.keys if key.token_bucket.is_known]
+        if not known:
+            return None
+        unknown = len(self.keys) - len(known)
+        return unknown + sum(
+            max(1, key.token_bucket.affordable_requests(cost)) for key in known
+        )
+
+    def usage_summary(self) -> str:
+        """Used/limit token totals across keys for error messages."""
+        used = sum(key.config.tokens_used_today for key in self.keys)
+        limit = sum(key.config.daily_token_limit for key in self.keys)
+        return f'{used}/{limit}'
@@ -0,0 +1,250 @@
+"""
+Keepa Resilience
+
+Failure handling around Keepa calls:
+- Retry policy with jittered exponential backoff for transient errors
+- Process-wide circuit breaker that fast-fails calls while Keepa is unhealthy
+- Counters to observe both (retries, failures, short-circuited calls, ...)
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+import requests
+from django.conf import settings
+
+from .exceptions import KeepaUnavailableError
+
+
+class KeepaCounters:
+    """Thread-safe event counters for Keepa calls."""
+
+    def __init__(self):
+        """Initialize empty counters."""
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def increment(self, name: str, amount: int = 1):
+        """Add `amount` to the counter `name`."""
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        """Current value of every counter."""
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        """Set every counter back to zero."""
+        with self._lock:
+            self._counts.clear()
+
+
+keepa_counters = KeepaCounters()
+
+
+class KeepaRetryPolicy:
+    """Bounded retries with full-jitter exponential backoff."""
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        sleep=time.sleep,
+        counters: KeepaCounters = keepa_counters
+    ):
+        """
+        Initialize the policy (defaults come from the KEEPA_RETRY_* settings).
+
+        Args:
+            max_attempts: Total attempts per call, including the first one
+            base_delay: Backoff of the first retry in seconds
+            max_delay: Maximum backoff in seconds
+            sleep: Sleep function (injectable for tests)
+            counters: Counters to record retries in
+        """
+        self.max_attempts = max_attempts or settings.KEEPA_RETRY_MAX_ATTEMPTS
+        self.base_delay = settings.KEEPA_RETRY_BASE_DELAY_SECONDS if base_delay is None else base_delay
+        self.max_delay = settings.KEEPA_RETRY_MAX_DELAY_SECONDS if max_delay is None else max_delay
+        self.sleep = sleep
+        self.counters = counters
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """
+        Whether an error is transient.
+
+        Connection errors, timeouts and unexpected HTTP statuses (5xx) are
+        retried; rejected requests, payment and token errors are not.
+        """
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        return isinstance(error, RuntimeError) and str(error).startswith('REQUEST_FAILED')
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """
+        Decide whether to retry after a failed attempt.
+
+        Args:
+            error: Error raised by the attempt
+            attempt: Number of the failed attempt (0-based)
+
+        Returns:
+            True if the call should be attempted again
+        """
+        if not self.is_retryable(error):
+            return False
+        if attempt + 1 >= self.max_attempts:
+            self.counters.increment('retries_exhausted')
+            return False
+        return True
+
+    def wait(self, attempt: int):
+        """Sleep the backoff of retry number `attempt` and count the retry."""
+        self.counters.increment('retries')
+        self.sleep(self.backoff(attempt))
+
+
+class KeepaCircuitBreaker:
+    """
+    Circuit breaker shared by every Keepa call in the process.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail immediately with KeepaUnavailableError. Once `reset_seconds`
+    have passed a single probe call is let through: success closes the
+    circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+        clock=time.monotonic,
+        counters: KeepaCounters = keepa_counters
+    ):
+        """
+        Initialize a closed breaker (defaults come from the KEEPA_CIRCUIT_* settings).
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: Seconds the circuit stays open before a probe
+            clock: Monotonic clock (injectable for tests)
+            counters: Counters to record breaker events in
+        """
+        self.failure_threshold = failure_threshold or settings.KEEPA_CIRCUIT_FAILURE_THRESHOLD
+        self.reset_seconds = settings.KEEPA_CIRCUIT_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.clock = clock
+        self.counters = counters
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Close the circuit and forget past failures."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """Current state (an open circuit past reset_seconds reports half-open)."""
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being short-circuited."""
+        return self.state == self.OPEN
+
+    def before_request(self):
+        """
+        Check whether a call may be sent.
+
+        Raises:
+            KeepaUnavailableError: If the circuit is open
+        """
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_seconds:
+                self._state = self.HALF_OPEN
+            if self._state == self.OPEN or (self._state == self.HALF_OPEN and self._probe_in_flight):
+                self.counters.increment('short_circuited')
+                raise KeepaUnavailableError(
+                    f'Keepa circuit open after {self._failures} consecutive failures; '
+                    f'retrying in {self._seconds_until_probe():.0f}s'
+                )
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = True
+
+    def _seconds_until_probe(self) -> float:
+        """Seconds until the open circuit lets a probe through."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (self.clock() - self._opened_at))
+
+    def release_probe(self):
+        """Free the probe slot of a call that ended without a verdict (e.g. key failover)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        """Record a successful call (closes a half-open circuit)."""
+        self.counters.increment('successes')
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self.counters.increment('circuit_closed')
+
+    def record_failure(self):
+        """Record a failed call (may open the circuit)."""
+        self.counters.increment('failures')
+        with self._lock:
+            self._failures += 1
+            was_probe = self._state == self.HALF_OPEN
+            self._probe_in_flight = False
+            if was_probe or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+                self.counters.increment('circuit_opened')
+
+
+_circuit_breaker: Optional[KeepaCircuitBreaker] = None
+_circuit_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> KeepaCircuitBreaker:
+    """Get the process-wide Keepa circuit breaker."""
+    global _circuit_breaker
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = KeepaCircuitBreaker()
+        return _circuit_breaker
+
+
+def get_keepa_health() -> dict:
+    """
+    Snapshot of Keepa call health for monitoring.
+
+    Returns:
+        Dictionary with the circuit state and every counter
+    """
+    return {
+        'circuit_state': get_circuit_breaker().state,
+        'counters': keepa_counters.snapshot(),
+    }
@@ -9,24 +9,32 @@ Handles all interactions with Keepa API including:
 - Token tracking
 """
 
+import copy
+import threading
 import time
-import json
 import math
-import numpy as np
-from datetime import datetime, date, time as dt_time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, date, time as dt_time, timedelta
 from decimal import Decimal
-from typing import List, Dict, Tuple, Optional, Any
-from django.core.serializers.json import DjangoJSONEncoder
+from typing import Callable, List, Dict, Set, Tuple, Optional, Any
 from django.conf import settings
-import keepa
+from django.db import transaction
+from django.utils import timezone
 
 from apps.pricing_analysis.models import (
     KeepaConfiguration,
     KeepaProductData,
-    KeepaAPILog,
 )
 from apps.products.models import Product
-from .exceptions import KeepaAPIError, TokenLimitExceededError
+from .api_log import log_keepa_api_call
+from .exceptions import KeepaAPIError, KeepaUnavailableError, TokenLimitExceededError
+from .fetch_lease import KeepaFetchLeases, LeaseKey
+from .keepa_client import clear_keepa_clients, get_keepa_client
+from .keepa_key_pool import KeepaKey, KeepaKeyPool
+from .keepa_resilience import KeepaRetryPolicy, get_circuit_breaker
+from .reference_data import bump_generation, get_reference_generation
+from .serialization import to_json_compatible
 
 
 class KeepaService:
@@ -38,21 +46,81 @@ class KeepaService:
         'MX': 'MX',  # Amazon.com.mx
     }
     BUYBOX_OWNER_SELLER_ID = 'A1ZOPWBOS19F82'
+    # Keepa accepts up to 100 ASINs per product request
+    BULK_QUERY_LIMIT = 100
+    # Seconds between heartbeats while concurrent queries wait for tokens
+    HEARTBEAT_INTERVAL_SECONDS = 60
+    # Product request cost: 1 token per product plus 2 for buybox data
+    TOKENS_PER_PRODUCT = 3
+    # SKU prefix of products auto-created from Keepa data
+    PRODUCT_SKU_PREFIX = 'KEEPA-'
+
+    # Fetch profiles: "full" keeps the price history (detail chart), "lean"
+    # only returns what _build_keepa_fields and the listings read
+    PROFILE_FULL = 'full'
+    PROFILE_LEAN = 'lean'
+    FETCH_PROFILES = {
+        PROFILE_FULL: {'history': True, 'buybox': True, 'stats': 30},
+        PROFILE_LEAN: {'history': False, 'buybox': True, 'stats': 30},
+    }
+    # raw_data keys kept by the lean profile
+    LEAN_RAW_DATA_KEYS = (
+        'asin', 'title', 'brand', 'categoryTree', 'imagesCSV',
+        'buyBoxSellerId', 'salesRankReference',
+    )
+    LEAN_STATS_KEYS = (
+        'current', 'avg30', 'avg90', 'buyBoxPrice', 'buyBoxShipping',
+        'buyBoxCount', 'buyBoxCount30', 'salesRankDrops30',
+    )
+    # Indexes of Keepa csv/stats arrays read for current prices
+    PRICE_INDEXES = {
+        'AMAZON': 0,
+        'NEW': 1,
+        'SALES': 3,
+        'BUY_BOX_SHIPPING': 18,
+    }
+
+    # Process-wide cache of the active configurations, versioned by the
+    # KEEPA_CONFIG_GENERATION_KEY counter that signals bump on every
+    # KeepaConfiguration change so all processes reload (and drop rotated keys)
+    KEEPA_CONFIG_GENERATION_KEY = 'keepa_configuration'
+    _cached_configs = None
+    _cached_configs_generation = None
+    _config_lock = threading.Lock()
 
-    def __init__(self):
-        """Initialize Keepa API client."""
-        self.config = self._get_active_config()
-        self.api = keepa.Keepa(self.config.api_key)
+    def __init__(self, background: bool = False):
+        """
+        Initialize the pool of Keepa API clients (one per active key).
+
+        Args:
+            background: Whether the service runs outside a web request (job
+                workers); only then may requests wait up to
+                KEEPA_MAX_TOKEN_WAIT_SECONDS for tokens. Request paths wait at
+                most KEEPA_INTERACTIVE_TOKEN_WAIT_SECONDS and fail with
+                TokenLimitExceededError (with retry_after) instead.
+        """
+        self.pool = KeepaKeyPool([
+            KeepaKey(config, get_keepa_client(config.api_key))
+            for config in self._get_active_configs()
+        ])
+        self.config = self.pool.primary.config
+        self.api = self.pool.primary.api
+        self.token_bucket = self.pool.primary.token_bucket
+        self.max_concurrency = max(1, getattr(settings, 'KEEPA_MAX_CONCURRENCY', 1))
+        if background:
+            self.max_token_wait = getattr(settings, 'KEEPA_MAX_TOKEN_WAIT_SECONDS', 300)
+        else:
+            self.max_token_wait = getattr(settings, 'KEEPA_INTERACTIVE_TOKEN_WAIT_SECONDS', 10)
+        self.fetch_leases = KeepaFetchLeases()
+        self.retry_policy = KeepaRetryPolicy()
+        self.circuit_breaker = get_circuit_breaker()
 
     @staticmethod
     def _convert_to_json_serializable(obj: Any) -> Any:
         """
         Convert Keepa data to JSON-serializable format.
-        Handles numpy arrays, datetime objects, and other non-serializable types.
-
-        This uses a two-pass approach:
-        1. First pass: convert numpy arrays and basic types recursively
-        2. Second pass: use DjangoJSONEncoder to handle datetime and other Django types
+        Handles numpy arrays, datetime objects, and other non-serializable types
+        in a single pass (see services.serialization.to_json_compatible).
 
         Args:
             obj: Object to convert
@@ -60,68 +128,58 @@ class KeepaService:
         Returns:
             JSON-serializable version of the object
         """
-        # First pass: handle numpy arrays and recurse through structures
-        def first_pass(value):
-            if isinstance(value, np.ndarray):
-                return first_pass(value.tolist())
-            elif isinstance(value, (np.integer, np.floating)):
-                if isinstance(value, np.floating) and (np.isnan(value) or np.isinf(value)):
-                    return None
-                return value.item()
-            elif isinstance(value, float):
-                return None if math.isnan(value) or math.isinf(value) else value
-            elif isinstance(value, (bytes, bytearray)):
-                try:
-                    return value.decode('utf-8', errors='ignore')
-                except Exception:
-                    return str(value)
-            elif value.__class__.__name__ == 'DataFrame' and value.__class__.__module__.startswith('pandas'):
-                try:
-                    return first_pass(value.to_dict(orient='list'))
-                except Exception:
-                    return {}
-            elif value.__class__.__name__ == 'Series' and value.__class__.__module__.startswith('pandas'):
-                try:
-                    return first_pass(value.to_list())
-                except Exception:
-                    return []
-            elif isinstance(value, dict):
-                return {k: first_pass(v) for k, v in value.items()}
-            elif isinstance(value, (list, tuple)):
-                return [first_pass(item) for item in value]
-            else:
-                return value
-
-        # Apply first pass
-        converted = first_pass(obj)
-
-        # Preserve imagesCSV even if full serialization fails
-        images_csv = ''
-        if isinstance(obj, dict) and isinstance(obj.get('imagesCSV'), str):
-            images_csv = obj.get('imagesCSV', '')
-
-        # Second pass: use DjangoJSONEncoder to handle datetime and convert back
-        try:
-            json_str = json.dumps(converted, cls=DjangoJSONEncoder, allow_nan=False)
-            return json.loads(json_str)
-        except (TypeError, ValueError) as e:
-            # If still failing, log and return minimal payload
-            print(f"Warning: Could not serialize Keepa data: {e}")
-            return {'imagesCSV': images_csv} if images_csv else {}
-
-    def _get_active_config(self) -> KeepaConfiguration:
-        """Get the active Keepa configuration."""
-        try:
-            return KeepaConfiguration.objects.get(is_active=True)
-        except KeepaConfiguration.DoesNotExist:
-            raise KeepaAPIError(
-                'No active Keepa configuration found. '
-                'Please configure Keepa API key in the admin panel.'
-            )
+        return to_json_compatible(obj)
+
+    def _get_active_configs(self) -> List[KeepaConfiguration]:
+        """
+        Get every active Keepa configuration.
+
+        The rows are cached per process until the configuration generation
+        changes; reloading them drops the clients of keys that are no longer
+        active. Each service gets its own copies so token counters refreshed
+        by one request do not leak into another.
+        """
+        cls = type(self)
+        generation = get_reference_generation(cls.KEEPA_CONFIG_GENERATION_KEY)
+        with cls._config_lock:
+            cached = cls._cached_configs
+            if cached is None or cls._cached_configs_generation != generation:
+                cached = list(KeepaConfiguration.objects.filter(is_active=True))
+                clear_keepa_clients(keep=[config.api_key for config in cached])
+                if not cached:
+                    raise KeepaAPIError(
+                        'No active Keepa configuration found. '
+                        'Please configure Keepa API key in the admin panel.'
+                    )
+                cls._cached_configs = cached
+                cls._cached_configs_generation = generation
+        return [copy.copy(config) for config in cached]
+
+    @classmethod
+    def clear_cached_config(cls):
+        """Forget this process' cached active configurations."""
+        with cls._config_lock:
+            cls._cached_configs = None
+            cls._cached_configs_generation = None
+
+    @classmethod
+    def bump_config_generation(cls):
+        """Make every process reload the Keepa configuration."""
+        cls.clear_cached_config()
+        bump_generation(cls.KEEPA_CONFIG_GENERATION_KEY)
+
+    @property
+    def reserved_tokens(self) -> int:
+        """Tokens reserved by token_reservation() and not yet spent."""
+        return self.pool.reserved_tokens
+
+    def _token_limit_message(self) -> str:
+        """Error message for an exhausted daily budget."""
+        return f'Keepa API token limit exceeded. Used: {self.pool.usage_summary()}'
 
     def check_token_availability(self, required_tokens: int = 1) -> bool:
         """
-        Check if there are enough tokens available.
+        Check if any active key has enough tokens available.
 
         Args:
             required_tokens: Number of tokens required for the operation
@@ -129,20 +187,183 @@ class KeepaService:
         Returns:
             True if tokens are available, False otherwise
         """
-        self.config.refresh_from_db()
-        return self.config.can_consume_tokens(required_tokens)
+        return any(key.check_token_availability(required_tokens) for key in self.pool.keys)
+
+    def consume_tokens(self, tokens: int, key: Optional[KeepaKey] = None):
+        """
+        Record tokens spent by a Keepa request.
+
+        Tokens are taken from the key's reservation first and only the rest is
+        added to its shared counter.
+
+        Args:
+            tokens: Number of tokens spent
+            key: Key that served the request (defaults to the primary key)
+        """
+        (key or self.pool.primary).consume_tokens(tokens)
+
+    @contextmanager
+    def token_reservation(self, tokens: int):
+        """
+        Reserve tokens for a run of requests and release the unused ones.
+
+        Reserves as many of the requested tokens as today's budgets allow,
+        spread over the active keys. Requests beyond the reservation fall back
+        to the shared counters.
+
+        Args:
+            tokens: Number of tokens to reserve
+
+        Yields:
+            Number of tokens reserved
+        """
+        granted = self.pool.reserve_tokens(tokens)
+        try:
+            yield granted
+        finally:
+            self.pool.release_tokens()
+
+    def tuned_concurrency(self, asin_count: Optional[int] = None) -> int:
+        """
+        Number of queries worth sending concurrently given the token buckets.
+
+        Only queries the buckets can afford right away run in parallel; more
+        threads would just sleep on the bucket until the next refill. With a
+        full bucket (refills would be wasted) up to max_concurrency run at once.
+
+        Args:
+            asin_count: ASINs per query (default BULK_QUERY_LIMIT)
+
+        Returns:
+            Concurrency between 1 and max_concurrency (max_concurrency while
+            no bucket state is known yet)
+        """
+        asin_count = asin_count or self.BULK_QUERY_LIMIT
+        affordable = self.pool.affordable_queries(asin_count * self.TOKENS_PER_PRODUCT)
+        if affordable is None:
+            return self.max_concurrency
+        return max(1, min(self.max_concurrency, affordable))
+
+    def estimate_completion_seconds(self, asin_count: int, marketplaces: int = 2) -> float:
+        """
+        Projected time to fetch `asin_count` ASINs given Keepa's token bucket.
+
+        Args:
+            asin_count: Number of ASINs still to fetch
+            marketplaces: Number of marketplaces fetched per ASIN
+
+        Returns:
+            Estimated seconds (0 if no bucket state is known yet)
+        """
+        return self.pool.estimate_seconds(asin_count * marketplaces * self.TOKENS_PER_PRODUCT)
+
+    def get_max_age(self, marketplace: str, max_age: Optional[timedelta] = None) -> timedelta:
+        """
+        Resolve how old a stored KeepaProductData row may be before refetching.
+
+        Args:
+            marketplace: 'US' or 'MX'
+            max_age: Optional explicit override
+
+        Returns:
+            Maximum accepted age (timedelta(0) disables the cache)
+        """
+        if max_age is not None:
+            return max_age
+        ttl_minutes = getattr(settings, 'KEEPA_DATA_TTL_MINUTES', {}).get(marketplace, 0)
+        return timedelta(minutes=ttl_minutes)
+
+    def get_fresh_product_data(
+        self,
+        asins: List[str],
+        marketplace: str = 'US',
+        max_age: Optional[timedelta] = None,
+        profile: str = PROFILE_FULL
+    ) -> Dict[str, KeepaProductData]:
+        """
+        Load stored KeepaProductData rows that are still fresh.
+
+        Lean rows only satisfy lean requests; full rows satisfy both.
+
+        Args:
+            asins: List of ASINs
+            marketplace: Marketplace code
+            max_age: Optional max age override (defaults to marketplace TTL)
+            profile: Fetch profile the caller needs
+
+        Returns:
+            Dictionary mapping ASIN to fresh KeepaProductData
+        """
+        max_age = self.get_max_age(marketplace, max_age)
+        if max_age <= timedelta(0) or not asins:
+            return {}
+
+        fresh_rows = KeepaProductData.objects.select_related('product').filter(
+            asin__in=asins,
+            marketplace=marketplace,
+            last_synced_at__gte=timezone.now() - max_age,
+        )
+        if profile == self.PROFILE_FULL:
+            fresh_rows = fresh_rows.filter(fetch_profile=self.PROFILE_FULL)
+        return {row.asin: row for row in fresh_rows}
+
+    def _join_in_flight(
+        self,
+        pending: Dict[str, List[str]],
+        profile: str = PROFILE_FULL
+    ) -> Tuple[Dict[str, Dict[str, KeepaProductData]], Set[LeaseKey]]:
+        """
+        Lease pending fetches, waiting for the ones another worker is running.
+
+        Fetches of the same (asin, marketplace) started by other workers are
+        not repeated: this waits for them to finish and reuses the rows they
+        stored. Fetches that fail or time out elsewhere stay pending.
+
+        Args:
+            pending: Dictionary mapping marketplace to ASINs about to be fetched
+            profile: Fetch profile ('full' or 'lean')
+
+        Returns:
+            Tuple of (rows stored by other workers, by marketplace and ASIN;
+            keys leased by this service, to release once fetched)
+        """
+        keys = {(asin, marketplace) for marketplace, asins in pending.items() for asin in asins}
+        leased = self.fetch_leases.acquire(keys)
+        followed = keys - leased
+
+        reused = {marketplace: {} for marketplace in pending}
+        if followed:
+            since = self.fetch_leases.wait(followed)
+            if since is not None:
+                max_age = timezone.now() - since
+                for marketplace in pending:
+                    asins = [asin for asin, target in followed if target == marketplace]
+                    if asins:
+                        reused[marketplace] = self.get_fresh_product_data(
+                            asins, marketplace, max_age, profile
+                        )
+        return reused, leased
 
     def fetch_product_data(
         self,
         asin: str,
-        marketplace: str = 'US'
+        marketplace: str = 'US',
+        max_age: Optional[timedelta] = None,
+        force_refresh: bool = False,
+        profile: str = PROFILE_FULL
     ) -> KeepaProductData:
         """
         Fetch product data from Keepa API.
 
+        Rows synced within the marketplace TTL (or max_age) are served from the
+        database without spending tokens unless force_refresh is set.
+
         Args:
             asin: Product ASIN
             marketplace: 'US' or 'MX'
+            max_age: Optional max age override for stored data
+            force_refresh: Always query Keepa, ignoring stored data
+            profile: Fetch profile ('full' or 'lean')
 
         Returns:
             KeepaProductData instance
@@ -151,100 +372,485 @@ class KeepaService:
             TokenLimitExceededError: If token limit is exceeded
             KeepaAPIError: If API call fails
         """
-        # Check token availability
-        if not self.check_token_availability(1):
-            raise TokenLimitExceededError(
-                f'Keepa API token limit exceeded. '
-                f'Used: {self.config.tokens_used_today}/{self.config.daily_token_limit}'
-            )
+        if not force_refresh:
+            cached = self.get_fresh_product_data([asin], marketplace, max_age, profile).get(asin)
+            if cached is not None:
+                return cached
+
+        reused, leased = self._join_in_flight({marketplace: [asin]}, profile)
+        if asin in reused[marketplace]:
+            return reused[marketplace][asin]
+
+        try:
+            return self._fetch_and_store_product(asin, marketplace, profile)
+        finally:
+            self.fetch_leases.release(leased)
+
+    def _fetch_and_store_product(
+        self,
+        asin: str,
+        marketplace: str,
+        profile: str = PROFILE_FULL
+    ) -> KeepaProductData:
+        """
+        Query Keepa for one ASIN and store the result.
+
+        Args:
+            asin: Product ASIN
+            marketplace: Marketplace code
+            profile: Fetch profile ('full' or 'lean')
+
+        Returns:
+            KeepaProductData instance
+
+        Raises:
+            TokenLimitExceededError: If token limit is exceeded
+            KeepaAPIError: If API call fails
+        """
+        key = self.pool.acquire_key(self.TOKENS_PER_PRODUCT, self.TOKENS_PER_PRODUCT)
+        if key is None:
+            raise TokenLimitExceededError(self._token_limit_message())
 
-        start_time = time.time()
         domain_id = self.MARKETPLACE_DOMAINS.get(marketplace, 1)
 
         try:
             # Make API call with buybox=True to get Buy Box data and stats for last 30 days
-            products = self.api.query(asin, domain=domain_id, buybox=True, stats=30)
+            products, error, execution_time_ms, key = self._run_queries(
+                [(asin, domain_id, key)], profile
+            )[0]
+        finally:
+            self.pool.reset_plan()
 
-            execution_time_ms = int((time.time() - start_time) * 1000)
+        if isinstance(error, (TokenLimitExceededError, KeepaUnavailableError)):
+            raise error
+
+        try:
+            if error is not None:
+                raise error
 
             # Log the API call
             self._log_api_call(
                 endpoint='query',
-                request_params={'asin': asin, 'domain': domain_id, 'buybox': True},
+                request_params={'asin': asin, 'domain': domain_id, 'buybox': True, 'key': key.label},
                 response_status=200,
                 response_data={'products_count': len(products) if products else 0},
-                tokens_consumed=1,
+                tokens_consumed=self.TOKENS_PER_PRODUCT,
                 execution_time_ms=execution_time_ms,
             )
 
-            # Consume token
-            self.config.consume_tokens(1)
+            self.consume_tokens(self.TOKENS_PER_PRODUCT, key)
 
             if not products or len(products) == 0:
                 # Product not found
-                return self._create_unavailable_keepa_data(asin, marketplace)
-
-            product_data = products[0]
-
-            # Skip products where buybox is already owned by this seller (MX only)
-            if marketplace == 'MX':
-                buybox_seller_id = self._get_buybox_seller_id_from_product(product_data)
-                if buybox_seller_id == self.BUYBOX_OWNER_SELLER_ID:
-                    return self._create_unavailable_keepa_data(
-                        asin,
-                        marketplace,
-                        raw_data=self._convert_to_json_serializable(product_data),
-                        sync_error_message=(
-                            f'Buybox already owned by seller {self.BUYBOX_OWNER_SELLER_ID}'
-                        ),
-                    )
+                return self._create_unavailable_keepa_data(asin, marketplace, fetch_profile=profile)
 
-            # Parse and save data
-            keepa_data = self._parse_keepa_response(
-                asin=asin,
-                marketplace=marketplace,
-                keepa_product=product_data
-            )
-
-            return keepa_data
+            return self._store_keepa_product(asin, marketplace, products[0], profile)
 
         except Exception as e:
-            execution_time_ms = int((time.time() - start_time) * 1000)
-
             # Log error
             self._log_api_call(
                 endpoint='query',
-                request_params={'asin': asin, 'domain': domain_id},
+                request_params={'asin': asin, 'domain': domain_id, 'key': key.label},
                 response_status=500,
                 response_data={},
-                tokens_consumed=1,
+                tokens_consumed=self.TOKENS_PER_PRODUCT,
                 error_message=str(e),
                 execution_time_ms=execution_time_ms,
             )
 
             raise KeepaAPIError(f'Failed to fetch data for ASIN {asin}: {str(e)}')
 
-    def _parse_keepa_response(
+    def _query_products(
+        self,
+        items,
+        domain_id: str,
+        key: Optional[KeepaKey] = None,
+        profile: str = PROFILE_FULL
+    ) -> list:
+        """
+        Run a Keepa product query.
+
+        Only performs the network request, so it is safe to call from worker
+        threads. Parsing and database writes stay with the caller. The call
+        first waits on the token bucket until the request can be afforded.
+
+        Args:
+            items: ASIN or list of ASINs
+            domain_id: Keepa domain code
+            key: Key to send the query with (defaults to the primary key)
+            profile: Fetch profile ('full' or 'lean')
+
+        Returns:
+            List of parsed Keepa products
+
+        Raises:
+            TokenLimitExceededError: If the bucket needs longer than
+                max_token_wait to refill
+        """
+        key = key or self.pool.primary
+        count = 1 if isinstance(items, str) else len(items)
+        key.token_bucket.acquire(count * self.TOKENS_PER_PRODUCT, self.max_token_wait)
+        # wait=False: pacing is handled above, skip keepa's extra status request
+        return key.api.query(
+            items,
+            domain=domain_id,
+            progress_bar=False,
+            wait=False,
+            **self.FETCH_PROFILES[profile],
+        )
+
+    @staticmethod
+    def _is_token_error(error: Exception) -> bool:
+        """Whether a query failed because its key ran out of tokens."""
+        return isinstance(error, TokenLimitExceededError) or 'NOT_ENOUGH_TOKEN' in str(error)
+
+    def _run_queries(
+        self,
+        queries: List[Tuple[Any, str, KeepaKey]],
+        profile: str = PROFILE_FULL,
+        heartbeat: Optional[Callable[[], None]] = None
+    ) -> List[Tuple[list, Optional[Exception], int, KeepaKey]]:
+        """
+        Run several Keepa queries concurrently (see tuned_concurrency).
+
+        A query whose key runs out of tokens is retried once per remaining key;
+        transient errors are retried with backoff per the retry policy. While
+        the circuit breaker is open queries fail with KeepaUnavailableError
+        without reaching Keepa.
+
+        Args:
+            queries: List of (items, domain_id, key) tuples
+            profile: Fetch profile ('full' or 'lean')
+            heartbeat: Optional callable run on the calling thread before every
+                sequential query and every HEARTBEAT_INTERVAL_SECONDS while
+                concurrent queries run; its exceptions stop the queries
+
+        Returns:
+            List of (products, error, execution_time_ms, key) in the same order
+            as queries, where key is the one that finally served the query
+        """
+        def run(items, domain_id, key):
+            count = 1 if isinstance(items, str) else len(items)
+            tried = [key]
+            attempt = 0
+            start_time = time.time()
+            while True:
+                try:
+                    self.circuit_breaker.before_request()
+                    products = self._query_products(items, domain_id, key, profile)
+                    self.circuit_breaker.record_success()
+                    return products, None, int((time.time() - start_time) * 1000), key
+                except KeepaUnavailableError as e:
+                    return [], e, int((time.time() - start_time) * 1000), key
+                except Exception as e:
+                    if self._is_token_error(e):
+                        alternative = self.pool.failover_key(
+                            count * self.TOKENS_PER_PRODUCT,
+                            count * self.TOKENS_PER_PRODUCT,
+                            self.max_token_wait,
+                            exclude=tried,
+                        )
+                        if alternative is not None:
+                            tried.append(alternative)
+                            key = alternative
+                            # Not a verdict on Keepa's health: the retry on the
+                            # other key takes the half-open probe slot again
+                            self.circuit_breaker.release_probe()
+                            continue
+                        # Every key is rate limited
+                        self.circuit_breaker.record_failure()
+                    elif self.retry_policy.is_retryable(e):
+                        self.circuit_breaker.record_failure()
+                        # Retrying into an open circuit would only short-circuit
+                        if not self.circuit_breaker.is_open and self.retry_policy.should_retry(e, attempt):
+                            self.retry_policy.wait(attempt)
+                            attempt += 1
+                            continue
+                    else:
+                        # Keepa answered (e.g. rejected the request): it is healthy
+                        self.circuit_breaker.record_success()
+                    return [], e, int((time.time() - start_time) * 1000), key
+
+        def run_sequentially():
+            responses = []
+            for query in queries:
+                if heartbeat is not None:
+                    heartbeat()
+                responses.append(run(*query))
+            return responses
+
+        if len(queries) <= 1:
+            return run_sequentially()
+        largest = max(1 if isinstance(items, str) else len(items) for items, _, _ in queries)
+        concurrency = min(self.tuned_concurrency(largest), len(queries))
+        if concurrency == 1:
+            return run_sequentially()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(run, *query) for query in queries]
+            try:
+                # Queries may wait up to max_token_wait for tokens each: keep
+                # the caller's lease alive meanwhile
+                while wait(futures, self.HEARTBEAT_INTERVAL_SECONDS, FIRST_EXCEPTION).not_done:
+                    if heartbeat is not None:
+                        heartbeat()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            return [future.result() for future in futures]
+
+    def fetch_product_data_for_marketplaces(
+        self,
+        asin: str,
+        marketplaces: Tuple[str, ...] = ('US', 'MX'),
+        max_age: Optional[timedelta] = None,
+        force_refresh: bool = False,
+        profile: str = PROFILE_FULL
+    ) -> Dict[str, KeepaProductData]:
+        """
+        Fetch product data for one ASIN in several marketplaces concurrently.
+
+        Args:
+            asin: Product ASIN
+            marketplaces: Marketplace codes to fetch
+            max_age: Optional max age override for stored data
+            force_refresh: Always query Keepa, ignoring stored data
+            profile: Fetch profile ('full' or 'lean')
+
+        Returns:
+            Dictionary mapping marketplace to KeepaProductData
+
+        Raises:
+            TokenLimitExceededError: If token limit is exceeded
+            KeepaAPIError: If API call fails
+        """
+        results = {}
+        pending = list(marketplaces)
+        if not force_refresh:
+            for marketplace in marketplaces:
+                cached = self.get_fresh_product_data([asin], marketplace, max_age, profile).get(asin)
+                if cached is not None:
+                    results[marketplace] = cached
+            pending = [marketplace for marketplace in marketplaces if marketplace not in results]
+
+        reused, leased = self._join_in_flight({marketplace: [asin] for marketplace in pending}, profile)
+        for marketplace in pending:
+            if asin in reused[marketplace]:
+                results[marketplace] = reused[marketplace][asin]
+        pending = [marketplace for marketplace in pending if marketplace not in results]
+
+        try:
+            if pending:
+                self._fetch_and_store_marketplaces(asin, pending, results, profile)
+        finally:
+            self.fetch_leases.release(leased)
+
+        return results
+
+    def _fetch_and_store_marketplaces(
+        self,
+        asin: str,
+        pending: List[str],
+        results: Dict[str, KeepaProductData],
+        profile: str = PROFILE_FULL
+    ):
+        """
+        Query Keepa for one ASIN in several marketplaces concurrently and store the results.
+
+        Args:
+            asin: Product ASIN
+            pending: Marketplace codes to fetch
+            results: Dictionary to add the stored rows to (by marketplace)
+            profile: Fetch profile ('full' or 'lean')
+
+        Raises:
+            TokenLimitExceededError: If token limit is exceeded
+            KeepaAPIError: If API call fails
+        """
+        domains = [self.MARKETPLACE_DOMAINS.get(marketplace, 1) for marketplace in pending]
+        try:
+            queries = []
+            for domain_id in domains:
+                key = self.pool.acquire_key(self.TOKENS_PER_PRODUCT, self.TOKENS_PER_PRODUCT)
+                if key is None:
+                    raise TokenLimitExceededError(self._token_limit_message())
+                queries.append((asin, domain_id, key))
+            responses = self._run_queries(queries, profile)
+        finally:
+            self.pool.reset_plan()
+
+        first_error = None
+        for marketplace, domain_id, (products, error, execution_time_ms, key) in zip(pending, domains, responses):
+            if error is not None:
+                self._log_api_call(
+                    endpoint='query',
+                    request_params={'asin': asin, 'domain': domain_id, 'key': key.label},
+                    response_status=500,
+                    response_data={},
+                    tokens_consumed=self.TOKENS_PER_PRODUCT,
+                    error_message=str(error),
+                    execution_time_ms=execution_time_ms,
+                )
+                first_error = first_error or error
+                continue
+
+            self._log_api_call(
+                endpoint='query',
+                request_params={'asin': asin, 'domain': domain_id, 'buybox': True, 'key': key.label},
+                response_status=200,
+                response_data={'products_count': len(products) if products else 0},
+                tokens_consumed=self.TOKENS_PER_PRODUCT,
+                execution_time_ms=execution_time_ms,
+            )
+            self.consume_tokens(self.TOKENS_PER_PRODUCT, key)
+
+            try:
+                if not products:
+                    results[marketplace] = self._create_unavailable_keepa_data(
+                        asin, marketplace, fetch_profile=profile
+                    )
+                else:
+                    results[marketplace] = self._store_keepa_product(
+                        asin, marketplace, products[0], profile
+                    )
+            except Exception as e:
+                first_error = first_error or e
+
+        if isinstance(first_error, (TokenLimitExceededError, KeepaUnavailableError)):
+            raise first_error
+        if first_error is not None:
+            raise KeepaAPIError(f'Failed to fetch data for ASIN {asin}: {str(first_error)}')
+
+    def _store_keepa_product(
         self,
         asin: str,
         marketplace: str,
-        keepa_product: dict
+        product_data: dict,
+        profile: str = PROFILE_FULL,
+        product: Optional[Product] = None
     ) -> KeepaProductData:
         """
-        Parse Keepa API response and create/update KeepaProductData.
+        Persist a single Keepa product returned by a query.
 
         Args:
             asin: Product ASIN
             marketplace: Marketplace code
-            keepa_product: Raw Keepa product data
+            product_data: Raw Keepa product data
+            profile: Fetch profile the product was queried with
+            product: Product already resolved for the ASIN (looked up if omitted)
 
         Returns:
             KeepaProductData instance
         """
+        fields = self._build_stored_fields(asin, marketplace, product_data, profile, product)
+        return self.upsert_keepa_product_data([fields])[(asin, marketplace)]
+
+    def _build_stored_fields(
+        self,
+        asin: str,
+        marketplace: str,
+        product_data: dict,
+        profile: str = PROFILE_FULL,
+        product: Optional[Product] = None
+    ) -> dict:
+        """
+        Build the KeepaProductData fields of a Keepa product returned by a query.
+
+        Args:
+            asin: Product ASIN
+            marketplace: Marketplace code
+            product_data: Raw Keepa product data
+            profile: Fetch profile the product was queried with
+            product: Product already resolved for the ASIN (looked up if omitted)
+
+        Returns:
+            Dictionary of KeepaProductData fields
+        """
+        # Skip products where buybox is already owned by this seller (MX only)
+        if self._is_buybox_owned(marketplace, product_data):
+            return self._build_unavailable_fields(
+                asin,
+                marketplace,
+                raw_data=self._build_raw_data(product_data, profile),
+                sync_error_message=(
+                    f'Buybox already owned by seller {self.BUYBOX_OWNER_SELLER_ID}'
+                ),
+                fetch_profile=profile,
+            )
+
+        return self._build_keepa_fields(
+            asin=asin,
+            marketplace=marketplace,
+            keepa_product=product_data,
+            profile=profile,
+            product=product,
+        )
+
+    def _is_buybox_owned(self, marketplace: str, product_data: dict) -> bool:
+        """Whether this seller already owns the MX Buy Box of a Keepa product."""
+        return (
+            marketplace == 'MX' and
+            self._get_buybox_seller_id_from_product(product_data) == self.BUYBOX_OWNER_SELLER_ID
+        )
+
+    def _build_raw_data(self, keepa_product: dict, profile: str) -> dict:
+        """
+        Build the raw_data stored for a Keepa product.
+
+        Args:
+            keepa_product: Raw Keepa product data
+            profile: Fetch profile the product was queried with
+
+        Returns:
+            Full JSON-serializable product, or only the keys read by the app
+            for the lean profile
+        """
+        if profile != self.PROFILE_LEAN:
+            return self._convert_to_json_serializable(keepa_product)
+
+        compact = {
+            key: keepa_product[key]
+            for key in self.LEAN_RAW_DATA_KEYS
+            if keepa_product.get(key) is not None
+        }
+        stats = keepa_product.get('stats') or {}
+        compact['stats'] = {
+            key: stats[key]
+            for key in self.LEAN_STATS_KEYS
+            if stats.get(key) is not None
+        }
+        return self._convert_to_json_serializable(compact)
+
+    def _build_keepa_fields(
+        self,
+        asin: str,
+        marketplace: str,
+        keepa_product: dict,
+        profile: str = PROFILE_FULL,
+        product: Optional[Product] = None
+    ) -> dict:
+        """
+        Parse Keepa API response into KeepaProductData fields.
+
+        Args:
+            asin: Product ASIN
+            marketplace: Marketplace code
+            keepa_product: Raw Keepa product data
+            profile: Fetch profile the product was queried with
+            product: Product already resolved for the ASIN (looked up if omitted)
+
+        Returns:
+            Dictionary of KeepaProductData fields
+        """
         # Get current prices from product['data']
         # Prices are already in dollars/pesos (not cents)
         def get_current_price(price_key):
             """Extract current price from Keepa data array."""
+            if 'data' not in keepa_product:
+                # Queried without history (lean profile): use stats.current
+                return get_stats_current_price(price_key)
+
             data = keepa_product.get('data', {})
             price_array = data.get(price_key)
 
@@ -261,6 +867,19 @@ class KeepaService:
 
             return Decimal(str(last_price))
 
+        def get_stats_current_price(price_key):
+            """Extract current price from stats.current (values in cents, -1 = no data)."""
+            current = (keepa_product.get('stats') or {}).get('current') or []
+            index = self.PRICE_INDEXES[price_key]
+            if len(current) <= index:
+                return None
+
+            value = current[index]
+            if value is None or value < 0:
+                return None
+
+            return Decimal(value) / 100
+
         # Get current prices from different sources
         buy_box_price = get_current_price('BUY_BOX_SHIPPING')
         current_amazon_price = get_current_price('AMAZON')
@@ -275,7 +894,8 @@ class KeepaService:
         )
 
         # Get or create product
-        product = self.get_or_create_product(asin, keepa_product)
+        if product is None:
+            product = self.get_or_create_product(asin, keepa_product)
 
         # Create or update KeepaProductData
         # Safely extract sales rank
@@ -301,49 +921,143 @@ class KeepaService:
                 if rank_value is not None and rank_value != -1:
                     sales_rank = rank_value
 
-        keepa_data, created = KeepaProductData.objects.update_or_create(
-            asin=asin,
-            marketplace=marketplace,
-            defaults={
-                'product': product,
-                'current_amazon_price': current_amazon_price,
-                'buy_box_price': buy_box_price,
-                'current_new_price': get_current_price('NEW'),
-                'avg_30_days_price': Decimal(str(stats.get('avg30', [None])[0])) if stats.get('avg30') and stats.get('avg30')[0] not in (None, -1) else None,
-                'avg_90_days_price': Decimal(str(stats.get('avg90', [None])[0])) if stats.get('avg90') and stats.get('avg90')[0] not in (None, -1) else None,
-                'title': keepa_product.get('title') or '',
-                'brand': keepa_product.get('brand') or '',
-                'product_category': keepa_product.get('categoryTree', [{}])[0].get('name', '') if keepa_product.get('categoryTree') else '',
-                'sales_rank': sales_rank,
-                'is_available': is_available,
-                'raw_data': self._convert_to_json_serializable(keepa_product),
-                'sync_successful': True,
-                'sync_error_message': '',
-            }
-        )
-
-        return keepa_data
+        return {
+            'asin': asin,
+            'marketplace': marketplace,
+            'product': product,
+            'current_amazon_price': current_amazon_price,
+            'buy_box_price': buy_box_price,
+            'current_new_price': get_current_price('NEW'),
+            'avg_30_days_price': Decimal(str(stats.get('avg30', [None])[0])) if stats.get('avg30') and stats.get('avg30')[0] not in (None, -1) else None,
+            'avg_90_days_price': Decimal(str(stats.get('avg90', [None])[0])) if stats.get('avg90') and stats.get('avg90')[0] not in (None, -1) else None,
+            'title': keepa_product.get('title') or '',
+            'brand': keepa_product.get('brand') or '',
+            'product_category': keepa_product.get('categoryTree', [{}])[0].get('name', '') if keepa_product.get('categoryTree') else '',
+            'sales_rank': sales_rank,
+            'is_available': is_available,
+            'raw_data': self._build_raw_data(keepa_product, profile),
+            'fetch_profile': profile,
+            'sync_successful': True,
+            'sync_error_message': '',
+        }
 
     def _create_unavailable_keepa_data(
         self,
         asin: str,
         marketplace: str,
         raw_data: Optional[dict] = None,
-        sync_error_message: str = 'Product not found in Keepa'
+        sync_error_message: str = 'Product not found in Keepa',
+        fetch_profile: str = PROFILE_FULL
     ) -> KeepaProductData:
         """Create KeepaProductData for unavailable product."""
-        keepa_data, created = KeepaProductData.objects.update_or_create(
-            asin=asin,
-            marketplace=marketplace,
-            defaults={
-                'product': None,
-                'is_available': False,
-                'sync_successful': False,
-                'sync_error_message': sync_error_message,
-                'raw_data': raw_data or {},
-            }
+        fields = self._build_unavailable_fields(
+            asin, marketplace, raw_data, sync_error_message, fetch_profile
         )
-        return keepa_data
+        return self.upsert_keepa_product_data([fields])[(asin, marketplace)]
+
+    def _build_unavailable_fields(
+        self,
+        asin: str,
+        marketplace: str,
+        raw_data: Optional[dict] = None,
+        sync_error_message: str = 'Product not found in Keepa',
+        fetch_profile: str = PROFILE_FULL
+    ) -> dict:
+        """Build the KeepaProductData fields of an unavailable product (prices are kept)."""
+        return {
+            'asin': asin,
+            'marketplace': marketplace,
+            'product': None,
+            'is_available': False,
+            'sync_successful': False,
+            'sync_error_message': sync_error_message,
+            'raw_data': raw_data or {},
+            'fetch_profile': fetch_profile,
+        }
+
+    def upsert_keepa_product_data(
+        self,
+        rows: List[dict]
+    ) -> Dict[Tuple[str, str], KeepaProductData]:
+        """
+        Create or update many KeepaProductData rows at once.
+
+        Rows sharing the same set of fields are written with a single
+        INSERT ... ON CONFLICT (asin, marketplace) DO UPDATE statement; fields
+        missing from a row keep their stored value. The written rows are then
+        read back with one query so every instance has its id and full state.
+
+        Args:
+            rows: KeepaProductData field dicts, each with asin and marketplace
+
+        Returns:
+            Dictionary mapping (asin, marketplace) to KeepaProductData
+        """
+        # One row per key: a statement cannot update the same row twice
+        unique_rows = {(row['asin'], row['marketplace']): row for row in rows}
+        if not unique_rows:
+            return {}
+        self._keep_stored_history(unique_rows)
+
+        groups = {}
+        for row in unique_rows.values():
+            groups.setdefault(frozenset(row), []).append(row)
+
+        for field_names, group in groups.items():
+            update_fields = sorted(field_names - {'asin', 'marketplace'}) + ['last_synced_at', 'updated_at']
+            KeepaProductData.objects.bulk_create(
+                [KeepaProductData(**row) for row in group],
+                update_conflicts=True,
+                unique_fields=['asin', 'marketplace'],
+                update_fields=update_fields,
+            )
+
+        stored = KeepaProductData.objects.select_related('product').filter(
+            asin__in={asin for asin, _ in unique_rows},
+            marketplace__in={marketplace for _, marketplace in unique_rows},
+        )
+        return {
+            (keepa_data.asin, keepa_data.marketplace): keepa_data
+            for keepa_data in stored
+            if (keepa_data.asin, keepa_data.marketplace) in unique_rows
+        }
+
+    def _keep_stored_history(self, rows: Dict[Tuple[str, str], dict]):
+        """
+        Merge lean raw_data into the stored full raw_data of the same rows.
+
+        Lean rows only carry current data: writing them as-is would drop the
+        price history read by the detail chart. The stored history is kept
+        and the lean keys (current stats, title, ...) replace their stored
+        values. fetch_profile stays 'lean', so a later full request still
+        fetches fresh history.
+
+        Args:
+            rows: KeepaProductData field dicts by (asin, marketplace), updated
+                in place
+        """
+        lean_rows = {
+            key: row for key, row in rows.items()
+            if row.get('fetch_profile') == self.PROFILE_LEAN and row.get('raw_data')
+        }
+        if not lean_rows:
+            return
+
+        stored = KeepaProductData.objects.filter(
+            asin__in={asin for asin, _ in lean_rows},
+            marketplace__in={marketplace for _, marketplace in lean_rows},
+            raw_data__has_key='csv',
+        ).values_list('asin', 'marketplace', 'raw_data')
+        for asin, marketplace, stored_raw in stored:
+            row = lean_rows.get((asin, marketplace))
+            if row is None:
+                continue
+            lean_raw = row['raw_data']
+            row['raw_data'] = {
+                **stored_raw,
+                **lean_raw,
+                'stats': {**(stored_raw.get('stats') or {}), **lean_raw.get('stats', {})},
+            }
 
     def get_or_create_product(self, asin: str, keepa_data: dict) -> Product:
         """
@@ -356,32 +1070,81 @@ class KeepaService:
         Returns:
             Product instance
         """
-        # Try to find existing product by external_id
-        try:
-            product = Product.objects.get(external_id=asin)
-            return product
-        except Product.DoesNotExist:
-            pass
+        return self.resolve_products({asin: keepa_data})[asin]
+
+    def resolve_products(
+        self,
+        keepa_products: Dict[str, dict],
+        placeholder_title: str = 'Keepa Product',
+        placeholder_description: Optional[str] = None
+    ) -> Dict[str, Product]:
+        """
+        Get or create the Products of several ASINs at once.
 
-        # Create new product
-        title = keepa_data.get('title') or f'Keepa Product {asin}'
-        sku = f'KEEPA-{asin}'
+        Existing products are loaded with one query and the missing ones are
+        inserted with a single bulk_create. Keepa products are unique per
+        ASIN, so a concurrent batch creating the same product is resolved by
+        reading back the row it inserted.
+
+        Args:
+            keepa_products: Dictionary mapping ASIN to Keepa product data
+                (an empty dict when there is no Keepa data)
+            placeholder_title: Title prefix for products without a Keepa title
+            placeholder_description: Description for new products (defaults to the title)
+
+        Returns:
+            Dictionary mapping ASIN to Product
+        """
+        if not keepa_products:
+            return {}
+
+        products = {}
+        # Oldest first, like the single get() this replaces would have found
+        for product in Product.objects.filter(external_id__in=list(keepa_products)).order_by('id'):
+            products.setdefault(product.external_id, product)
+
+        missing = [asin for asin in keepa_products if asin not in products]
+        if missing:
+            Product.objects.bulk_create(
+                [
+                    self._build_product(
+                        asin, keepa_products[asin], placeholder_title, placeholder_description
+                    )
+                    for asin in missing
+                ],
+                ignore_conflicts=True,
+            )
+            # ignore_conflicts does not return primary keys: read the rows back
+            for product in Product.objects.filter(
+                external_id__in=missing, sku__startswith=self.PRODUCT_SKU_PREFIX
+            ):
+                products[product.external_id] = product
+
+        return products
+
+    def _build_product(
+        self,
+        asin: str,
+        keepa_data: dict,
+        placeholder_title: str,
+        placeholder_description: Optional[str]
+    ) -> Product:
+        """Build an unsaved Product for an ASIN from its Keepa data."""
+        title = (keepa_data or {}).get('title') or f'{placeholder_title} {asin}'
 
         # Map category (simplified - you might want to enhance this)
-        category_tree = keepa_data.get('categoryTree', [])
+        category_tree = (keepa_data or {}).get('categoryTree') or []
         category_name = category_tree[0].get('name', '') if category_tree else ''
 
-        product = Product.objects.create(
-            sku=sku,
+        return Product(
+            sku=f'{self.PRODUCT_SKU_PREFIX}{asin}',
             external_id=asin,
             title=title[:500],
-            description=title,
+            description=placeholder_description or title,
             category=category_name[:100] if category_name else 'Uncategorized',
             inventory_quantity=0,  # Start with 0 inventory
         )
 
-        return product
-
     def determine_usa_cost(
         self,
         usa_keepa_data: KeepaProductData
@@ -431,30 +1194,232 @@ class KeepaService:
     def fetch_bulk_product_data(
         self,
         asins: List[str],
-        marketplace: str = 'US'
-    ) -> Dict[str, KeepaProductData]:
+        marketplace: str = 'US',
+        max_age: Optional[timedelta] = None,
+        force_refresh: bool = False,
+        profile: str = PROFILE_FULL
+    ) -> Tuple[Dict[str, KeepaProductData], Dict[str, str]]:
         """
-        Fetch multiple products data (sequentially to avoid rate limits).
+        Fetch multiple products data with one Keepa query per chunk.
+
+        Fresh rows are served from the database. The remaining ASINs are sent
+        in chunks of up to BULK_QUERY_LIMIT per request and the response is
+        split back into one KeepaProductData row per ASIN. A failure while
+        storing one ASIN does not abort the rest of its chunk.
 
         Args:
             asins: List of ASINs
             marketplace: Marketplace code
+            max_age: Optional max age override for stored data
+            force_refresh: Always query Keepa, ignoring stored data
+            profile: Fetch profile ('full' or 'lean')
 
         Returns:
-            Dictionary mapping ASIN to KeepaProductData
+            Tuple of (results, errors) where results maps ASIN to KeepaProductData
+            and errors maps ASIN to the error message for ASINs that failed
         """
-        results = {}
+        return self.fetch_bulk_product_data_for_marketplaces(
+            asins, (marketplace,), max_age=max_age, force_refresh=force_refresh, profile=profile
+        )[marketplace]
 
-        for asin in asins:
-            try:
-                data = self.fetch_product_data(asin, marketplace)
-                results[asin] = data
-            except (KeepaAPIError, TokenLimitExceededError) as e:
-                # Log error but continue with other ASINs
-                print(f'Error fetching {asin}: {e}')
+    def fetch_bulk_product_data_for_marketplaces(
+        self,
+        asins: List[str],
+        marketplaces: Tuple[str, ...] = ('US', 'MX'),
+        max_age: Optional[timedelta] = None,
+        force_refresh: bool = False,
+        profile: str = PROFILE_FULL,
+        heartbeat: Optional[Callable[[], None]] = None
+    ) -> Dict[str, Tuple[Dict[str, KeepaProductData], Dict[str, str]]]:
+        """
+        Fetch multiple products data in several marketplaces.
+
+        Every (marketplace, chunk) query runs concurrently, bounded by
+        KEEPA_MAX_CONCURRENCY. Responses are parsed and stored on the calling
+        thread.
+
+        Args:
+            asins: List of ASINs
+            marketplaces: Marketplace codes to fetch
+            max_age: Optional max age override for stored data
+            force_refresh: Always query Keepa, ignoring stored data
+            profile: Fetch profile ('full' or 'lean')
+            heartbeat: Optional callable run while the queries wait for
+                tokens (see _run_queries)
+
+        Returns:
+            Dictionary mapping marketplace to a (results, errors) tuple as
+            returned by fetch_bulk_product_data
+        """
+        # Duplicated ASINs would be charged twice by Keepa
+        unique_asins = list(dict.fromkeys(asins))
+
+        outcome = {}
+        pending = {}
+        for marketplace in marketplaces:
+            results = {}
+            pending[marketplace] = unique_asins
+            if not force_refresh:
+                results = self.get_fresh_product_data(unique_asins, marketplace, max_age, profile)
+                pending[marketplace] = [asin for asin in unique_asins if asin not in results]
+            outcome[marketplace] = (results, {})
+
+        # Reuse what other workers are fetching right now
+        reused, leased = self._join_in_flight(pending, profile)
+
+        queries = []
+        query_targets = []
+        for marketplace in marketplaces:
+            outcome[marketplace][0].update(reused[marketplace])
+            to_fetch = [asin for asin in pending[marketplace] if asin not in reused[marketplace]]
+            domain_id = self.MARKETPLACE_DOMAINS.get(marketplace, 1)
+            for index in range(0, len(to_fetch), self.BULK_QUERY_LIMIT):
+                chunk = to_fetch[index:index + self.BULK_QUERY_LIMIT]
+                queries.append((chunk, domain_id))
+                query_targets.append(marketplace)
+
+        try:
+            self._fetch_and_store_chunks(queries, query_targets, outcome, profile, heartbeat)
+        finally:
+            self.fetch_leases.release(leased)
+
+        return outcome
+
+    def _fetch_and_store_chunks(
+        self,
+        queries: List[Tuple[List[str], str]],
+        query_targets: List[str],
+        outcome: Dict[str, Tuple[Dict[str, KeepaProductData], Dict[str, str]]],
+        profile: str = PROFILE_FULL,
+        heartbeat: Optional[Callable[[], None]] = None
+    ):
+        """
+        Run chunked Keepa queries concurrently and store every returned product.
+
+        Args:
+            queries: (chunk of ASINs, domain_id) per query
+            query_targets: Marketplace of each query
+            outcome: Dictionary mapping marketplace to the (results, errors)
+                tuple to fill in
+            profile: Fetch profile ('full' or 'lean')
+            heartbeat: Optional callable run while the queries wait for tokens
+        """
+        # Assign every query to a key with budget before sending any of them
+        accepted_queries = []
+        accepted_targets = []
+        try:
+            for (chunk, domain_id), marketplace in zip(queries, query_targets):
+                cost = len(chunk) * self.TOKENS_PER_PRODUCT
+                key = self.pool.acquire_key(cost, cost)
+                if key is None:
+                    message = self._token_limit_message()
+                    for asin in chunk:
+                        outcome[marketplace][1][asin] = message
+                    continue
+                accepted_queries.append((chunk, domain_id, key))
+                accepted_targets.append(marketplace)
+
+            responses = self._run_queries(accepted_queries, profile, heartbeat)
+        finally:
+            self.pool.reset_plan()
+
+        for (chunk, domain_id, _), marketplace, (products, error, execution_time_ms, key) in zip(
+            accepted_queries, accepted_targets, responses
+        ):
+            results, errors = outcome[marketplace]
+
+            if error is not None:
+                self._log_api_call(
+                    endpoint='query',
+                    request_params={'asins': chunk, 'domain': domain_id, 'key': key.label},
+                    response_status=500,
+                    response_data={},
+                    tokens_consumed=len(chunk) * self.TOKENS_PER_PRODUCT,
+                    error_message=str(error),
+                    execution_time_ms=execution_time_ms,
+                )
+                for asin in chunk:
+                    errors[asin] = f'Failed to fetch data for ASIN {asin}: {str(error)}'
                 continue
 
-        return results
+            self._log_api_call(
+                endpoint='query',
+                request_params={'asins': chunk, 'domain': domain_id, 'buybox': True, 'key': key.label},
+                response_status=200,
+                response_data={'products_count': len(products) if products else 0},
+                tokens_consumed=len(chunk) * self.TOKENS_PER_PRODUCT,
+                execution_time_ms=execution_time_ms,
+            )
+            self.consume_tokens(len(chunk) * self.TOKENS_PER_PRODUCT, key)
+
+            products_by_asin = {
+                str(product.get('asin') or '').upper(): product
+                for product in products or []
+                if product
+            }
+            # Resolve the Product of every stored ASIN in the chunk at once
+            try:
+                chunk_products = self.resolve_products({
+                    asin: products_by_asin[asin.upper()]
+                    for asin in chunk
+                    if asin.upper() in products_by_asin and
+                    not self._is_buybox_owned(marketplace, products_by_asin[asin.upper()])
+                })
+            except Exception:
+                # Fall back to resolving (and reporting errors) ASIN by ASIN
+                chunk_products = {}
+
+            rows = {}
+            for asin in chunk:
+                try:
+                    product_data = products_by_asin.get(asin.upper())
+                    if product_data is None:
+                        rows[asin] = self._build_unavailable_fields(
+                            asin, marketplace, fetch_profile=profile
+                        )
+                    else:
+                        rows[asin] = self._build_stored_fields(
+                            asin, marketplace, product_data, profile, chunk_products.get(asin)
+                        )
+                except Exception as e:
+                    errors[asin] = f'Failed to store data for ASIN {asin}: {str(e)}'
+
+            self._write_chunk_rows(rows, marketplace, results, errors)
+
+    def _write_chunk_rows(
+        self,
+        rows: Dict[str, dict],
+        marketplace: str,
+        results: Dict[str, KeepaProductData],
+        errors: Dict[str, str]
+    ):
+        """
+        Upsert the KeepaProductData rows of a chunk.
+
+        The whole chunk is written at once; if that fails, rows are retried
+        one by one so a bad row only fails its own ASIN.
+
+        Args:
+            rows: Dictionary mapping ASIN to KeepaProductData fields
+            marketplace: Marketplace code
+            results: Dictionary to add the stored rows to (by ASIN)
+            errors: Dictionary to add the failed ASINs to
+        """
+        try:
+            with transaction.atomic():
+                stored = self.upsert_keepa_product_data(list(rows.values()))
+        except Exception:
+            stored = {}
+            for asin, fields in rows.items():
+                try:
+                    with transaction.atomic():
+                        stored.update(self.upsert_keepa_product_data([fields]))
+                except Exception as e:
+                    errors[asin] = f'Failed to store data for ASIN {asin}: {str(e)}'
+
+        for asin in rows:
+            if (asin, marketplace) in stored:
+                results[asin] = stored[(asin, marketplace)]
 
     def _log_api_call(
         self,
@@ -466,9 +1431,8 @@ class KeepaService:
         error_message: str = '',
         execution_time_ms: int = 0
     ):
-        """Log Keepa API call."""
-        return
-        KeepaAPILog.objects.create(
+        """Log Keepa API call (buffered, written in the background)."""
+        log_keepa_api_call(
             endpoint=endpoint,
             request_params=request_params,
             response_status=response_status,
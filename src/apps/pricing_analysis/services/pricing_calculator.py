@@ -22,10 +22,81 @@ Implements the Break Even calculation formula:
 7. Retention_Factor = (VAT_Rate + ISR_Rate) / (1 + IVA_Rate)
 
 8. Break_Even_Final = Break_Even_Base / (1 - Retention_Factor)
+
+The *_batch variants compute the same fields for N rows at once with NumPy
+(float64), rounding half to even like Decimal.quantize. Rows too close to a
+rounding tie for float64 to decide are recomputed with the Decimal path, so
+both paths agree to the cent; to_decimal_places turns their values back into
+the Decimals of the scalar path.
 """
 
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+import numpy as np
+
+# Relative distance to a rounding tie below which float64 cannot be trusted
+_TIE_TOLERANCE = 1e-12
+
+# Decimal places of every breakdown field (see calculate_break_even)
+BREAK_EVEN_PLACES = {
+    'usa_cost_mxn': 2,
+    'after_import': 2,
+    'cost_base': 2,
+    'total_costs': 2,
+    'break_even_base': 2,
+    'retention_factor': 7,
+    'vat_retention': 2,
+    'isr_retention': 2,
+    'break_even_price': 2,
+}
+# Decimal places of the Decimal fields of analyze_competitiveness
+COMPETITIVENESS_PLACES = {
+    'price_difference': 2,
+    'potential_profit_margin': 4,
+}
+
+
+def to_decimal_places(value: float, places: int) -> Decimal:
+    """Decimal of a value already rounded to `places` by a *_batch method."""
+    return Decimal(f'{value:.{places}f}')
+
+
+def _quantize_array(values: np.ndarray, places: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Round to `places` decimals, half to even (Decimal's default rounding).
+
+    Args:
+        values: Float array
+        places: Decimal places to keep
+
+    Returns:
+        Tuple of (rounded values, mask of rows too close to a tie to round
+        reliably in float64)
+    """
+    scaled = values * 10 ** places
+    distance_to_tie = np.abs(scaled - np.floor(scaled) - 0.5)
+    ambiguous = distance_to_tie <= np.maximum(np.abs(scaled), 1.0) * _TIE_TOLERANCE
+    return np.rint(scaled) / 10 ** places, ambiguous
+
+
+def _to_decimal(value) -> Decimal:
+    """Exact Decimal of an input value (floats via their shortest repr)."""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _as_arrays(*values) -> Tuple[np.ndarray, ...]:
+    """Broadcast inputs to a common 1-D shape, as object (original) arrays."""
+    arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype=object)) for value in values))
+    return tuple(np.array(array, dtype=object) for array in arrays)
+
+
+def _as_float(values: np.ndarray) -> np.ndarray:
+    """Float array of an object array (None becomes NaN)."""
+    try:
+        return values.astype(float)
+    except TypeError:
+        return np.array([np.nan if value is None else float(value) for value in values], dtype=float)
 
 
 class PricingCalculator:
@@ -231,3 +302,177 @@ class PricingCalculator:
         max_amount = config.fixed_shipping_max.amount
         average = (min_amount + max_amount) / Decimal('2')
         return average.quantize(Decimal('0.01'))
+
+    @classmethod
+    def calculate_break_even_batch(
+        cls,
+        usa_cost_usd,
+        exchange_rate,
+        shipping_cost_mxn,
+        config: 'BreakEvenAnalysisConfig',
+        usa_tax_multiplier=Decimal('1.0825')
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized calculate_break_even for N rows.
+
+        Args:
+            usa_cost_usd: USA costs in USD (sequence or array)
+            exchange_rate: USD to MXN rate (scalar or one per row)
+            shipping_cost_mxn: Shipping cost in MXN (scalar or one per row)
+            config: Analysis configuration with tax rates
+            usa_tax_multiplier: Tax multiplier for USA cost (scalar or one per row)
+
+        Returns:
+            Dictionary with the keys of calculate_break_even, each a float
+            array already rounded like the Decimal path
+
+        Raises:
+            ValueError: If the config is invalid (see calculate_break_even)
+        """
+        inputs = _as_arrays(usa_cost_usd, exchange_rate, shipping_cost_mxn, usa_tax_multiplier)
+        usa_cost_usd, exchange_rate, shipping_cost_mxn, usa_tax_multiplier = (
+            _as_float(values) for values in inputs
+        )
+
+        # Config-only factors, validated like the scalar path
+        marketplace_factor = Decimal('1') - config.marketplace_fee_rate
+        if marketplace_factor <= 0:
+            raise ValueError("marketplace_fee_rate must be < 1")
+        iva_factor = Decimal('1') + config.iva_tax_rate
+        if iva_factor <= 0:
+            raise ValueError("iva_tax_rate must be > -1")
+        retention_factor = (config.vat_retention_rate + config.isr_retention_rate) / iva_factor
+        denom = Decimal('1') - retention_factor
+        if denom <= 0:
+            raise ValueError("Invalid config: retentions are too high vs IVA (denom <= 0)")
+
+        usa_cost_mxn = usa_cost_usd * exchange_rate * usa_tax_multiplier
+        percent_import_fees = usa_cost_mxn * float(config.import_admin_cost_rate)
+        after_import = percent_import_fees + percent_import_fees * float(config.iva_tax_rate)
+        cost_base = usa_cost_mxn + after_import
+        total_costs = cost_base + shipping_cost_mxn
+        break_even_base = total_costs / float(marketplace_factor)
+        break_even_price = break_even_base / float(denom)
+        net_price = break_even_price / float(iva_factor)
+
+        raw = {
+            'usa_cost_mxn': usa_cost_mxn,
+            'after_import': after_import,
+            'cost_base': cost_base,
+            'total_costs': total_costs,
+            'break_even_base': break_even_base,
+            'vat_retention': net_price * float(config.vat_retention_rate),
+            'isr_retention': net_price * float(config.isr_retention_rate),
+            'break_even_price': break_even_price,
+        }
+        breakdown = {}
+        ambiguous = np.zeros(len(usa_cost_usd), dtype=bool)
+        for key, values in raw.items():
+            breakdown[key], unsure = _quantize_array(values, BREAK_EVEN_PLACES[key])
+            ambiguous |= unsure
+        breakdown['retention_factor'] = np.full(
+            len(usa_cost_usd), float(retention_factor.quantize(Decimal('0.0000001')))
+        )
+
+        for index in np.flatnonzero(ambiguous):
+            row = cls.calculate_break_even(
+                usa_cost_usd=_to_decimal(inputs[0][index]),
+                exchange_rate=_to_decimal(inputs[1][index]),
+                shipping_cost_mxn=_to_decimal(inputs[2][index]),
+                config=config,
+                usa_tax_multiplier=_to_decimal(inputs[3][index]),
+            )
+            for key, value in row.items():
+                breakdown[key][index] = float(value)
+
+        return breakdown
+
+    @classmethod
+    def calculate_recommended_price_batch(
+        cls,
+        break_even_price,
+        target_margin: Decimal
+    ) -> np.ndarray:
+        """
+        Vectorized calculate_recommended_price for N rows.
+
+        Args:
+            break_even_price: Break even prices including retentions
+            target_margin: Desired margin over BE (e.g., 0.25 for 25%)
+
+        Returns:
+            Float array of recommended prices, rounded like the Decimal path
+        """
+        if target_margin < 0:
+            raise ValueError("target_margin must be >= 0")
+
+        (originals,) = _as_arrays(break_even_price)
+        recommended, ambiguous = _quantize_array(
+            _as_float(originals) * float(Decimal('1') + target_margin), 2
+        )
+        for index in np.flatnonzero(ambiguous):
+            recommended[index] = float(
+                cls.calculate_recommended_price(_to_decimal(originals[index]), target_margin)
+            )
+        return recommended
+
+    @classmethod
+    def analyze_competitiveness_batch(
+        cls,
+        break_even,
+        current_mx_price,
+        config: 'BreakEvenAnalysisConfig'
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized analyze_competitiveness for N rows.
+
+        Args:
+            break_even: Calculated break even prices
+            current_mx_price: Current prices on Amazon MX (None or <= 0 when unknown)
+            config: Analysis configuration
+
+        Returns:
+            Dictionary with the keys of analyze_competitiveness, each an array
+            (bool for the flags, str for confidence_score, float otherwise)
+        """
+        break_even_originals, price_originals = _as_arrays(break_even, current_mx_price)
+        break_even = _as_float(break_even_originals)
+        current_mx_price = _as_float(price_originals)
+        with np.errstate(invalid='ignore'):
+            priced = current_mx_price > 0
+
+        retention_factor = float(
+            (config.vat_retention_rate + config.isr_retention_rate) / (Decimal('1') + config.iva_tax_rate)
+        )
+        price_difference, ambiguous = _quantize_array(np.where(priced, current_mx_price - break_even, 0.0), 2)
+        break_even_base = break_even * (1.0 - retention_factor)
+        profit = current_mx_price - break_even_base - current_mx_price * retention_factor
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = np.where(priced & (break_even_base > 0), profit / break_even_base, 0.0)
+        potential_profit_margin, unsure = _quantize_array(margin, 4)
+        ambiguous |= unsure
+
+        meets_min_margin = priced & (potential_profit_margin >= float(config.min_profit_margin))
+        meets_target_margin = priced & (potential_profit_margin >= float(config.target_profit_margin))
+        result = {
+            'is_feasible': meets_min_margin & (price_difference > 0),
+            'price_difference': price_difference,
+            'potential_profit_margin': potential_profit_margin,
+            'confidence_score': np.where(
+                meets_target_margin, 'HIGH', np.where(meets_min_margin, 'MEDIUM', 'LOW')
+            ).astype(object),
+            'meets_min_margin': meets_min_margin,
+            'meets_target_margin': meets_target_margin,
+        }
+
+        for index in np.flatnonzero(ambiguous & priced):
+            price = price_originals[index]
+            row = cls.analyze_competitiveness(
+                break_even=_to_decimal(break_even_originals[index]),
+                current_mx_price=None if price is None else _to_decimal(price),
+                config=config,
+            )
+            for key, value in row.items():
+                result[key][index] = float(value) if isinstance(value, Decimal) else value
+
+        return result
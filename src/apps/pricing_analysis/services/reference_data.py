@@ -0,0 +1,150 @@
+"""
+Pricing Reference Data
+
+Process-local snapshot of the rarely changing tables every analysis reads:
+- Active BreakEvenAnalysisConfig, active USD→MXN rate and brand restrictions
+- Versioned by a generation counter stored in the database
+  (ReferenceDataGeneration), bumped by save/delete signals
+- Reading the snapshot costs one query for the generation; the tables are
+  only reloaded when another process (or this one) changed them
+"""
+
+import threading
+from decimal import Decimal
+from typing import Dict, Optional
+
+from django.db.models import F
+
+from apps.pricing_analysis.models import (
+    BrandRestriction,
+    BreakEvenAnalysisConfig,
+    ExchangeRate,
+    ReferenceDataGeneration,
+)
+
+PRICING_REFERENCE_KEY = 'pricing_reference'
+
+
+class ReferenceSnapshot:
+    """Immutable copy of the pricing reference tables at one generation."""
+
+    def __init__(self, generation: int):
+        """
+        Load the reference tables.
+
+        Args:
+            generation: Generation the tables were read at
+        """
+        self.generation = generation
+        self.config: Optional[BreakEvenAnalysisConfig] = BreakEvenAnalysisConfig.objects.filter(
+            is_active=True
+        ).first()
+        self.usd_mxn_rate: Optional[Decimal] = ExchangeRate.objects.filter(
+            from_currency='USD', to_currency='MXN', is_active=True
+        ).values_list('rate', flat=True).first()
+        # normalized brand name -> is_allowed
+        self.brand_rules: Dict[str, bool] = dict(
+            BrandRestriction.objects.values_list('normalized_name', 'is_allowed')
+        )
+
+    def get_active_config(self) -> BreakEvenAnalysisConfig:
+        """
+        Active config (see BreakEvenAnalysisConfig.get_active_config).
+
+        Raises:
+            ValueError: If there is no active config
+        """
+        if self.config is None:
+            raise ValueError(
+                'No active Break Even Analysis Config found. '
+                'Please configure one in the admin panel.'
+            )
+        return self.config
+
+    def get_usd_mxn_rate(self) -> Decimal:
+        """
+        Active USD to MXN rate (see ExchangeRate.get_active_usd_mxn_rate).
+
+        Raises:
+            ValueError: If there is no active rate
+        """
+        if self.usd_mxn_rate is None:
+            raise ValueError(
+                'No active USD→MXN exchange rate found. '
+                'Please configure one in the admin panel.'
+            )
+        return self.usd_mxn_rate
+
+    def get_brand_status(self, brand: str) -> dict:
+        """
+        Restriction status of a brand.
+
+        Args:
+            brand: Brand name as stored in Keepa or the product
+
+        Returns:
+            Dictionary with brand, is_allowed and is_blocked (brands without
+            a restriction are allowed)
+        """
+        normalized = (brand or '').strip().lower()
+        if not normalized:
+            return {'brand': '', 'is_allowed': True, 'is_blocked': False}
+        is_allowed = self.brand_rules.get(normalized, True)
+        return {'brand': brand, 'is_allowed': is_allowed, 'is_blocked': not is_allowed}
+
+
+_snapshot: Optional[ReferenceSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_reference_generation(key: str = PRICING_REFERENCE_KEY) -> int:
+    """Current generation of a versioned table set (0 before the first bump)."""
+    generation = ReferenceDataGeneration.objects.filter(
+        key=key
+    ).values_list('generation', flat=True).first()
+    return generation or 0
+
+
+def get_reference_snapshot() -> ReferenceSnapshot:
+    """
+    Get the process-wide reference snapshot, reloading it if it is stale.
+
+    Call it once per request (or per batch group) and pass the snapshot
+    down instead of calling it per row.
+
+    Returns:
+        ReferenceSnapshot at the current generation
+    """
+    global _snapshot
+    generation = get_reference_generation()
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.generation != generation:
+            _snapshot = ReferenceSnapshot(generation)
+        return _snapshot
+
+
+def bump_generation(key: str):
+    """
+    Mark a versioned table set as changed for every process.
+
+    Args:
+        key: ReferenceDataGeneration key of the table set
+    """
+    updated = ReferenceDataGeneration.objects.filter(key=key).update(
+        generation=F('generation') + 1
+    )
+    if not updated:
+        ReferenceDataGeneration.objects.get_or_create(key=key, defaults={'generation': 1})
+
+
+def bump_reference_generation():
+    """Mark the reference tables as changed for every process."""
+    clear_reference_snapshot()
+    bump_generation(PRICING_REFERENCE_KEY)
+
+
+def clear_reference_snapshot():
+    """Forget this process' snapshot."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
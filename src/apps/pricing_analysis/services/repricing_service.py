@@ -0,0 +1,328 @@
+"""
+Repricing Service
+
+What-if re-pricing of stored analyses, without any Keepa call:
+- Recomputes break even, recommended price, margin and feasibility of stored
+  PricingAnalysisResult rows under a candidate config and/or exchange rate,
+  a chunk of rows at a time with the vectorized PricingCalculator methods
+- Previews the changes or stores them as a new generation of results
+  (linked to the originals through repriced_from)
+"""
+
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import QuerySet
+from djmoney.money import Money
+
+from apps.pricing_analysis.models import (
+    BreakEvenAnalysisConfig,
+    PricingAnalysisResult,
+)
+from .analysis_service import PricingAnalysisService
+from .exceptions import AnalysisConfigNotFoundError
+from .pricing_calculator import (
+    BREAK_EVEN_PLACES,
+    COMPETITIVENESS_PLACES,
+    PricingCalculator,
+    to_decimal_places,
+)
+from .reference_data import get_reference_snapshot
+
+
+class RepricingService:
+    """Recompute stored pricing results under a candidate config or exchange rate."""
+
+    # Sources with a USA price (unavailable and buybox-owned results have none)
+    PRICED_SOURCES = ('buy_box', 'amazon', 'new')
+    CHUNK_SIZE = 2000
+
+    def __init__(
+        self,
+        config: Optional[BreakEvenAnalysisConfig] = None,
+        exchange_rate: Optional[Decimal] = None
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            config: Candidate config (default: the config each result used)
+            exchange_rate: Candidate USD to MXN rate (default: the rate each
+                result used)
+        """
+        self.config = config
+        self.exchange_rate = exchange_rate
+        self.calculator = PricingCalculator()
+        self.reference = get_reference_snapshot()
+
+    @classmethod
+    def latest_results(cls, asins: Optional[Iterable[str]] = None) -> QuerySet:
+        """
+        Latest result of every ASIN, when it is priced.
+
+        Args:
+            asins: Optional ASINs to restrict to
+
+        Returns:
+            Queryset of PricingAnalysisResult
+        """
+        latest = PricingAnalysisResult.objects.filter(
+            is_latest=True,
+            is_available_usa=True,
+            usa_cost_source__in=cls.PRICED_SOURCES,
+        )
+        if asins:
+            latest = latest.filter(asin__in=list(asins))
+        return latest
+
+    def _get_config(self, result: PricingAnalysisResult) -> BreakEvenAnalysisConfig:
+        """Config to reprice a result with."""
+        config = self.config or result.analysis_config
+        if config is not None:
+            return config
+        try:
+            return self.reference.get_active_config()
+        except ValueError as e:
+            raise AnalysisConfigNotFoundError(str(e))
+
+    def _get_blocked_brand(self, result: PricingAnalysisResult) -> str:
+        """Brand of the result if it is blocked (see BrandRestriction), else ''."""
+        brand = ''
+        if result.usa_keepa_data and result.usa_keepa_data.brand:
+            brand = result.usa_keepa_data.brand
+        elif result.product and getattr(result.product, 'brand', None):
+            brand = result.product.brand
+        if self.reference.get_brand_status(brand)['is_blocked']:
+            return brand
+        return ''
+
+    def _get_inputs(self, result: PricingAnalysisResult) -> dict:
+        """Config, rate, shipping, MX price and tax multiplier to reprice a result with."""
+        config = self._get_config(result)
+        if result.shipping_cost_used is not None:
+            shipping_cost_mxn = result.shipping_cost_used.amount
+        else:
+            shipping_cost_mxn = self.calculator.get_average_shipping_cost(config)
+        mx_current_price = None
+        if result.current_mx_amazon_price is not None and result.current_mx_amazon_price.amount > 0:
+            mx_current_price = result.current_mx_amazon_price.amount
+        return {
+            'config': config,
+            'exchange_rate': self.exchange_rate or result.exchange_rate,
+            'shipping_cost_mxn': shipping_cost_mxn,
+            'mx_current_price': mx_current_price,
+            'usa_tax_multiplier': PricingAnalysisService._get_usa_tax_multiplier(
+                result.usa_keepa_data, result.product
+            ),
+        }
+
+    def reprice(self, result: PricingAnalysisResult) -> dict:
+        """
+        Recompute the pricing of a stored result.
+
+        Args:
+            result: Priced PricingAnalysisResult (see PRICED_SOURCES)
+
+        Returns:
+            Dictionary with the inputs used (config, exchange_rate,
+            shipping_cost_mxn, mx_current_price), the break even breakdown,
+            the competitiveness analysis, recommended_price and blocked_brand
+            (empty unless the brand is blocked)
+
+        Raises:
+            AnalysisConfigNotFoundError: If the result has no config and there
+                is no candidate or active config
+        """
+        return self.reprice_many([result])[0]
+
+    def reprice_many(self, results: List[PricingAnalysisResult]) -> List[dict]:
+        """
+        Recompute the pricing of several stored results at once.
+
+        Rows sharing a config are computed together with the *_batch methods
+        of PricingCalculator and converted back to the Decimals the scalar
+        methods return.
+
+        Args:
+            results: Priced PricingAnalysisResult rows (see PRICED_SOURCES)
+
+        Returns:
+            One dictionary per result, in order, as returned by reprice
+
+        Raises:
+            AnalysisConfigNotFoundError: If a result has no config and there
+                is no candidate or active config
+        """
+        inputs = [self._get_inputs(result) for result in results]
+        by_config = {}
+        for index, row in enumerate(inputs):
+            config = row['config']
+            key = config.pk if config.pk is not None else id(config)
+            by_config.setdefault(key, (config, []))[1].append(index)
+
+        repriced = [None] * len(results)
+        for config, indexes in by_config.values():
+            rows = [inputs[index] for index in indexes]
+            breakdowns = self.calculator.calculate_break_even_batch(
+                usa_cost_usd=[results[index].usa_cost.amount for index in indexes],
+                exchange_rate=[row['exchange_rate'] for row in rows],
+                shipping_cost_mxn=[row['shipping_cost_mxn'] for row in rows],
+                config=config,
+                usa_tax_multiplier=[row['usa_tax_multiplier'] for row in rows],
+            )
+            competitiveness = self.calculator.analyze_competitiveness_batch(
+                break_even=breakdowns['break_even_price'],
+                current_mx_price=[row['mx_current_price'] or Decimal('0') for row in rows],
+                config=config,
+            )
+            recommended_prices = self.calculator.calculate_recommended_price_batch(
+                break_even_price=breakdowns['break_even_price'],
+                target_margin=config.target_profit_margin,
+            )
+
+            for position, (index, row) in enumerate(zip(indexes, rows)):
+                row_competitiveness = {
+                    'is_feasible': bool(competitiveness['is_feasible'][position]),
+                    'confidence_score': str(competitiveness['confidence_score'][position]),
+                    'meets_min_margin': bool(competitiveness['meets_min_margin'][position]),
+                    'meets_target_margin': bool(competitiveness['meets_target_margin'][position]),
+                }
+                for key, places in COMPETITIVENESS_PLACES.items():
+                    row_competitiveness[key] = to_decimal_places(competitiveness[key][position], places)
+                blocked_brand = self._get_blocked_brand(results[index])
+                if blocked_brand:
+                    row_competitiveness['is_feasible'] = False
+                    row_competitiveness['confidence_score'] = 'LOW'
+
+                repriced[index] = {
+                    'config': config,
+                    'exchange_rate': row['exchange_rate'],
+                    'shipping_cost_mxn': row['shipping_cost_mxn'],
+                    'mx_current_price': row['mx_current_price'],
+                    'breakdown': {
+                        key: to_decimal_places(breakdowns[key][position], places)
+                        for key, places in BREAK_EVEN_PLACES.items()
+                    },
+                    'competitiveness': row_competitiveness,
+                    'recommended_price': to_decimal_places(recommended_prices[position], 2),
+                    'blocked_brand': blocked_brand,
+                }
+        return repriced
+
+    def _reprice_all(self, results: QuerySet) -> Iterator[Tuple[PricingAnalysisResult, dict]]:
+        """Stream (result, repriced) pairs, repricing CHUNK_SIZE results at a time."""
+        results = results.select_related('product', 'usa_keepa_data', 'analysis_config')
+        rows = results.iterator(chunk_size=self.CHUNK_SIZE)
+        while True:
+            chunk = list(islice(rows, self.CHUNK_SIZE))
+            if not chunk:
+                return
+            yield from zip(chunk, self.reprice_many(chunk))
+
+    def preview(self, results: QuerySet) -> Iterator[dict]:
+        """
+        Compare stored results with their repricing, without saving anything.
+
+        Args:
+            results: Priced results to reprice (see latest_results)
+
+        Yields:
+            Dictionary per result with asin, result_id and the old/new
+            break_even_price, recommended_price, potential_profit_margin and
+            is_feasible
+        """
+        for result, repriced in self._reprice_all(results):
+            yield {
+                'result_id': result.pk,
+                'asin': result.asin,
+                'old_break_even_price': result.break_even_price.amount if result.break_even_price else None,
+                'new_break_even_price': repriced['breakdown']['break_even_price'],
+                'old_recommended_price': result.recommended_price.amount if result.recommended_price else None,
+                'new_recommended_price': repriced['recommended_price'],
+                'old_profit_margin': result.potential_profit_margin,
+                'new_profit_margin': repriced['competitiveness']['potential_profit_margin'],
+                'was_feasible': result.is_feasible,
+                'is_feasible': repriced['competitiveness']['is_feasible'],
+            }
+
+    def persist(self, results: QuerySet) -> int:
+        """
+        Store the repricing of every result as a new PricingAnalysisResult.
+
+        The new results keep the Keepa data and inputs of the originals,
+        point to them through repriced_from and become the latest results.
+
+        Args:
+            results: Priced results to reprice (see latest_results)
+
+        Returns:
+            Number of results created
+
+        Raises:
+            ValueError: If the candidate config is not saved
+        """
+        if self.config is not None and self.config.pk is None:
+            raise ValueError('Save the candidate config before persisting repriced results.')
+
+        created = 0
+        pending: List[PricingAnalysisResult] = []
+        asins = set()
+        with transaction.atomic():
+            for result, repriced in self._reprice_all(results):
+                pending.append(self._build_result(result, repriced))
+                asins.add(result.asin)
+                if len(pending) >= self.CHUNK_SIZE:
+                    created += len(PricingAnalysisResult.objects.bulk_create(pending))
+                    pending = []
+            if pending:
+                created += len(PricingAnalysisResult.objects.bulk_create(pending))
+            # bulk_create skips PricingAnalysisResult.save(); flags are moved
+            # once the results being iterated are no longer read
+            PricingAnalysisResult.refresh_latest(asins)
+        return created
+
+    def _build_result(self, result: PricingAnalysisResult, repriced: dict) -> PricingAnalysisResult:
+        """Unsaved PricingAnalysisResult holding the repricing of `result`."""
+        breakdown = repriced['breakdown']
+        competitiveness = repriced['competitiveness']
+        analysis_notes = PricingAnalysisService._generate_analysis_notes(
+            competitiveness=competitiveness,
+            usa_cost=result.usa_cost.amount,
+            usa_cost_source=result.usa_cost_source,
+            break_even=breakdown['break_even_price'],
+            mx_current_price=repriced['mx_current_price'],
+            recommended_price=repriced['recommended_price'],
+        )
+        if repriced['blocked_brand']:
+            analysis_notes = f'⛔ Marca bloqueada: {repriced["blocked_brand"]}\n\n' + analysis_notes
+        analysis_notes = f'♻ Recalculado del análisis #{result.pk} sin consultar Keepa\n\n' + analysis_notes
+
+        return PricingAnalysisResult(
+            product_id=result.product_id,
+            asin=result.asin,
+            usa_keepa_data_id=result.usa_keepa_data_id,
+            mx_keepa_data_id=result.mx_keepa_data_id,
+            analysis_config=repriced['config'],
+            repriced_from=result,
+            # Inputs
+            usa_cost=result.usa_cost,
+            usa_cost_source=result.usa_cost_source,
+            exchange_rate=repriced['exchange_rate'].quantize(Decimal('0.0001')),
+            current_mx_amazon_price=Money(repriced['mx_current_price'] or Decimal('0'), 'MXN'),
+            # Calculations
+            cost_base_mxn=Money(breakdown['cost_base'], 'MXN'),
+            vat_retention=Money(breakdown['vat_retention'], 'MXN'),
+            isr_retention=Money(breakdown['isr_retention'], 'MXN'),
+            shipping_cost_used=Money(repriced['shipping_cost_mxn'], 'MXN'),
+            break_even_price=Money(breakdown['break_even_price'], 'MXN'),
+            # Results
+            is_available_usa=True,
+            is_feasible=competitiveness['is_feasible'],
+            recommended_price=Money(repriced['recommended_price'], 'MXN'),
+            price_difference=Money(competitiveness['price_difference'], 'MXN'),
+            potential_profit_margin=competitiveness['potential_profit_margin'].quantize(Decimal('0.0001')),
+            confidence_score=competitiveness['confidence_score'],
+            analysis_notes=analysis_notes,
+        )
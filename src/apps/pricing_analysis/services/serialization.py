@@ -0,0 +1,176 @@
+"""
+JSON serialization helpers
+
+Single-pass conversion of Keepa responses (numpy arrays, pandas objects,
+datetimes, NaN/inf) into values that can be stored in a JSONField.
+"""
+
+import datetime
+import decimal
+import math
+import uuid
+from typing import Any
+
+import numpy as np
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.functional import Promise
+
+# Types DjangoJSONEncoder knows how to encode
+_DJANGO_ENCODED_TYPES = (
+    datetime.datetime,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+    decimal.Decimal,
+    uuid.UUID,
+    Promise,
+)
+_django_encoder = DjangoJSONEncoder()
+# Types that are stored as is (float is not: NaN/inf must become null)
+_JSON_SCALAR_TYPES = {type(None), str, bool, int}
+
+
+def _convert_key(key: Any) -> str:
+    """Convert a dict key the way json.dumps does."""
+    if isinstance(key, str):
+        return key
+    if key is True:
+        return 'true'
+    if key is False:
+        return 'false'
+    if key is None:
+        return 'null'
+    if isinstance(key, np.generic):
+        key = key.item()
+    if isinstance(key, float):
+        return repr(key)
+    if isinstance(key, int):
+        return str(key)
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
+
+
+def _convert_list(values: list) -> list:
+    """Convert a list of values produced by ndarray.tolist() or user data."""
+    types = {type(value) for value in values}
+    if types <= _JSON_SCALAR_TYPES:
+        # Keepa csv histories: plain ints, nothing to convert
+        return list(values)
+    if types == {datetime.datetime} and all(value.tzinfo is None for value in values):
+        # Keepa *_time arrays: naive datetimes only
+        return [_format_naive_datetime(value) for value in values]
+    return [_convert(value) for value in values]
+
+
+def _convert_float_array(array: np.ndarray) -> list:
+    """Convert a float ndarray, replacing NaN and inf with None."""
+    finite = np.isfinite(array)
+    if finite.all():
+        return array.tolist()
+    converted = array.astype(object)
+    converted[~finite] = None
+    return converted.tolist()
+
+
+def _convert_datetime_array(array: np.ndarray) -> list:
+    """
+    Format a datetime64 ndarray like DjangoJSONEncoder formats naive datetimes.
+
+    Seconds precision when there are no microseconds, milliseconds otherwise;
+    NaT becomes None.
+    """
+    array = array.astype('datetime64[us]')
+    seconds = array.astype('datetime64[s]')
+    converted = np.datetime_as_string(seconds, unit='s').astype(object)
+    fractional = array != seconds
+    if fractional.any():
+        converted[fractional] = np.datetime_as_string(array[fractional], unit='ms')
+    converted[np.isnat(array)] = None
+    return converted.tolist()
+
+
+def _format_naive_datetime(value: datetime.datetime) -> str:
+    """Format a naive datetime exactly like DjangoJSONEncoder."""
+    if value.microsecond:
+        return value.isoformat(timespec='milliseconds')
+    return value.isoformat()
+
+
+def _convert_array(array: np.ndarray) -> list:
+    """Convert an ndarray according to its dtype."""
+    kind = array.dtype.kind
+    if kind in 'biu':
+        # Integers and booleans are JSON ready as is
+        return array.tolist()
+    if kind == 'f':
+        return _convert_float_array(array)
+    if kind == 'M':
+        return _convert_datetime_array(array)
+    return _convert_list(array.tolist())
+
+
+def _convert(value: Any) -> Any:
+    """Convert one value (recursively) into a JSON-ready value."""
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        # float() also unwraps np.float64, which subclasses float
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {_convert_key(key): _convert(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return _convert_list(value)
+    if isinstance(value, np.ndarray):
+        return _convert_array(value)
+    if isinstance(value, np.generic):
+        if isinstance(value, np.datetime64):
+            value = value.astype('datetime64[us]')
+        return _convert(value.item())
+    if isinstance(value, _DJANGO_ENCODED_TYPES):
+        return _django_encoder.default(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='ignore')
+
+    module = value.__class__.__module__
+    name = value.__class__.__name__
+    if module.startswith('pandas'):
+        if name == 'DataFrame':
+            try:
+                if not value.columns.is_unique:
+                    return _convert(value.to_dict(orient='list'))
+                # Same as to_dict(orient='list'), converting each column as an array
+                return {
+                    _convert_key(column): _convert_array(value[column].to_numpy())
+                    for column in value.columns
+                }
+            except Exception:
+                return {}
+        if name == 'Series':
+            try:
+                return _convert_list(value.to_list())
+            except Exception:
+                return []
+
+    raise TypeError(f'Object of type {name} is not JSON serializable')
+
+
+def to_json_compatible(obj: Any) -> Any:
+    """
+    Convert Keepa data to JSON-serializable format in a single pass.
+
+    Handles numpy arrays and scalars, NaN/inf (stored as null), datetimes
+    (ISO strings, like DjangoJSONEncoder), bytes and pandas DataFrame/Series.
+
+    Args:
+        obj: Object to convert
+
+    Returns:
+        JSON-serializable version of the object, or only imagesCSV (if any)
+        when the object contains a type that cannot be serialized
+    """
+    try:
+        return _convert(obj)
+    except (TypeError, ValueError) as e:
+        print(f"Warning: Could not serialize Keepa data: {e}")
+        if isinstance(obj, dict) and isinstance(obj.get('imagesCSV'), str) and obj['imagesCSV']:
+            return {'imagesCSV': obj['imagesCSV']}
+        return {}
@@ -0,0 +1,47 @@
+"""Signals for pricing_analysis app."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.pricing_analysis.models import (
+    BrandRestriction,
+    BreakEvenAnalysisConfig,
+    ExchangeRate,
+    KeepaConfiguration,
+    PricingAnalysisResult,
+)
+from apps.pricing_analysis.services.keepa_service import KeepaService
+from apps.pricing_analysis.services.reference_data import (
+    bump_reference_generation,
+    clear_reference_snapshot,
+)
+
+
+@receiver(post_save, sender=KeepaConfiguration)
+@receiver(post_delete, sender=KeepaConfiguration)
+def invalidate_keepa_clients(sender, **kwargs):
+    """Make every process reload the Keepa config once the change is committed."""
+    KeepaService.clear_cached_config()
+    transaction.on_commit(KeepaService.bump_config_generation)
+
+
+@receiver(post_save, sender=BreakEvenAnalysisConfig)
+@receiver(post_delete, sender=BreakEvenAnalysisConfig)
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+@receiver(post_save, sender=BrandRestriction)
+@receiver(post_delete, sender=BrandRestriction)
+def invalidate_reference_snapshot(sender, **kwargs):
+    """Make every process reload the reference tables once the change is committed."""
+    clear_reference_snapshot()
+    # Bumping before commit would let another process cache the old rows
+    # under the new generation
+    transaction.on_commit(bump_reference_generation)
+
+
+@receiver(post_delete, sender=PricingAnalysisResult)
+def promote_previous_result(sender, instance, **kwargs):
+    """Flag the previous result of the ASIN as latest when the latest is deleted."""
+    if instance.is_latest:
+        PricingAnalysisResult.refresh_latest([instance.asin])
@@ -0,0 +1,166 @@
+"""Tests for PricingAnalysisService."""
+
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.pricing_analysis.models import (
+    BrandRestriction,
+    BreakEvenAnalysisConfig,
+    ExchangeRate,
+    KeepaConfiguration,
+    KeepaProductData,
+    PricingAnalysisBatch,
+    PricingAnalysisResult,
+)
+from apps.pricing_analysis.services.analysis_service import PricingAnalysisService
+from apps.pricing_analysis.services.reference_data import get_reference_snapshot
+from apps.pricing_analysis.tests.test_keepa_service import make_keepa_product, patch_keepa_client
+from apps.pricing_analysis.views import PricingAnalysisResultDetailView
+from apps.products.models import Product
+
+
+class PricingAnalysisFingerprintTest(TestCase):
+    """Test re-analyses with unchanged inputs confirm the latest result."""
+
+    def setUp(self):
+        """Set up config, exchange rate and the stored Keepa data of one ASIN."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True, daily_token_limit=1000)
+        patch_keepa_client(self)
+        self.config = BreakEvenAnalysisConfig.objects.create(name='Default', is_active=True)
+        self.rate = ExchangeRate.objects.create(
+            from_currency='USD', to_currency='MXN', rate=Decimal('17.5000'), is_active=True
+        )
+        product = Product.objects.create(sku='TEST-B000000001', title='Test', external_id='B000000001')
+        self.usa_data = KeepaProductData.objects.create(
+            product=product, asin='B000000001', marketplace='US',
+            brand='Acme', buy_box_price=Decimal('20.00'),
+        )
+        self.mx_data = KeepaProductData.objects.create(
+            product=product, asin='B000000001', marketplace='MX', buy_box_price=Decimal('1500.00'),
+        )
+        self.service = PricingAnalysisService()
+
+    def analyze(self, **kwargs):
+        """Analyze the ASIN with the stored Keepa data."""
+        return self.service._analyze_keepa_data(
+            asin='B000000001',
+            usa_keepa_data=self.usa_data,
+            mx_keepa_data=self.mx_data,
+            shipping_cost_mxn=None,
+            config=self.config,
+            **kwargs
+        )
+
+    def test_unchanged_inputs_confirm_latest_result(self):
+        """A second run with the same inputs inserts nothing."""
+        first = self.analyze()
+        self.assertEqual(len(first.input_fingerprint), 64)
+        self.assertIsNone(first.last_confirmed_at)
+
+        second = self.analyze()
+
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(PricingAnalysisResult.objects.count(), 1)
+        first.refresh_from_db()
+        self.assertIsNotNone(first.last_confirmed_at)
+
+    def test_changed_inputs_create_new_result(self):
+        """Prices, exchange rate, config edits and brand status are part of the fingerprint."""
+        results = [self.analyze()]
+
+        self.mx_data.buy_box_price = Decimal('1400.00')
+        self.mx_data.save()
+        results.append(self.analyze())
+
+        self.rate.rate = Decimal('18.0000')
+        self.rate.save()
+        results.append(self.analyze())
+
+        self.config.target_profit_margin = Decimal('0.40')
+        self.config.save()
+        results.append(self.analyze())
+
+        BrandRestriction.objects.create(name='Acme', is_allowed=False)
+        results.append(self.analyze())
+
+        self.assertEqual(len({result.pk for result in results}), 5)
+        self.assertEqual(len({result.input_fingerprint for result in results}), 5)
+        self.assertFalse(results[-1].is_feasible)
+
+    def test_only_latest_result_is_compared(self):
+        """Going back to older inputs stores a new result."""
+        first = self.analyze()
+        self.mx_data.buy_box_price = Decimal('1400.00')
+        self.mx_data.save()
+        self.analyze()
+        self.mx_data.buy_box_price = Decimal('1500.00')
+        self.mx_data.save()
+
+        third = self.analyze()
+
+        self.assertNotEqual(third.pk, first.pk)
+        self.assertEqual(third.input_fingerprint, first.input_fingerprint)
+
+    def test_prefetched_latest_results_are_used(self):
+        """Batches pass the latest results and reference data of a group."""
+        first = self.analyze()
+        latest_results = PricingAnalysisService._latest_results(['B000000001'])
+        reference = get_reference_snapshot()
+
+        with self.assertNumQueries(1):
+            # Only the confirmation UPDATE
+            confirmed = self.analyze(latest_results=latest_results, reference=reference)
+
+        self.assertEqual(confirmed.pk, first.pk)
+
+    def test_unavailable_result_is_confirmed(self):
+        """Unavailable products are deduplicated too."""
+        self.usa_data.buy_box_price = None
+        self.usa_data.save()
+
+        first = self.analyze()
+        second = self.analyze()
+
+        self.assertFalse(first.is_available_usa)
+        self.assertEqual(second.pk, first.pk)
+
+    def test_decimal_scale_does_not_change_fingerprint(self):
+        """17.5 and 17.5000 are the same input."""
+        self.assertEqual(
+            PricingAnalysisService._fingerprint_inputs(rate=Decimal('17.5')),
+            PricingAnalysisService._fingerprint_inputs(rate=Decimal('17.5000')),
+        )
+
+
+class PricingBatchChartTest(TestCase):
+    """Test batch-analyzed products keep the data of the detail chart."""
+
+    def setUp(self):
+        """Set up config, exchange rate and a Keepa client returning price history."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True, daily_token_limit=1000)
+        api = patch_keepa_client(self)
+        api.query.side_effect = lambda items, **kwargs: [self.make_product(asin) for asin in items]
+        BreakEvenAnalysisConfig.objects.create(name='Default', is_active=True)
+        ExchangeRate.objects.create(
+            from_currency='USD', to_currency='MXN', rate=Decimal('17.5000'), is_active=True
+        )
+
+    @staticmethod
+    def make_product(asin):
+        """Build a product with Buy Box history (csv[18])."""
+        product = make_keepa_product(asin)
+        product['csv'] = [None] * 18 + [[6000000, 1599, 6001440, 1499]]
+        return product
+
+    def test_batch_result_renders_price_history(self):
+        """Batches fetch the full profile, so the chart has data."""
+        batch = PricingAnalysisBatch.objects.create(name='Chart', asins=['B000000001'])
+
+        PricingAnalysisService().process_batch(batch, force_refresh=True)
+
+        result = PricingAnalysisResult.objects.get(asin='B000000001', is_latest=True)
+        self.assertEqual(result.usa_keepa_data.fetch_profile, 'full')
+        history = PricingAnalysisResultDetailView()._extract_price_history(result.usa_keepa_data)
+        self.assertTrue(history['has_data'])
+        self.assertEqual(history['prices'], [15.99, 14.99])
@@ -0,0 +1,97 @@
+"""Tests for the buffered Keepa API log writer."""
+
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from apps.pricing_analysis.models import KeepaAPILog
+from apps.pricing_analysis.services import api_log
+from apps.pricing_analysis.services.api_log import KeepaAPILogBuffer, log_keepa_api_call
+
+
+def log_entry(buffer, status=200, error='', response_data=None):
+    """Queue one query log entry."""
+    return buffer.log(
+        endpoint='query',
+        request_params={'asin': 'B07XYZ1234'},
+        response_status=status,
+        response_data=response_data or {'products_count': 1},
+        tokens_consumed=1,
+        error_message=error,
+        execution_time_ms=120,
+    )
+
+
+class KeepaAPILogBufferTest(TestCase):
+    """Test KeepaAPILogBuffer."""
+
+    def setUp(self):
+        """Set up a buffer without writer thread (flushed explicitly)."""
+        self.buffer = KeepaAPILogBuffer(
+            batch_size=10, sample_rate=1.0, max_body_chars=100, autostart=False
+        )
+
+    def test_log_does_not_touch_database(self):
+        """Entries stay in memory until flushed, then are written in one query."""
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                log_entry(self.buffer)
+
+        with self.assertNumQueries(1):
+            written = self.buffer.flush()
+
+        self.assertEqual(written, 3)
+        self.assertEqual(KeepaAPILog.objects.count(), 3)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_sampling_keeps_errors(self):
+        """Successful calls are sampled out, errors are always logged."""
+        self.buffer.sample_rate = 0
+
+        self.assertFalse(log_entry(self.buffer))
+        self.assertTrue(log_entry(self.buffer, status=500, error='boom'))
+        self.buffer.flush()
+
+        self.assertEqual(list(KeepaAPILog.objects.values_list('response_status', flat=True)), [500])
+
+    def test_large_bodies_are_truncated(self):
+        """Bodies over max_body_chars are stored as a preview."""
+        log_entry(self.buffer, response_data={'body': 'x' * 500})
+        self.buffer.flush()
+
+        response_data = KeepaAPILog.objects.get().response_data
+        self.assertTrue(response_data['truncated'])
+        self.assertEqual(len(response_data['preview']), 100)
+        self.assertGreater(response_data['original_size'], 500)
+
+    def test_full_buffer_drops_oldest(self):
+        """A full buffer drops the oldest entries instead of growing."""
+        buffer = KeepaAPILogBuffer(batch_size=10, max_buffer=2, autostart=False)
+
+        for status in (200, 201, 202):
+            log_entry(buffer, status=status)
+        buffer.flush()
+
+        self.assertEqual(buffer.dropped, 1)
+        self.assertEqual(
+            sorted(KeepaAPILog.objects.values_list('response_status', flat=True)), [201, 202]
+        )
+
+    def test_full_batch_wakes_writer(self):
+        """Reaching batch_size wakes the writer thread."""
+        for _ in range(9):
+            log_entry(self.buffer)
+        self.assertFalse(self.buffer._wakeup.is_set())
+
+        log_entry(self.buffer)
+
+        self.assertTrue(self.buffer._wakeup.is_set())
+
+    @override_settings(KEEPA_API_LOG_ENABLED=False)
+    def test_disabled_logging(self):
+        """KEEPA_API_LOG_ENABLED=False skips the buffer entirely."""
+        with mock.patch.object(api_log, 'get_api_log_buffer') as get_buffer:
+            queued = log_keepa_api_call(endpoint='query', request_params={}, response_status=200, response_data={})
+
+        self.assertFalse(queued)
+        get_buffer.assert_not_called()
@@ -1,10 +1,11 @@
 """Tests for PricingCalculator."""
 
+import random
 from decimal import Decimal
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 
 from apps.pricing_analysis.models import BreakEvenAnalysisConfig
-from apps.pricing_analysis.services.pricing_calculator import PricingCalculator
+from apps.pricing_analysis.services.pricing_calculator import PricingCalculator, to_decimal_places
 
 
 class PricingCalculatorTest(TestCase):
@@ -147,3 +148,82 @@ class PricingCalculatorTest(TestCase):
             config=self.config
         )
         self.assertEqual(result['confidence_score'], 'LOW')
+
+
+class PricingCalculatorBatchTest(SimpleTestCase):
+    """Property test: the batch variants match the Decimal path to the cent."""
+
+    SEED = 20261017
+    ROWS = 2000
+
+    def random_config(self, rng):
+        """Unsaved config with random rates (4 decimals, like the model)."""
+        def rate(low, high):
+            return Decimal(rng.randint(low, high)) / Decimal('10000')
+
+        return BreakEvenAnalysisConfig(
+            name='Random',
+            import_admin_cost_rate=rate(0, 4000),
+            iva_tax_rate=rate(0, 2500),
+            vat_retention_rate=rate(0, 1600),
+            isr_retention_rate=rate(0, 500),
+            marketplace_fee_rate=rate(0, 3000),
+            min_profit_margin=rate(0, 3000),
+            target_profit_margin=rate(0, 6000),
+        )
+
+    def assert_batch_matches(self, config, usa_costs, rates, shipping, multipliers, mx_prices):
+        """Compare every batch field with the scalar path, row by row."""
+        calculator = PricingCalculator
+        breakdown = calculator.calculate_break_even_batch(usa_costs, rates, shipping, config, multipliers)
+        break_even = [
+            to_decimal_places(value, 2) for value in breakdown['break_even_price']
+        ]
+        recommended = calculator.calculate_recommended_price_batch(break_even, config.target_profit_margin)
+        competitiveness = calculator.analyze_competitiveness_batch(break_even, mx_prices, config)
+
+        for index in range(len(usa_costs)):
+            expected = calculator.calculate_break_even(
+                usa_costs[index], rates[index], shipping[index], config, multipliers[index]
+            )
+            for key, value in expected.items():
+                places = -value.as_tuple().exponent
+                self.assertEqual(to_decimal_places(breakdown[key][index], places), value, (index, key))
+
+            self.assertEqual(
+                to_decimal_places(recommended[index], 2),
+                calculator.calculate_recommended_price(expected['break_even_price'], config.target_profit_margin),
+            )
+            expected = calculator.analyze_competitiveness(
+                expected['break_even_price'], mx_prices[index], config
+            )
+            for key, value in expected.items():
+                actual = competitiveness[key][index]
+                if isinstance(value, Decimal):
+                    actual = to_decimal_places(actual, -value.as_tuple().exponent)
+                self.assertEqual(actual, value, (index, key))
+
+    def test_random_rows_match_decimal_path(self):
+        """Random prices, rates and configs give the same fields as the scalar path."""
+        rng = random.Random(self.SEED)
+        for _ in range(5):
+            config = self.random_config(rng)
+            usa_costs = [Decimal(rng.randint(1, 500000)) / 100 for _ in range(self.ROWS)]
+            rates = [Decimal(rng.randint(150000, 250000)) / 10000 for _ in range(self.ROWS)]
+            shipping = [Decimal(rng.randint(0, 30000)) / 100 for _ in range(self.ROWS)]
+            multipliers = [rng.choice([Decimal('1.0825'), Decimal('1.0000')]) for _ in range(self.ROWS)]
+            mx_prices = [
+                rng.choice([None, Decimal('0'), Decimal(rng.randint(1, 5000000)) / 100])
+                for _ in range(self.ROWS)
+            ]
+            self.assert_batch_matches(config, usa_costs, rates, shipping, multipliers, mx_prices)
+
+    def test_rounding_ties_match_decimal_path(self):
+        """Half-cent ties are rounded half to even, like Decimal.quantize."""
+        config = BreakEvenAnalysisConfig(name='Ties')
+        # 355 * 20.025 = 7108.875 exactly, which float64 rounds down to 7108.87
+        usa_costs = [Decimal('355.00'), Decimal('650.00'), Decimal('722.75')]
+        rates = [Decimal('20.025'), Decimal('19.0481'), Decimal('20.58')]
+        ones = [Decimal('1')] * 3
+
+        self.assert_batch_matches(config, usa_costs, rates, [Decimal('0')] * 3, ones, [None] * 3)
@@ -0,0 +1,364 @@
+"""Tests for the pricing batch job queue."""
+
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.pricing_analysis.models import (
+    BreakEvenAnalysisConfig,
+    KeepaConfiguration,
+    PricingAnalysisBatch,
+    PricingAnalysisBatchItem,
+    PricingAnalysisJob,
+    PricingAnalysisResult,
+)
+from apps.pricing_analysis.services.analysis_service import PricingAnalysisService
+from apps.pricing_analysis.services.exceptions import (
+    AnalysisConfigNotFoundError,
+    JobLeaseLostError,
+    KeepaAPIError,
+)
+from apps.pricing_analysis.services.job_queue import (
+    claim_next_job,
+    enqueue_batch,
+    requeue_stale_jobs,
+    run_job,
+    submit_batch,
+)
+from apps.pricing_analysis.services.keepa_service import KeepaService
+from apps.pricing_analysis.tests.test_keepa_service import make_keepa_product, patch_keepa_client
+from apps.products.models import Product
+
+
+class PricingJobQueueTest(TestCase):
+    """Test submitting, claiming and running pricing jobs."""
+
+    def setUp(self):
+        """Set up an active analysis config."""
+        BreakEvenAnalysisConfig.objects.update(is_active=False)
+        BreakEvenAnalysisConfig.objects.create(name='Queue Config', is_active=True)
+
+    def test_submit_creates_pending_batch_and_job(self):
+        """Submitting only stores the batch and its job."""
+        batch = submit_batch(['B000000001', 'B000000002'], 'Queued')
+
+        self.assertEqual(batch.status, 'PENDING')
+        self.assertEqual(batch.total_asins, 2)
+        self.assertEqual(batch.jobs.get().status, PricingAnalysisJob.STATUS_QUEUED)
+
+    def test_enqueue_is_idempotent_while_active(self):
+        """A batch already queued keeps its job."""
+        batch = submit_batch(['B000000001'], 'Queued')
+
+        job = enqueue_batch(batch)
+
+        self.assertEqual(batch.jobs.count(), 1)
+        self.assertEqual(job, batch.jobs.get())
+
+    def test_one_active_job_per_batch(self):
+        """A second active job of a batch violates the constraint; enqueue returns the first."""
+        batch = submit_batch(['B000000001'], 'Queued')
+        job = batch.jobs.get()
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PricingAnalysisJob.objects.create(batch=batch)
+
+        # A concurrent enqueue whose check ran before the job existed
+        first = QuerySet.first
+
+        def miss_active_job(queryset):
+            return None if queryset.model is PricingAnalysisJob else first(queryset)
+
+        with mock.patch.object(QuerySet, 'first', miss_active_job):
+            self.assertEqual(enqueue_batch(batch), job)
+        self.assertEqual(batch.jobs.count(), 1)
+
+    def test_submit_without_config_fails_fast(self):
+        """A missing config is reported to the submitter, not the worker."""
+        BreakEvenAnalysisConfig.objects.update(is_active=False)
+
+        with self.assertRaises(AnalysisConfigNotFoundError):
+            submit_batch(['B000000001'], 'No config')
+
+        self.assertFalse(PricingAnalysisJob.objects.exists())
+
+    def test_claim_takes_each_job_once(self):
+        """Jobs are claimed oldest first and never twice."""
+        first = submit_batch(['B000000001'], 'First')
+        second = submit_batch(['B000000002'], 'Second')
+
+        jobs = [claim_next_job('worker-a'), claim_next_job('worker-b'), claim_next_job('worker-c')]
+
+        self.assertEqual([job.batch_id for job in jobs[:2]], [first.pk, second.pk])
+        self.assertIsNone(jobs[2])
+        self.assertEqual(jobs[0].status, PricingAnalysisJob.STATUS_RUNNING)
+        self.assertEqual((jobs[0].worker, jobs[0].attempts), ('worker-a', 1))
+
+    def test_run_job_processes_batch(self):
+        """Running a job processes its batch with the stored options."""
+        batch = submit_batch(['B000000001'], 'Run', force_refresh=True)
+        job = claim_next_job('worker')
+        service = mock.Mock()
+
+        job = run_job(job, service=service)
+
+        service.process_batch.assert_called_once()
+        self.assertEqual(service.process_batch.call_args.args, (batch,))
+        self.assertTrue(service.process_batch.call_args.kwargs['force_refresh'])
+        self.assertEqual(job.status, PricingAnalysisJob.STATUS_DONE)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_fails_batch(self):
+        """An error in the worker marks the job and the batch as failed."""
+        batch = submit_batch(['B000000001'], 'Broken')
+        service = mock.Mock()
+        service.process_batch.side_effect = RuntimeError('boom')
+
+        with self.assertLogs('apps.pricing_analysis.services.job_queue', 'ERROR'):
+            job = run_job(claim_next_job('worker'), service=service)
+
+        self.assertEqual((job.status, job.error), (PricingAnalysisJob.STATUS_FAILED, 'boom'))
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'FAILED')
+
+    def test_stale_jobs_are_requeued(self):
+        """Jobs of dead workers go back to the queue until attempts run out."""
+        submit_batch(['B000000001'], 'Stale')
+        job = claim_next_job('dead-worker')
+        PricingAnalysisJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(hours=2)
+        )
+
+        self.assertEqual(requeue_stale_jobs(stale_seconds=3600), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PricingAnalysisJob.STATUS_QUEUED)
+
+        PricingAnalysisJob.objects.filter(pk=job.pk).update(
+            status=PricingAnalysisJob.STATUS_RUNNING,
+            attempts=3,
+            heartbeat_at=timezone.now() - timedelta(hours=2),
+        )
+        requeue_stale_jobs(stale_seconds=3600)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PricingAnalysisJob.STATUS_FAILED)
+        self.assertEqual(job.batch.status, 'FAILED')
+
+    def test_lost_lease_stops_worker(self):
+        """A worker whose job was taken over stops without touching the job."""
+        submit_batch(['B000000001'], 'Taken over')
+        job = claim_next_job('slow-worker')
+        PricingAnalysisJob.objects.filter(pk=job.pk).update(worker='other-worker', attempts=2)
+        service = mock.Mock()
+        service.process_batch.side_effect = lambda batch, heartbeat, **kwargs: heartbeat()
+
+        with self.assertLogs('apps.pricing_analysis.services.job_queue', 'WARNING'):
+            self.assertIsNone(run_job(job, service=service))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (PricingAnalysisJob.STATUS_RUNNING, 'other-worker'))
+
+    def test_service_errors_fail_the_job(self):
+        """A service that cannot be built (no Keepa config) fails the job, not the worker."""
+        batch = submit_batch(['B000000001'], 'No Keepa')
+
+        with mock.patch(
+            'apps.pricing_analysis.services.job_queue.PricingAnalysisService',
+            side_effect=KeepaAPIError('No active Keepa configuration'),
+        ), self.assertLogs('apps.pricing_analysis.services.job_queue', 'ERROR'):
+            job = run_job(claim_next_job('worker'))
+
+        self.assertEqual(
+            (job.status, job.error), (PricingAnalysisJob.STATUS_FAILED, 'No active Keepa configuration')
+        )
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'FAILED')
+
+    def test_worker_reports_lost_lease(self):
+        """The worker command reports a taken-over job apart from failures."""
+        submit_batch(['B000000001'], 'Taken over')
+        stdout, stderr = StringIO(), StringIO()
+
+        with mock.patch(
+            'apps.pricing_analysis.management.commands.run_pricing_worker.run_job', return_value=None
+        ):
+            call_command('run_pricing_worker', '--burst', stdout=stdout, stderr=stderr)
+
+        self.assertIn('taken over by another worker', stdout.getvalue())
+        self.assertEqual(stderr.getvalue(), '')
+
+    def test_analyze_bulk_returns_accepted(self):
+        """The bulk endpoint answers 202 with the batch id without analyzing."""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username='api', password='x'))
+
+        with mock.patch(
+            'apps.pricing_analysis.services.analysis_service.PricingAnalysisService.process_batch'
+        ) as process_batch:
+            response = client.post(
+                '/api/v1/pricing-analysis/analyze_bulk/',
+                {'asins': ['B000000001'], 'batch_name': 'API'},
+                format='json',
+            )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(PricingAnalysisBatch.objects.get(pk=response.data['id']).status, 'PENDING')
+        process_batch.assert_not_called()
+
+
+class PricingBatchCheckpointTest(TestCase):
+    """Test per-ASIN checkpoints and resuming interrupted batches."""
+
+    def setUp(self):
+        """Set up a mocked Keepa client and a one-ASIN-per-group service."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True, daily_token_limit=1000)
+        self.config = BreakEvenAnalysisConfig.objects.create(name='Checkpoint Config', is_active=True)
+        api = patch_keepa_client(self)
+        api.query.side_effect = lambda items, **kwargs: [make_keepa_product(asin) for asin in items]
+        patcher = mock.patch.object(KeepaService, 'BULK_QUERY_LIMIT', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = PricingAnalysisService()
+        self.service.keepa_service.max_concurrency = 1
+        self.analyzed = []
+        self.errors = {}
+        self.service._analyze_keepa_data = self.analyze
+        self.batch = PricingAnalysisBatch.objects.create(
+            name='Checkpoints', asins=['B000000001', 'B000000002', 'B000000003']
+        )
+
+    def analyze(self, asin, **kwargs):
+        """Record the analyzed ASIN and return a minimal result (or raise)."""
+        self.analyzed.append(asin)
+        if asin in self.errors:
+            raise self.errors.pop(asin)
+        product = Product.objects.create(sku=f'TEST-{asin}', title=asin, external_id=asin)
+        return PricingAnalysisResult.objects.create(
+            product=product, asin=asin, analysis_config=self.config, is_available_usa=True
+        )
+
+    def test_interrupted_batch_resumes_where_it_stopped(self):
+        """Only ASINs without checkpoint are analyzed again."""
+        def heartbeat():
+            if self.analyzed:
+                raise JobLeaseLostError('taken over')
+
+        with self.assertRaises(JobLeaseLostError):
+            self.service.process_batch(self.batch, force_refresh=True, heartbeat=heartbeat)
+        self.assertEqual(self.analyzed, ['B000000001'])
+
+        batch = self.service.process_batch(self.batch, force_refresh=True)
+
+        self.assertEqual(self.analyzed, ['B000000001', 'B000000002', 'B000000003'])
+        self.assertEqual(batch.status, 'COMPLETED')
+        self.assertEqual((batch.processed_asins, batch.successful_analyses), (3, 3))
+        self.assertEqual(batch.results.count(), 3)
+
+    def test_only_retryable_failures_are_retried(self):
+        """Keepa errors are retried on resume, analysis errors are not."""
+        self.errors = {
+            'B000000001': KeepaAPIError('timeout'),
+            'B000000002': ValueError('bad data'),
+        }
+        batch = self.service.process_batch(self.batch, force_refresh=True)
+        self.assertEqual((batch.failed_analyses, batch.processed_asins), (2, 3))
+
+        self.analyzed = []
+        batch = self.service.process_batch(self.batch, force_refresh=True)
+
+        self.assertEqual(self.analyzed, ['B000000001'])
+        self.assertEqual((batch.successful_analyses, batch.failed_analyses), (2, 1))
+        self.assertEqual(batch.get_error_log(), {'B000000002': 'bad data'})
+        self.assertEqual(
+            list(batch.items.values_list('status', flat=True)),
+            [PricingAnalysisBatchItem.STATUS_DONE, PricingAnalysisBatchItem.STATUS_FAILED,
+             PricingAnalysisBatchItem.STATUS_DONE],
+        )
+
+    def test_tokens_are_reserved_per_group(self):
+        """Each group reserves only its own worst case and releases it once fetched."""
+        pool = self.service.keepa_service.pool
+        with mock.patch.object(pool, 'reserve_tokens', wraps=pool.reserve_tokens) as reserve:
+            self.service.process_batch(self.batch, force_refresh=True)
+
+        group_cost = 2 * KeepaService.TOKENS_PER_PRODUCT
+        self.assertEqual([call.args for call in reserve.call_args_list], [(group_cost,)] * 3)
+        self.assertEqual(pool.reserved_tokens, 0)
+        config = KeepaConfiguration.objects.get()
+        self.assertEqual(config.tokens_used_today, 3 * group_cost)
+
+    def test_heartbeat_runs_per_query(self):
+        """The lease is renewed while each Keepa query of a group runs."""
+        heartbeat = mock.Mock()
+
+        self.service.process_batch(self.batch, force_refresh=True, heartbeat=heartbeat)
+
+        # Per group: once before it, then before its US and MX queries
+        self.assertEqual(heartbeat.call_count, 3 * 3)
+
+    def test_concurrent_queries_send_heartbeats_while_waiting(self):
+        """Heartbeats keep running on the calling thread while queries wait for tokens."""
+        keepa_service = self.service.keepa_service
+        keepa_service.max_concurrency = 2
+        released = threading.Event()
+        heartbeat = mock.Mock(side_effect=lambda: released.set() if heartbeat.call_count > 2 else None)
+
+        def slow_query(items, domain_id, key, profile):
+            released.wait(5)
+            return [make_keepa_product(asin) for asin in items]
+
+        with mock.patch.object(KeepaService, 'HEARTBEAT_INTERVAL_SECONDS', 0.01), \
+                mock.patch.object(keepa_service, '_query_products', side_effect=slow_query):
+            responses = keepa_service._run_queries(
+                [(['B000000001'], 'US', keepa_service.pool.primary),
+                 (['B000000001'], 'MX', keepa_service.pool.primary)],
+                heartbeat=heartbeat,
+            )
+
+        self.assertTrue(released.is_set())
+        self.assertEqual([error for _, error, _, _ in responses], [None, None])
+
+    def test_batch_writes_bump_updated_at(self):
+        """Deferring ASINs and projecting the completion time touch updated_at."""
+        self.service._prepare_batch_items(self.batch)
+        PricingAnalysisBatch.objects.filter(pk=self.batch.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.batch.refresh_from_db()
+        stale = self.batch.updated_at
+
+        self.service._update_estimated_completion(self.batch, 3)
+        self.service._defer_items(self.batch, list(self.batch.items.all()))
+
+        self.batch.refresh_from_db()
+        self.assertGreater(self.batch.updated_at, stale)
+        self.assertEqual(len(self.batch.deferred_asins), 3)
+
+    def test_progress_does_not_rewrite_batch_row(self):
+        """Groups update counters with F() and never rewrite the JSON fields."""
+        self.errors = {'B000000002': ValueError('bad data')}
+        with CaptureQueriesContext(connection) as queries:
+            batch = self.service.process_batch(self.batch, force_refresh=True)
+
+        batch_table = PricingAnalysisBatch._meta.db_table
+        full_saves = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(f'UPDATE "{batch_table}"') and '"error_log"' in query['sql']
+        ]
+        # Only the initial save of _prepare_batch_items
+        self.assertEqual(len(full_saves), 1)
+        batch.refresh_from_db()
+        self.assertEqual(
+            (batch.processed_asins, batch.successful_analyses, batch.failed_analyses), (3, 2, 1)
+        )
+        self.assertEqual(batch.results.count(), 2)
+        self.assertEqual(batch.get_error_log(), {'B000000002': 'bad data'})
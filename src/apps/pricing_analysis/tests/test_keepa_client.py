@@ -0,0 +1,89 @@
+"""Tests for the Keepa client token bucket."""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.pricing_analysis.services.exceptions import TokenLimitExceededError
+from apps.pricing_analysis.services.keepa_client import KeepaClient, KeepaTokenBucket
+
+
+class KeepaClientTest(SimpleTestCase):
+    """Test KeepaClient response tracking."""
+
+    def test_responses_update_token_bucket(self):
+        """Every Keepa response refreshes the bucket state."""
+        response = {'tokensLeft': 42, 'refillRate': 5, 'refillIn': 1000}
+        with mock.patch('apps.pricing_analysis.services.keepa_client.requests.Session') as session_class:
+            session_class.return_value.get.return_value.status_code = 200
+            session_class.return_value.get.return_value.json.return_value = response
+            client = KeepaClient('test_key')
+
+        session_class.return_value.get.assert_called_once()
+        self.assertEqual(client.tokens_left, 42)
+        self.assertEqual(client.token_bucket.tokens_left, 42)
+        self.assertEqual(client.token_bucket.refill_rate, 5)
+
+
+class KeepaTokenBucketTest(SimpleTestCase):
+    """Test KeepaTokenBucket pacing."""
+
+    def setUp(self):
+        """Set up a bucket with 10 tokens refilling 20/min, next refill in 30s."""
+        self.bucket = KeepaTokenBucket()
+        self.bucket.update({'tokensLeft': 10, 'refillRate': 20, 'refillIn': 30000}, now=1000.0)
+
+    def test_unknown_bucket_never_waits(self):
+        """Before any response the bucket does not block."""
+        sleep = mock.Mock()
+
+        waited = KeepaTokenBucket().acquire(500, max_wait=0, sleep=sleep)
+
+        self.assertEqual(waited, 0.0)
+        sleep.assert_not_called()
+
+    def test_acquire_without_waiting(self):
+        """Available tokens are deducted without sleeping."""
+        sleep = mock.Mock()
+
+        with mock.patch('apps.pricing_analysis.services.keepa_client.time.time', return_value=1000.0):
+            waited = self.bucket.acquire(6, max_wait=60, sleep=sleep)
+
+        self.assertEqual(waited, 0.0)
+        self.assertEqual(self.bucket.tokens_left, 4)
+        sleep.assert_not_called()
+
+    def test_acquire_sleeps_until_refill(self):
+        """Missing tokens are waited for until the refill that covers them."""
+        sleep = mock.Mock()
+
+        with mock.patch('apps.pricing_analysis.services.keepa_client.time.time', return_value=1000.0):
+            # 40 tokens: 10 now + 20 at t+30s + 20 at t+90s
+            waited = self.bucket.acquire(40, max_wait=600, sleep=sleep)
+
+        self.assertEqual(waited, 90.0)
+        sleep.assert_called_once_with(90.0)
+        self.assertEqual(self.bucket.tokens_left, -30)
+
+    def test_acquire_over_max_wait_raises(self):
+        """A wait longer than max_wait raises TokenLimitExceededError."""
+        with mock.patch('apps.pricing_analysis.services.keepa_client.time.time', return_value=1000.0):
+            with self.assertRaises(TokenLimitExceededError):
+                self.bucket.acquire(40, max_wait=60, sleep=mock.Mock())
+
+        self.assertEqual(self.bucket.tokens_left, 10)
+
+    def test_estimate_seconds(self):
+        """The projection accounts for refills that already happened."""
+        self.assertEqual(self.bucket.estimate_seconds(10, now=1000.0), 0.0)
+        self.assertEqual(self.bucket.estimate_seconds(30, now=1000.0), 30.0)
+        # At t+40s one refill happened (30 tokens); the next is at t+90s
+        self.assertEqual(self.bucket.estimate_seconds(50, now=1040.0), 50.0)
+
+    def test_affordable_requests(self):
+        """Requests that fit in the projected tokens are counted."""
+        self.assertIsNone(KeepaTokenBucket().affordable_requests(5))
+        self.assertEqual(self.bucket.affordable_requests(5, now=1000.0), 2)
+        self.assertEqual(self.bucket.affordable_requests(20, now=1000.0), 0)
+        # After the refill at t+30s: 30 tokens
+        self.assertEqual(self.bucket.affordable_requests(5, now=1030.0), 6)
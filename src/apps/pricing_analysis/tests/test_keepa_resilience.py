@@ -0,0 +1,119 @@
+"""Tests for the Keepa retry policy and circuit breaker."""
+
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from apps.pricing_analysis.services.exceptions import KeepaUnavailableError
+from apps.pricing_analysis.services.keepa_resilience import (
+    KeepaCircuitBreaker,
+    KeepaCounters,
+    KeepaRetryPolicy,
+)
+
+
+class KeepaRetryPolicyTest(SimpleTestCase):
+    """Test KeepaRetryPolicy."""
+
+    def setUp(self):
+        """Set up a policy with a fake sleep."""
+        self.counters = KeepaCounters()
+        self.sleep = mock.Mock()
+        self.policy = KeepaRetryPolicy(
+            max_attempts=3, base_delay=1, max_delay=4, sleep=self.sleep, counters=self.counters
+        )
+
+    def test_retryable_errors(self):
+        """Only transient errors are retried."""
+        self.assertTrue(self.policy.is_retryable(requests.ConnectionError()))
+        self.assertTrue(self.policy.is_retryable(requests.Timeout()))
+        self.assertTrue(self.policy.is_retryable(RuntimeError('REQUEST_FAILED')))
+        self.assertFalse(self.policy.is_retryable(RuntimeError('REQUEST_REJECTED')))
+        self.assertFalse(self.policy.is_retryable(RuntimeError('NOT_ENOUGH_TOKEN')))
+        self.assertFalse(self.policy.is_retryable(ValueError('bad payload')))
+
+    def test_attempts_are_bounded(self):
+        """A call is attempted at most max_attempts times."""
+        error = requests.Timeout()
+
+        self.assertTrue(self.policy.should_retry(error, 0))
+        self.assertTrue(self.policy.should_retry(error, 1))
+        self.assertFalse(self.policy.should_retry(error, 2))
+        self.assertEqual(self.counters.snapshot(), {'retries_exhausted': 1})
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Backoff grows exponentially up to max_delay, with full jitter."""
+        with mock.patch('random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([self.policy.backoff(attempt) for attempt in range(4)], [1, 2, 4, 4])
+
+        for _ in range(20):
+            self.assertTrue(0 <= self.policy.backoff(1) <= 2)
+
+    def test_wait_counts_retries(self):
+        """Waiting sleeps the backoff and counts the retry."""
+        self.policy.wait(0)
+
+        self.sleep.assert_called_once()
+        self.assertEqual(self.counters.snapshot(), {'retries': 1})
+
+
+class KeepaCircuitBreakerTest(SimpleTestCase):
+    """Test KeepaCircuitBreaker state transitions."""
+
+    def setUp(self):
+        """Set up a breaker driven by a fake clock."""
+        self.now = 0.0
+        self.counters = KeepaCounters()
+        self.breaker = KeepaCircuitBreaker(
+            failure_threshold=3, reset_seconds=60, clock=lambda: self.now, counters=self.counters
+        )
+
+    def trip(self):
+        """Record enough failures to open the circuit."""
+        for _ in range(3):
+            self.breaker.before_request()
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        """The threshold of consecutive failures opens the circuit."""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, KeepaCircuitBreaker.CLOSED)
+
+        self.trip()
+
+        self.assertTrue(self.breaker.is_open)
+        with self.assertRaises(KeepaUnavailableError):
+            self.breaker.before_request()
+        self.assertEqual(self.counters.snapshot()['short_circuited'], 1)
+
+    def test_single_probe_closes_after_reset(self):
+        """After reset_seconds one probe is let through and success closes the circuit."""
+        self.trip()
+        self.now = 61
+
+        self.assertEqual(self.breaker.state, KeepaCircuitBreaker.HALF_OPEN)
+        self.breaker.before_request()
+        with self.assertRaises(KeepaUnavailableError):
+            self.breaker.before_request()
+
+        self.breaker.record_success()
+
+        self.assertEqual(self.breaker.state, KeepaCircuitBreaker.CLOSED)
+        self.breaker.before_request()
+        self.assertEqual(self.counters.snapshot()['circuit_closed'], 1)
+
+    def test_failed_probe_reopens(self):
+        """A failed probe opens the circuit for another reset period."""
+        self.trip()
+        self.now = 61
+        self.breaker.before_request()
+
+        self.breaker.record_failure()
+
+        self.assertTrue(self.breaker.is_open)
+        self.now = 100
+        self.assertTrue(self.breaker.is_open)
+        self.assertEqual(self.counters.snapshot()['circuit_opened'], 2)
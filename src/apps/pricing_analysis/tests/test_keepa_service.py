@@ -0,0 +1,820 @@
+"""Tests for KeepaService."""
+
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.pricing_analysis.models import (
+    BreakEvenAnalysisConfig,
+    KeepaConfiguration,
+    KeepaFetchLease,
+    KeepaProductData,
+)
+from apps.pricing_analysis.services.analysis_service import PricingAnalysisService
+from apps.pricing_analysis.services.exceptions import (
+    KeepaAPIError,
+    KeepaUnavailableError,
+    TokenLimitExceededError,
+)
+from apps.pricing_analysis.services import keepa_client
+from apps.pricing_analysis.services.fetch_lease import KeepaFetchLeases
+from apps.pricing_analysis.services.keepa_client import KeepaTokenBucket, clear_keepa_clients
+from apps.pricing_analysis.services.keepa_resilience import (
+    KeepaCircuitBreaker,
+    KeepaCounters,
+    KeepaRetryPolicy,
+    get_circuit_breaker,
+)
+from apps.pricing_analysis.services.keepa_service import KeepaService
+from apps.pricing_analysis.services.reference_data import bump_generation
+from apps.products.models import Product
+
+
+def make_keepa_product(asin, buy_box=15.99, amazon=16.99):
+    """Build a minimal parsed Keepa product like keepa.Keepa.query returns."""
+    return {
+        'asin': asin,
+        'title': f'Product {asin}',
+        'brand': 'TestBrand',
+        'categoryTree': [{'catId': 541966, 'name': 'Electronics'}],
+        'data': {
+            'BUY_BOX_SHIPPING': [buy_box],
+            'AMAZON': [amazon],
+            'NEW': [amazon],
+        },
+        'stats': {},
+    }
+
+
+def patch_api_log(test_case):
+    """Keep API logs out of the background writer for the duration of a test."""
+    patcher = mock.patch('apps.pricing_analysis.services.keepa_service.log_keepa_api_call')
+    test_case.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+def patch_keepa_client(test_case):
+    """Replace the shared Keepa client with a mock for the duration of a test."""
+    patch_api_log(test_case)
+    patcher = mock.patch('apps.pricing_analysis.services.keepa_service.get_keepa_client')
+    api = patcher.start().return_value
+    test_case.addCleanup(patcher.stop)
+    api.token_bucket = KeepaTokenBucket()
+    get_circuit_breaker().reset()
+    test_case.addCleanup(get_circuit_breaker().reset)
+    return api
+
+
+class KeepaServiceBulkFetchTest(TestCase):
+    """Test KeepaService.fetch_bulk_product_data."""
+
+    def setUp(self):
+        """Set up config and a mocked Keepa client."""
+        self.config = KeepaConfiguration.objects.create(
+            api_key='test_key',
+            is_active=True,
+            daily_token_limit=1000,
+        )
+        self.api = patch_keepa_client(self)
+        self.api.query.side_effect = lambda items, **kwargs: [
+            make_keepa_product(asin) for asin in items
+        ]
+        self.service = KeepaService()
+
+    def test_one_query_per_chunk(self):
+        """ASINs are sent in chunks of BULK_QUERY_LIMIT."""
+        asins = [f'B{index:09d}' for index in range(150)]
+
+        results, errors = self.service.fetch_bulk_product_data(asins, 'US')
+
+        self.assertEqual(self.api.query.call_count, 2)
+        self.assertEqual(len(self.api.query.call_args_list[0].args[0]), 100)
+        self.assertEqual(len(self.api.query.call_args_list[1].args[0]), 50)
+        self.assertEqual(len(results), 150)
+        self.assertEqual(errors, {})
+        self.assertEqual(KeepaProductData.objects.filter(marketplace='US').count(), 150)
+
+        self.config.refresh_from_db()
+        # Charged what Keepa charges, not one token per product
+        self.assertEqual(self.config.tokens_used_today, 150 * KeepaService.TOKENS_PER_PRODUCT)
+
+    def test_reservation_covers_token_checks(self):
+        """Reserved tokens are spent in memory and unused ones released."""
+        asins = [f'B{index:09d}' for index in range(150)]
+        cost = 150 * KeepaService.TOKENS_PER_PRODUCT
+
+        with self.service.token_reservation(cost + 50) as reserved:
+            self.assertEqual(reserved, cost + 50)
+            with mock.patch.object(self.service.config, 'refresh_from_db') as refresh:
+                self.service.fetch_bulk_product_data(asins, 'US')
+            refresh.assert_not_called()
+            self.assertEqual(self.service.reserved_tokens, 50)
+
+        self.config.refresh_from_db()
+        self.assertEqual(self.config.tokens_used_today, cost)
+        self.assertEqual(self.service.reserved_tokens, 0)
+
+    def test_response_is_split_per_asin(self):
+        """Each ASIN gets its own row and missing ASINs are unavailable."""
+        self.api.query.side_effect = lambda items, **kwargs: [make_keepa_product('B000000001')]
+
+        results, errors = self.service.fetch_bulk_product_data(['B000000001', 'B000000002'], 'US')
+
+        self.assertEqual(errors, {})
+        self.assertEqual(results['B000000001'].buy_box_price, Decimal('15.99'))
+        self.assertTrue(results['B000000001'].is_available)
+        self.assertFalse(results['B000000002'].is_available)
+        self.assertFalse(results['B000000002'].sync_successful)
+
+    def test_per_asin_failure_does_not_abort_chunk(self):
+        """A parse failure is reported for its ASIN only."""
+        original = self.service._build_stored_fields
+
+        def build(asin, *args):
+            if asin == 'B000000002':
+                raise ValueError('broken payload')
+            return original(asin, *args)
+
+        with mock.patch.object(self.service, '_build_stored_fields', side_effect=build):
+            results, errors = self.service.fetch_bulk_product_data(
+                ['B000000001', 'B000000002', 'B000000003'], 'US'
+            )
+
+        self.assertEqual(set(results), {'B000000001', 'B000000003'})
+        self.assertIn('broken payload', errors['B000000002'])
+
+    def test_chunk_rows_are_written_in_one_statement(self):
+        """Keepa rows of a chunk are upserted together, not one query per ASIN."""
+        asins = [f'B{index:09d}' for index in range(20)]
+        self.service.fetch_bulk_product_data(asins[:1], 'US')
+        KeepaProductData.objects.filter(asin=asins[0]).update(title='Stale')
+
+        with CaptureQueriesContext(connection) as queries:
+            results, errors = self.service.fetch_bulk_product_data(asins, 'US', force_refresh=True)
+
+        keepa_writes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE')) and 'keepaproductdata' in query['sql']
+        ]
+        self.assertEqual(len(keepa_writes), 1)
+        self.assertEqual(errors, {})
+        self.assertEqual(len(results), 20)
+        self.assertEqual(results[asins[0]].title, f'Product {asins[0]}')
+        self.assertEqual(KeepaProductData.objects.filter(asin__in=asins).count(), 20)
+        self.assertIsNotNone(results[asins[5]].pk)
+
+    def test_failed_chunk_write_retries_rows_one_by_one(self):
+        """A row the database rejects only fails its own ASIN."""
+        original = self.service.upsert_keepa_product_data
+
+        def upsert(rows):
+            if any(row['asin'] == 'B000000002' for row in rows):
+                raise ValueError('bad row')
+            return original(rows)
+
+        with mock.patch.object(self.service, 'upsert_keepa_product_data', side_effect=upsert):
+            results, errors = self.service.fetch_bulk_product_data(
+                ['B000000001', 'B000000002', 'B000000003'], 'US'
+            )
+
+        self.assertEqual(set(results), {'B000000001', 'B000000003'})
+        self.assertIn('bad row', errors['B000000002'])
+
+    def test_failed_query_reports_every_asin_in_chunk(self):
+        """A failed Keepa request marks the chunk ASINs as errors."""
+        self.api.query.side_effect = RuntimeError('REQUEST_REJECTED')
+
+        results, errors = self.service.fetch_bulk_product_data(['B000000001', 'B000000002'], 'US')
+
+        self.assertEqual(results, {})
+        self.assertEqual(set(errors), {'B000000001', 'B000000002'})
+
+
+class KeepaServiceFreshnessCacheTest(TestCase):
+    """Test that fresh KeepaProductData rows are reused."""
+
+    def setUp(self):
+        """Set up config, mocked client and a stored row."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True)
+        self.api = patch_keepa_client(self)
+        self.api.query.side_effect = lambda items, **kwargs: [
+            make_keepa_product(asin) for asin in ([items] if isinstance(items, str) else items)
+        ]
+        self.service = KeepaService()
+        self.stored = KeepaProductData.objects.create(
+            asin='B000000001',
+            marketplace='US',
+            buy_box_price=Decimal('9.99'),
+        )
+
+    def test_fresh_row_is_served_from_database(self):
+        """A row synced within the TTL does not hit Keepa."""
+        with self.settings(KEEPA_DATA_TTL_MINUTES={'US': 60}):
+            data = self.service.fetch_product_data('B000000001', 'US')
+
+        self.assertEqual(data.pk, self.stored.pk)
+        self.assertEqual(data.buy_box_price, Decimal('9.99'))
+        self.api.query.assert_not_called()
+
+    def test_stale_row_is_refetched(self):
+        """A row older than the TTL is refreshed from Keepa."""
+        KeepaProductData.objects.filter(pk=self.stored.pk).update(
+            last_synced_at=timezone.now() - timedelta(hours=2)
+        )
+
+        with self.settings(KEEPA_DATA_TTL_MINUTES={'US': 60}):
+            data = self.service.fetch_product_data('B000000001', 'US')
+
+        self.assertEqual(data.buy_box_price, Decimal('15.99'))
+        self.api.query.assert_called_once()
+
+    def test_force_refresh_skips_cache(self):
+        """force_refresh always queries Keepa."""
+        with self.settings(KEEPA_DATA_TTL_MINUTES={'US': 60}):
+            self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+
+        self.api.query.assert_called_once()
+
+    def test_bulk_only_queries_missing_asins(self):
+        """The bulk path only sends ASINs without fresh data to Keepa."""
+        with self.settings(KEEPA_DATA_TTL_MINUTES={'US': 60}):
+            results, errors = self.service.fetch_bulk_product_data(
+                ['B000000001', 'B000000002'], 'US', max_age=timedelta(minutes=5)
+            )
+
+        self.assertEqual(errors, {})
+        self.assertEqual(results['B000000001'].pk, self.stored.pk)
+        self.assertEqual(list(self.api.query.call_args.args[0]), ['B000000002'])
+
+
+class KeepaServiceConcurrentFetchTest(TestCase):
+    """Test concurrent marketplace fetches."""
+
+    def setUp(self):
+        """Set up config and a mocked Keepa client."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True)
+        self.api = patch_keepa_client(self)
+        self.service = KeepaService()
+        self.service.max_concurrency = 2
+
+    def test_marketplaces_are_queried_concurrently(self):
+        """US and MX requests are in flight at the same time."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def query(items, domain, **kwargs):
+            # Both requests must reach the barrier, so a serial run would time out
+            barrier.wait()
+            return [make_keepa_product('B000000001', buy_box=15.99 if domain == 'US' else 299.0)]
+
+        self.api.query.side_effect = query
+
+        data = self.service.fetch_product_data_for_marketplaces('B000000001', force_refresh=True)
+
+        self.assertEqual(data['US'].buy_box_price, Decimal('15.99'))
+        self.assertEqual(data['MX'].buy_box_price, Decimal('299.0'))
+        self.assertEqual(KeepaProductData.objects.filter(asin='B000000001').count(), 2)
+
+    def test_concurrency_follows_token_bucket(self):
+        """Only the queries the bucket can afford run concurrently."""
+        self.service.max_concurrency = 4
+        self.assertEqual(self.service.tuned_concurrency(), 4)
+
+        cost = KeepaService.BULK_QUERY_LIMIT * KeepaService.TOKENS_PER_PRODUCT
+        self.api.token_bucket.update({'tokensLeft': cost * 2, 'refillRate': cost, 'refillIn': 60000})
+        self.assertEqual(self.service.tuned_concurrency(), 2)
+
+        self.api.token_bucket.update({'tokensLeft': 0, 'refillRate': cost, 'refillIn': 60000})
+        self.assertEqual(self.service.tuned_concurrency(), 1)
+
+        self.api.token_bucket.update({'tokensLeft': cost * 60, 'refillRate': cost, 'refillIn': 60000})
+        self.assertEqual(self.service.tuned_concurrency(), 4)
+
+    def test_failed_marketplace_raises(self):
+        """A failed request still raises KeepaAPIError."""
+        def query(items, domain, **kwargs):
+            if domain == 'MX':
+                raise RuntimeError('REQUEST_REJECTED')
+            return [make_keepa_product('B000000001')]
+
+        self.api.query.side_effect = query
+
+        with self.assertRaises(KeepaAPIError):
+            self.service.fetch_product_data_for_marketplaces('B000000001', force_refresh=True)
+
+        self.assertTrue(KeepaProductData.objects.filter(asin='B000000001', marketplace='US').exists())
+
+    def test_bulk_fans_out_per_marketplace_and_chunk(self):
+        """Each marketplace chunk is sent as its own query."""
+        self.api.query.side_effect = lambda items, **kwargs: [
+            make_keepa_product(asin) for asin in items
+        ]
+        asins = [f'B{index:09d}' for index in range(150)]
+
+        outcome = self.service.fetch_bulk_product_data_for_marketplaces(asins, ('US', 'MX'))
+
+        self.assertEqual(self.api.query.call_count, 4)
+        for marketplace in ('US', 'MX'):
+            results, errors = outcome[marketplace]
+            self.assertEqual(len(results), 150)
+            self.assertEqual(errors, {})
+
+
+@override_settings(KEEPA_MAX_TOKEN_WAIT_SECONDS=300, KEEPA_INTERACTIVE_TOKEN_WAIT_SECONDS=10)
+class KeepaServiceTokenWaitTest(TestCase):
+    """Test request paths fail fast instead of waiting for tokens."""
+
+    def setUp(self):
+        """Set up config and an empty token bucket refilling in a minute."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True)
+        self.api = patch_keepa_client(self)
+        self.api.token_bucket.update({'tokensLeft': 0, 'refillRate': 3, 'refillIn': 60000})
+
+    def test_only_background_services_wait_long(self):
+        """Job workers keep the long wait cap."""
+        self.assertEqual(KeepaService().max_token_wait, 10)
+        self.assertEqual(KeepaService(background=True).max_token_wait, 300)
+        self.assertEqual(PricingAnalysisService(background=True).keepa_service.max_token_wait, 300)
+
+    def test_interactive_fetch_fails_with_retry_after(self):
+        """A request that would wait a minute raises right away."""
+        with mock.patch('time.sleep') as sleep:
+            with self.assertRaises(TokenLimitExceededError) as raised:
+                KeepaService().fetch_product_data('B000000001', 'US', force_refresh=True)
+
+        sleep.assert_not_called()
+        self.api.query.assert_not_called()
+        self.assertEqual(raised.exception.retry_after, 60)
+
+    def test_sync_endpoint_answers_429_with_retry_after(self):
+        """The API turns the error into 429 with a Retry-After header."""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username='api', password='x'))
+
+        response = client.post(
+            '/api/v1/keepa-data/sync_asin/', {'asin': 'B000000001'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+
+
+class KeepaServiceClientRegistryTest(TestCase):
+    """Test the process-wide client and configuration cache."""
+
+    def setUp(self):
+        """Set up config and a mocked client class."""
+        self.config = KeepaConfiguration.objects.create(api_key='test_key', is_active=True)
+        patcher = mock.patch('apps.pricing_analysis.services.keepa_client.KeepaClient')
+        self.client_class = patcher.start()
+        self.client_class.side_effect = lambda api_key: mock.Mock(api_key=api_key)
+        self.addCleanup(patcher.stop)
+        self.addCleanup(clear_keepa_clients)
+
+    def test_services_share_client_and_config(self):
+        """A second service reuses the client and only reads the config generation."""
+        first = KeepaService()
+
+        with self.assertNumQueries(1):
+            second = KeepaService()
+
+        self.assertIs(first.api, second.api)
+        self.assertIsNot(first.config, second.config)
+        self.client_class.assert_called_once_with('test_key')
+
+    def test_config_change_invalidates_client(self):
+        """Saving the configuration rebuilds the client with the new key."""
+        first = KeepaService()
+
+        self.config.api_key = 'rotated_key'
+        self.config.save()
+        second = KeepaService()
+
+        self.assertEqual(second.config.api_key, 'rotated_key')
+        self.assertEqual(self.client_class.call_count, 2)
+        self.assertEqual(second.api.api_key, 'rotated_key')
+        self.assertIsNot(first.api, second.api)
+        first.api.session.close.assert_not_called()
+
+    def test_config_change_in_another_process_invalidates_client(self):
+        """A generation bumped elsewhere makes this process drop the rotated key."""
+        first = KeepaService()
+        with self.captureOnCommitCallbacks(execute=True):
+            # update() sends no signal, like a change made by another process
+            KeepaConfiguration.objects.filter(pk=self.config.pk).update(api_key='rotated_key')
+            transaction.on_commit(lambda: bump_generation(KeepaService.KEEPA_CONFIG_GENERATION_KEY))
+
+        second = KeepaService()
+
+        self.assertEqual(second.api.api_key, 'rotated_key')
+        self.assertNotIn('test_key', keepa_client._clients)
+        first.api.session.close.assert_not_called()
+
+
+class KeepaServiceKeyPoolTest(TestCase):
+    """Test spreading queries across several active keys."""
+
+    def setUp(self):
+        """Set up two active keys with their own mocked clients."""
+        self.first = KeepaConfiguration.objects.create(
+            api_key='first_key', is_active=True, daily_token_limit=1000
+        )
+        self.second = KeepaConfiguration.objects.create(
+            api_key='second_key', is_active=True, daily_token_limit=1000
+        )
+        self.clients = {}
+        for api_key in ('first_key', 'second_key'):
+            client = mock.Mock(token_bucket=KeepaTokenBucket())
+            client.query.side_effect = lambda items, **kwargs: [
+                make_keepa_product(asin) for asin in items
+            ]
+            self.clients[api_key] = client
+        patcher = mock.patch(
+            'apps.pricing_analysis.services.keepa_service.get_keepa_client',
+            side_effect=lambda api_key: self.clients[api_key],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patch_api_log(self)
+        self.service = KeepaService()
+
+    def test_chunks_are_spread_across_keys(self):
+        """Each key serves one chunk and is charged for it."""
+        asins = [f'B{index:09d}' for index in range(200)]
+
+        results, errors = self.service.fetch_bulk_product_data(asins, 'US')
+
+        self.assertEqual(len(results), 200)
+        self.assertEqual(errors, {})
+        self.assertEqual(self.clients['first_key'].query.call_count, 1)
+        self.assertEqual(self.clients['second_key'].query.call_count, 1)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(self.first.tokens_used_today, 100 * KeepaService.TOKENS_PER_PRODUCT)
+        self.assertEqual(self.second.tokens_used_today, 100 * KeepaService.TOKENS_PER_PRODUCT)
+
+    def test_exhausted_key_is_skipped(self):
+        """A key without daily budget is not used."""
+        KeepaConfiguration.objects.filter(pk=self.first.pk).update(tokens_used_today=1000)
+
+        results, errors = self.service.fetch_bulk_product_data(['B000000001'], 'US')
+
+        self.assertEqual(errors, {})
+        self.clients['first_key'].query.assert_not_called()
+        self.clients['second_key'].query.assert_called_once()
+
+    def test_budget_guard_uses_real_product_cost(self):
+        """A key with fewer tokens left than one product costs is skipped."""
+        KeepaConfiguration.objects.filter(pk=self.first.pk).update(
+            tokens_used_today=1000 - KeepaService.TOKENS_PER_PRODUCT + 1
+        )
+
+        results, errors = self.service.fetch_bulk_product_data(['B000000001'], 'US')
+
+        self.assertEqual(errors, {})
+        self.clients['first_key'].query.assert_not_called()
+        self.clients['second_key'].query.assert_called_once()
+
+    def test_fails_over_when_key_runs_out_of_tokens(self):
+        """A NOT_ENOUGH_TOKEN response is retried with another key."""
+        for client in self.clients.values():
+            client.query.side_effect = RuntimeError('NOT_ENOUGH_TOKEN')
+        self.clients['second_key'].query.side_effect = lambda items, **kwargs: [
+            make_keepa_product(asin) for asin in items
+        ]
+        self.service.pool.keys.sort(key=lambda key: key.config.api_key)
+
+        results, errors = self.service.fetch_bulk_product_data(['B000000001'], 'US')
+
+        self.assertEqual(errors, {})
+        self.assertIn('B000000001', results)
+        self.clients['first_key'].query.assert_called_once()
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.tokens_used_today, KeepaService.TOKENS_PER_PRODUCT)
+
+    def test_failover_keeps_half_open_probe_slot(self):
+        """A probe that fails over to another key still closes the circuit."""
+        self.clients['first_key'].query.side_effect = RuntimeError('NOT_ENOUGH_TOKEN')
+        self.service.pool.keys.sort(key=lambda key: key.config.api_key)
+        breaker = KeepaCircuitBreaker(failure_threshold=1, reset_seconds=0, counters=KeepaCounters())
+        breaker.record_failure()
+        self.service.circuit_breaker = breaker
+        self.assertEqual(breaker.state, KeepaCircuitBreaker.HALF_OPEN)
+
+        results, errors = self.service.fetch_bulk_product_data(['B000000001'], 'US')
+
+        self.assertEqual(errors, {})
+        self.assertIn('B000000001', results)
+        self.assertEqual(breaker.state, KeepaCircuitBreaker.CLOSED)
+        breaker.before_request()
+
+
+class KeepaServiceFetchProfileTest(TestCase):
+    """Test the lean and full fetch profiles."""
+
+    def setUp(self):
+        """Set up config and a mocked Keepa client."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True)
+        self.api = patch_keepa_client(self)
+        self.service = KeepaService()
+
+    def make_lean_product(self, asin):
+        """Build a product as returned with history disabled."""
+        current = [-1] * 19
+        current[0] = 1699
+        current[1] = 1599
+        current[3] = 4321
+        current[18] = 1549
+        return {
+            'asin': asin,
+            'title': f'Product {asin}',
+            'brand': 'TestBrand',
+            'imagesCSV': 'abc.jpg,def.jpg',
+            'categoryTree': [{'catId': 541966, 'name': 'Electronics'}],
+            'csv': None,
+            'offers': [{'seller': 'x'}] * 50,
+            'stats': {'current': current, 'salesRankDrops30': 12, 'outOfStockPercentage30': [0] * 19},
+        }
+
+    def test_lean_profile_disables_history(self):
+        """The lean profile queries without price history."""
+        self.api.query.return_value = [self.make_lean_product('B000000001')]
+
+        self.service.fetch_product_data('B000000001', 'US', force_refresh=True, profile='lean')
+
+        kwargs = self.api.query.call_args.kwargs
+        self.assertFalse(kwargs['history'])
+        self.assertTrue(kwargs['buybox'])
+
+    def test_lean_profile_reads_stats_and_stores_compact_raw_data(self):
+        """Prices come from stats.current and raw_data keeps only used keys."""
+        self.api.query.return_value = [self.make_lean_product('B000000001')]
+
+        data = self.service.fetch_product_data('B000000001', 'US', force_refresh=True, profile='lean')
+
+        self.assertEqual(data.fetch_profile, 'lean')
+        self.assertEqual(data.buy_box_price, Decimal('15.49'))
+        self.assertEqual(data.current_amazon_price, Decimal('16.99'))
+        self.assertEqual(data.current_new_price, Decimal('15.99'))
+        self.assertEqual(data.sales_rank, 4321)
+        self.assertNotIn('offers', data.raw_data)
+        self.assertNotIn('outOfStockPercentage30', data.raw_data['stats'])
+        self.assertEqual(data.raw_data['imagesCSV'], 'abc.jpg,def.jpg')
+        self.assertEqual(data.raw_data['stats']['salesRankDrops30'], 12)
+
+    def test_lean_row_does_not_satisfy_full_request(self):
+        """A fresh lean row is refetched when the full profile is needed."""
+        KeepaProductData.objects.create(asin='B000000001', marketplace='US', fetch_profile='lean')
+        self.api.query.return_value = [make_keepa_product('B000000001')]
+
+        with self.settings(KEEPA_DATA_TTL_MINUTES={'US': 60}):
+            lean = self.service.fetch_product_data('B000000001', 'US', profile='lean')
+            self.api.query.assert_not_called()
+            full = self.service.fetch_product_data('B000000001', 'US')
+
+        self.assertEqual(lean.fetch_profile, 'lean')
+        self.assertEqual(full.fetch_profile, 'full')
+        self.api.query.assert_called_once()
+
+    def test_lean_refresh_keeps_stored_price_history(self):
+        """Lean data never wipes the history of a row fetched with the full profile."""
+        full_product = make_keepa_product('B000000001')
+        full_product['csv'] = [None] * 18 + [[1000, 1599]]
+        full_product['stats'] = {'buyBoxCount30': 3}
+        self.api.query.return_value = [full_product]
+        self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+        self.api.query.return_value = [self.make_lean_product('B000000001')]
+
+        data = self.service.fetch_product_data('B000000001', 'US', force_refresh=True, profile='lean')
+
+        self.assertEqual(data.fetch_profile, 'lean')
+        self.assertEqual(data.buy_box_price, Decimal('15.49'))
+        self.assertEqual(data.raw_data['csv'][18], [1000, 1599])
+        self.assertEqual(data.raw_data['stats']['buyBoxCount30'], 3)
+        self.assertEqual(data.raw_data['stats']['salesRankDrops30'], 12)
+
+
+class KeepaServiceProductResolutionTest(TestCase):
+    """Test bulk Product resolution."""
+
+    def setUp(self):
+        """Set up config and a mocked Keepa client."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True, daily_token_limit=1000)
+        self.api = patch_keepa_client(self)
+        self.service = KeepaService()
+
+    def test_resolves_existing_and_creates_missing_in_bulk(self):
+        """Existing products are reused and missing ones created with one insert."""
+        existing = Product.objects.create(
+            sku='WOO-1', external_id='B000000001', title='Existing', description='Existing'
+        )
+        keepa_products = {
+            asin: make_keepa_product(asin) for asin in ('B000000001', 'B000000002', 'B000000003')
+        }
+
+        with self.assertNumQueries(3):
+            products = self.service.resolve_products(keepa_products)
+
+        self.assertEqual(products['B000000001'], existing)
+        self.assertEqual(products['B000000002'].sku, 'KEEPA-B000000002')
+        self.assertEqual(products['B000000003'].title, 'Product B000000003')
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_keepa_products_are_unique_per_asin(self):
+        """A second KEEPA- product for the same ASIN is rejected."""
+        self.service.get_or_create_product('B000000001', {})
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.create(
+                sku='KEEPA-B000000001', external_id='B000000001', title='Dup', description='Dup'
+            )
+        self.assertEqual(self.service.get_or_create_product('B000000001', {}).title, 'Keepa Product B000000001')
+
+    def test_bulk_fetch_resolves_products_once_per_chunk(self):
+        """Stored Keepa data of a chunk shares one Product lookup."""
+        asins = [f'B{index:09d}' for index in range(5)]
+        self.api.query.side_effect = lambda items, **kwargs: [make_keepa_product(asin) for asin in items]
+
+        with mock.patch.object(
+            self.service, 'resolve_products', wraps=self.service.resolve_products
+        ) as resolve:
+            results, errors = self.service.fetch_bulk_product_data(asins, 'US')
+
+        self.assertEqual(errors, {})
+        resolve.assert_called_once()
+        self.assertEqual(
+            {data.product.external_id for data in results.values()}, set(asins)
+        )
+
+
+class KeepaServiceSingleFlightTest(TestCase):
+    """Test coalescing of concurrent fetches of the same ASIN."""
+
+    def setUp(self):
+        """Set up config, a mocked Keepa client and leases with a fake sleep."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True, daily_token_limit=1000)
+        self.api = patch_keepa_client(self)
+        self.api.query.side_effect = lambda items, **kwargs: [
+            make_keepa_product(asin) for asin in ([items] if isinstance(items, str) else items)
+        ]
+        self.service = KeepaService()
+        self.sleep = mock.Mock()
+        self.service.fetch_leases = KeepaFetchLeases(wait_seconds=30, sleep=self.sleep)
+
+    def lease(self, asin, marketplace='US', expires_in=60):
+        """Create a lease held by another worker."""
+        return KeepaFetchLease.objects.create(
+            asin=asin,
+            marketplace=marketplace,
+            owner='other-worker',
+            expires_at=timezone.now() + timedelta(seconds=expires_in),
+        )
+
+    def test_lease_outlasts_token_wait(self):
+        """A leader waiting for tokens is not taken over by default."""
+        self.assertGreater(KeepaFetchLeases().lease_seconds, KeepaService(background=True).max_token_wait)
+
+    def test_follower_reuses_leader_result(self):
+        """A fetch already running elsewhere is waited for instead of repeated."""
+        lease = self.lease('B000000001')
+
+        def leader_finishes(seconds):
+            KeepaProductData.objects.create(asin='B000000001', marketplace='US', title='From leader')
+            lease.delete()
+
+        self.sleep.side_effect = leader_finishes
+
+        data = self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+
+        self.assertEqual(data.title, 'From leader')
+        self.api.query.assert_not_called()
+        self.sleep.assert_called_once()
+
+    def test_bulk_fetch_only_queries_unleased_asins(self):
+        """Batch chunks skip the ASINs another worker is fetching."""
+        lease = self.lease('B000000002')
+
+        def leader_finishes(seconds):
+            KeepaProductData.objects.create(asin='B000000002', marketplace='US', title='From leader')
+            lease.delete()
+
+        self.sleep.side_effect = leader_finishes
+
+        results, errors = self.service.fetch_bulk_product_data(
+            ['B000000001', 'B000000002'], 'US', force_refresh=True
+        )
+
+        self.assertEqual(errors, {})
+        self.assertEqual(self.api.query.call_args.args[0], ['B000000001'])
+        self.assertEqual(results['B000000002'].title, 'From leader')
+        self.assertFalse(KeepaFetchLease.objects.filter(owner=self.service.fetch_leases.owner).exists())
+
+    def test_failed_leader_is_retried(self):
+        """Without a fresh row from the leader the follower fetches itself."""
+        lease = self.lease('B000000001')
+        self.sleep.side_effect = lambda seconds: lease.delete()
+
+        data = self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+
+        self.assertEqual(data.title, 'Product B000000001')
+        self.api.query.assert_called_once()
+
+    def test_expired_lease_is_taken_over(self):
+        """An abandoned lease does not block the ASIN."""
+        self.lease('B000000001', expires_in=-1)
+
+        self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+
+        self.api.query.assert_called_once()
+        self.sleep.assert_not_called()
+        self.assertFalse(KeepaFetchLease.objects.exists())
+
+    def test_lease_released_when_fetch_fails(self):
+        """The lease is released even if the Keepa query fails."""
+        self.api.query.side_effect = RuntimeError('REQUEST_REJECTED')
+
+        with self.assertRaises(KeepaAPIError):
+            self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+
+        self.assertFalse(KeepaFetchLease.objects.exists())
+
+
+class KeepaServiceResilienceTest(TestCase):
+    """Test retries and the circuit breaker around Keepa queries."""
+
+    def setUp(self):
+        """Set up config, a mocked Keepa client and a fast retry policy."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True, daily_token_limit=1000)
+        self.api = patch_keepa_client(self)
+        self.service = KeepaService()
+        self.counters = KeepaCounters()
+        self.service.retry_policy = KeepaRetryPolicy(
+            max_attempts=3, sleep=mock.Mock(), counters=self.counters
+        )
+        self.service.circuit_breaker = KeepaCircuitBreaker(
+            failure_threshold=2, reset_seconds=60, counters=self.counters
+        )
+
+    def test_transient_error_is_retried(self):
+        """A timeout followed by a success returns the product."""
+        self.api.query.side_effect = [
+            requests.Timeout('read timed out'),
+            [make_keepa_product('B000000001')],
+        ]
+
+        data = self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+
+        self.assertEqual(data.title, 'Product B000000001')
+        self.assertEqual(self.api.query.call_count, 2)
+        self.assertEqual(self.counters.snapshot()['retries'], 1)
+        self.assertFalse(self.service.circuit_breaker.is_open)
+
+    def test_rejected_request_is_not_retried(self):
+        """Errors caused by the request itself fail immediately."""
+        self.api.query.side_effect = RuntimeError('REQUEST_REJECTED')
+
+        with self.assertRaises(KeepaAPIError):
+            self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+
+        self.api.query.assert_called_once()
+        self.assertNotIn('failures', self.counters.snapshot())
+
+    def test_open_circuit_short_circuits_calls(self):
+        """Once the circuit opens Keepa is no longer called."""
+        self.api.query.side_effect = requests.ConnectionError('connection refused')
+
+        with self.assertRaises(KeepaAPIError):
+            self.service.fetch_product_data('B000000001', 'US', force_refresh=True)
+        self.assertTrue(self.service.circuit_breaker.is_open)
+        calls = self.api.query.call_count
+
+        with self.assertRaises(KeepaUnavailableError):
+            self.service.fetch_product_data('B000000002', 'US', force_refresh=True)
+
+        self.assertEqual(self.api.query.call_count, calls)
+        self.assertEqual(self.counters.snapshot()['short_circuited'], 1)
+
+    def test_batch_defers_asins_while_circuit_is_open(self):
+        """Batch ASINs are deferred, not failed, when Keepa is unavailable."""
+        self.api.query.side_effect = requests.ConnectionError('connection refused')
+        service = PricingAnalysisService()
+        service.keepa_service = self.service
+
+        batch = service.analyze_multiple_asins(
+            ['B000000001', 'B000000002'],
+            'Outage batch',
+            config=BreakEvenAnalysisConfig(),
+            force_refresh=True,
+        )
+
+        self.assertEqual(batch.status, 'COMPLETED')
+        self.assertEqual(batch.failed_analyses, 0)
+        self.assertEqual(sorted(batch.deferred_asins), ['B000000001', 'B000000002'])
@@ -1,7 +1,11 @@
 """Tests for pricing_analysis models."""
 
 from decimal import Decimal
+
+from django.db import IntegrityError, connection
+from django.db.models.signals import pre_save
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from djmoney.money import Money
 
@@ -44,6 +48,43 @@ class KeepaConfigurationTest(TestCase):
         self.assertTrue(config.can_consume_tokens(40))
         self.assertFalse(config.can_consume_tokens(51))
 
+    def test_concurrent_consumption_is_not_lost(self):
+        """Two stale instances both add to the stored counter."""
+        config = KeepaConfiguration.objects.create(api_key='test_key', daily_token_limit=100)
+        other = KeepaConfiguration.objects.get(pk=config.pk)
+
+        config.consume_tokens(10)
+        other.consume_tokens(5)
+
+        config.refresh_from_db()
+        self.assertEqual(config.tokens_used_today, 15)
+        self.assertEqual(other.tokens_used_today, 15)
+
+    def test_reserve_and_release_tokens(self):
+        """Reservations are capped by the limit and can be released."""
+        config = KeepaConfiguration.objects.create(api_key='test_key', daily_token_limit=100)
+        config.consume_tokens(70)
+
+        self.assertEqual(config.reserve_tokens(50), 30)
+        self.assertEqual(config.tokens_used_today, 100)
+        self.assertEqual(config.reserve_tokens(1), 0)
+
+        config.release_tokens(20)
+        self.assertEqual(config.tokens_used_today, 80)
+
+    def test_reset_tokens_on_new_day(self):
+        """The counter is reset once the day changes."""
+        config = KeepaConfiguration.objects.create(api_key='test_key', daily_token_limit=100)
+        yesterday = timezone.now().date() - timezone.timedelta(days=1)
+        KeepaConfiguration.objects.filter(pk=config.pk).update(
+            tokens_used_today=100, last_reset_date=yesterday
+        )
+        config.refresh_from_db()
+
+        self.assertTrue(config.can_consume_tokens(100))
+        self.assertEqual(config.tokens_used_today, 0)
+        self.assertEqual(config.last_reset_date, timezone.now().date())
+
 
 class ExchangeRateTest(TestCase):
     """Test ExchangeRate model."""
@@ -194,6 +235,104 @@ class PricingAnalysisResultTest(TestCase):
         self.assertTrue(result.is_feasible)
         self.assertEqual(result.usa_cost_source, 'buy_box')
 
+    def create_result(self, asin='B07XYZ1234', **kwargs):
+        """Create a minimal result."""
+        return PricingAnalysisResult.objects.create(
+            product=self.product, asin=asin, analysis_config=self.config, **kwargs
+        )
+
+    def test_new_result_becomes_latest(self):
+        """Only the newest result of each ASIN is flagged as latest."""
+        first = self.create_result()
+        other = self.create_result(asin='B000000002')
+        self.assertTrue(first.is_latest)
+
+        second = self.create_result(is_feasible=True)
+
+        self.assertTrue(second.is_latest)
+        first.refresh_from_db()
+        other.refresh_from_db()
+        self.assertFalse(first.is_latest)
+        self.assertTrue(other.is_latest)
+        self.assertEqual(
+            list(PricingAnalysisResult.objects.filter(is_latest=True, is_feasible=True)), [second]
+        )
+
+    def test_insert_moves_flag_with_one_update(self):
+        """Saving a result only adds the UPDATE of the previous latest."""
+        self.create_result()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.create_result()
+
+        statements = [
+            query['sql'].split()[0] for query in queries.captured_queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+        self.assertEqual(statements, ['UPDATE', 'INSERT'])
+
+    def test_concurrent_latest_conflict_is_retried(self):
+        """A conflict on the one-latest-per-ASIN constraint is retried."""
+        first = self.create_result()
+        attempts = []
+
+        def concurrent_insert(sender, instance, **kwargs):
+            # Another writer flags a result of the ASIN after our UPDATE ran
+            attempts.append(instance)
+            if len(attempts) == 1:
+                PricingAnalysisResult.objects.bulk_create([PricingAnalysisResult(
+                    product=self.product, asin='B07XYZ1234', analysis_config=self.config, is_latest=True
+                )])
+
+        pre_save.connect(concurrent_insert, sender=PricingAnalysisResult)
+        self.addCleanup(pre_save.disconnect, concurrent_insert, sender=PricingAnalysisResult)
+        second = self.create_result()
+
+        self.assertEqual(len(attempts), 2)
+        self.assertTrue(second.is_latest)
+        self.assertEqual(
+            list(PricingAnalysisResult.objects.filter(asin='B07XYZ1234', is_latest=True)), [second]
+        )
+        first.refresh_from_db()
+        self.assertFalse(first.is_latest)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        """Only the one-latest-per-ASIN conflict is retried."""
+        self.create_result()
+        attempts = []
+
+        def count_attempt(sender, instance, **kwargs):
+            attempts.append(instance)
+
+        pre_save.connect(count_attempt, sender=PricingAnalysisResult)
+        self.addCleanup(pre_save.disconnect, count_attempt, sender=PricingAnalysisResult)
+        with self.assertRaises(IntegrityError):
+            self.create_result(is_feasible=None)
+
+        self.assertEqual(len(attempts), 1)
+
+    def test_deleting_latest_promotes_previous(self):
+        """History stays available and takes over when the latest is deleted."""
+        first = self.create_result()
+        second = self.create_result()
+
+        second.delete()
+
+        first.refresh_from_db()
+        self.assertTrue(first.is_latest)
+
+    def test_refresh_latest_after_bulk_create(self):
+        """bulk_create skips save(): refresh_latest moves the flag."""
+        first = self.create_result()
+        PricingAnalysisResult.objects.bulk_create([
+            PricingAnalysisResult(product=self.product, asin='B07XYZ1234', analysis_config=self.config)
+        ])
+
+        PricingAnalysisResult.refresh_latest(['B07XYZ1234'])
+
+        latest = PricingAnalysisResult.objects.get(asin='B07XYZ1234', is_latest=True)
+        self.assertGreater(latest.pk, first.pk)
+
 
 class PricingAnalysisBatchTest(TestCase):
     """Test PricingAnalysisBatch model."""
@@ -0,0 +1,93 @@
+"""Tests for the cached pricing reference data."""
+
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.pricing_analysis.models import (
+    BrandRestriction,
+    BreakEvenAnalysisConfig,
+    ExchangeRate,
+    ReferenceDataGeneration,
+)
+from apps.pricing_analysis.services.reference_data import (
+    PRICING_REFERENCE_KEY,
+    bump_reference_generation,
+    get_reference_generation,
+    get_reference_snapshot,
+)
+
+
+class ReferenceSnapshotTest(TestCase):
+    """Test the snapshot is reused until the reference tables change."""
+
+    def setUp(self):
+        """Set up an active config, rate and a blocked brand."""
+        self.config = BreakEvenAnalysisConfig.objects.create(name='Default', is_active=True)
+        self.rate = ExchangeRate.objects.create(
+            from_currency='USD', to_currency='MXN', rate=Decimal('17.5000'), is_active=True
+        )
+        self.brand = BrandRestriction.objects.create(name='Acme', is_allowed=False)
+
+    def test_snapshot_reads_reference_tables(self):
+        """The snapshot holds the active config, rate and brand rules."""
+        reference = get_reference_snapshot()
+
+        self.assertEqual(reference.get_active_config(), self.config)
+        self.assertEqual(reference.get_usd_mxn_rate(), Decimal('17.5000'))
+        self.assertTrue(reference.get_brand_status(' ACME ')['is_blocked'])
+        self.assertTrue(reference.get_brand_status('Other')['is_allowed'])
+        self.assertEqual(reference.get_brand_status('')['brand'], '')
+
+    def test_snapshot_is_reused_while_generation_is_unchanged(self):
+        """Only the generation is queried when nothing changed."""
+        reference = get_reference_snapshot()
+
+        with self.assertNumQueries(1):
+            self.assertIs(get_reference_snapshot(), reference)
+
+    def test_saves_and_deletes_reload_the_snapshot(self):
+        """Signals bump the generation on commit so every process reloads."""
+        reference = get_reference_snapshot()
+        generation = get_reference_generation()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rate.rate = Decimal('18.0000')
+            self.rate.save()
+            # Other processes must not reload before the change is visible
+            self.assertEqual(get_reference_generation(), generation)
+        self.assertEqual(get_reference_generation(), generation + 1)
+        self.assertEqual(get_reference_snapshot().get_usd_mxn_rate(), Decimal('18.0000'))
+
+        self.brand.delete()
+        self.assertFalse(get_reference_snapshot().get_brand_status('Acme')['is_blocked'])
+        self.assertFalse(reference.get_brand_status('Acme')['is_allowed'])
+
+    def test_missing_rows_raise_like_the_models(self):
+        """Missing config or rate raise ValueError."""
+        self.config.delete()
+        self.rate.delete()
+        reference = get_reference_snapshot()
+
+        with self.assertRaises(ValueError):
+            reference.get_active_config()
+        with self.assertRaises(ValueError):
+            reference.get_usd_mxn_rate()
+
+    def test_bulk_updates_need_an_explicit_bump(self):
+        """update() sends no signals: callers bump the generation themselves."""
+        get_reference_snapshot()
+        BrandRestriction.objects.filter(pk=self.brand.pk).update(is_allowed=True)
+
+        self.assertTrue(get_reference_snapshot().get_brand_status('Acme')['is_blocked'])
+        bump_reference_generation()
+        self.assertFalse(get_reference_snapshot().get_brand_status('Acme')['is_blocked'])
+
+    def test_bump_creates_missing_generation_row(self):
+        """The generation row is recreated if it was removed."""
+        ReferenceDataGeneration.objects.filter(key=PRICING_REFERENCE_KEY).delete()
+        self.assertEqual(get_reference_generation(), 0)
+
+        bump_reference_generation()
+
+        self.assertEqual(get_reference_generation(), 1)
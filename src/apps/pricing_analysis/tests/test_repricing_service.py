@@ -0,0 +1,186 @@
+"""Tests for the offline repricing service."""
+
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from djmoney.money import Money
+
+from apps.pricing_analysis.models import (
+    BrandRestriction,
+    BreakEvenAnalysisConfig,
+    KeepaProductData,
+    PricingAnalysisResult,
+)
+from apps.pricing_analysis.services.analysis_service import PricingAnalysisService
+from apps.pricing_analysis.services.pricing_calculator import PricingCalculator
+from apps.pricing_analysis.services.repricing_service import RepricingService
+from apps.products.models import Product
+
+
+class RepricingServiceTest(TestCase):
+    """Test repricing stored results under candidate configs and rates."""
+
+    def setUp(self):
+        """Set up a config and a feasible result analyzed at 17 MXN/USD."""
+        self.config = BreakEvenAnalysisConfig.objects.create(name='Current', is_active=True)
+        self.result = self.create_result('B000000001', usa_cost=Decimal('20.00'), mx_price=Decimal('1500.00'))
+        # Repricing must never reach Keepa
+        patcher = mock.patch('apps.pricing_analysis.services.keepa_service.get_keepa_client')
+        self.get_keepa_client = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_result(self, asin, usa_cost, mx_price, exchange_rate=Decimal('17.0000'), brand=''):
+        """Store a result computed the way PricingAnalysisService does."""
+        product, _ = Product.objects.get_or_create(sku=f'TEST-{asin}', title=asin, external_id=asin)
+        usa_keepa_data, _ = KeepaProductData.objects.get_or_create(
+            product=product, asin=asin, marketplace='US', brand=brand
+        )
+        calculator = PricingCalculator()
+        shipping = calculator.get_average_shipping_cost(self.config)
+        breakdown = calculator.calculate_break_even(
+            usa_cost, exchange_rate, shipping, self.config,
+            PricingAnalysisService._get_usa_tax_multiplier(usa_keepa_data, product),
+        )
+        competitiveness = calculator.analyze_competitiveness(
+            breakdown['break_even_price'], mx_price, self.config
+        )
+        return PricingAnalysisResult.objects.create(
+            product=product,
+            asin=asin,
+            usa_keepa_data=usa_keepa_data,
+            analysis_config=self.config,
+            usa_cost=Money(usa_cost, 'USD'),
+            usa_cost_source='buy_box',
+            exchange_rate=exchange_rate,
+            current_mx_amazon_price=Money(mx_price, 'MXN'),
+            shipping_cost_used=Money(shipping, 'MXN'),
+            break_even_price=Money(breakdown['break_even_price'], 'MXN'),
+            recommended_price=Money(
+                calculator.calculate_recommended_price(
+                    breakdown['break_even_price'], self.config.target_profit_margin
+                ),
+                'MXN',
+            ),
+            is_available_usa=True,
+            is_feasible=competitiveness['is_feasible'],
+            potential_profit_margin=competitiveness['potential_profit_margin'],
+        )
+
+    def test_unchanged_inputs_reproduce_stored_result(self):
+        """Repricing with the stored config and rate gives the stored prices."""
+        repriced = RepricingService().reprice(self.result)
+
+        self.assertEqual(repriced['breakdown']['break_even_price'], self.result.break_even_price.amount)
+        self.assertEqual(repriced['recommended_price'], self.result.recommended_price.amount)
+        self.assertTrue(repriced['competitiveness']['is_feasible'])
+
+    def test_preview_under_candidate_rate_saves_nothing(self):
+        """A higher exchange rate raises the break even and can flip feasibility."""
+        service = RepricingService(exchange_rate=Decimal('60'))
+
+        rows = list(service.preview(service.latest_results()))
+
+        self.assertEqual(len(rows), 1)
+        self.assertGreater(rows[0]['new_break_even_price'], rows[0]['old_break_even_price'])
+        self.assertTrue(rows[0]['was_feasible'])
+        self.assertFalse(rows[0]['is_feasible'])
+        self.assertEqual(PricingAnalysisResult.objects.count(), 1)
+        self.get_keepa_client.assert_not_called()
+
+    def test_persist_creates_new_generation(self):
+        """Persisted results point to the originals and become the latest ones."""
+        candidate = BreakEvenAnalysisConfig.objects.create(
+            name='Candidate', target_profit_margin=Decimal('0.40')
+        )
+        service = RepricingService(config=candidate)
+
+        created = service.persist(service.latest_results())
+
+        self.assertEqual(created, 1)
+        repriced = PricingAnalysisResult.objects.get(repriced_from=self.result)
+        self.assertEqual(repriced.analysis_config, candidate)
+        self.assertEqual(repriced.usa_keepa_data_id, self.result.usa_keepa_data_id)
+        self.assertGreater(repriced.recommended_price, self.result.recommended_price)
+        self.assertEqual(list(service.latest_results()), [repriced])
+
+    def test_unsaved_candidate_config_cannot_be_persisted(self):
+        """Results must reference a stored config."""
+        service = RepricingService(config=BreakEvenAnalysisConfig(name='Draft'))
+
+        with self.assertRaises(ValueError):
+            service.persist(service.latest_results())
+
+    def test_latest_results_skip_unpriced_and_older_results(self):
+        """Only the latest priced result of each ASIN is repriced."""
+        newer = self.create_result('B000000001', usa_cost=Decimal('21.00'), mx_price=Decimal('1500.00'))
+        unavailable = self.create_result('B000000002', usa_cost=Decimal('10.00'), mx_price=Decimal('900.00'))
+        unavailable.usa_cost_source = 'unavailable'
+        unavailable.is_available_usa = False
+        unavailable.save()
+
+        self.assertEqual(list(RepricingService.latest_results()), [newer])
+
+    def test_batch_repricing_matches_scalar_calculator(self):
+        """Chunks repriced with the vectorized calculator give the Decimals of the scalar path."""
+        other_config = BreakEvenAnalysisConfig.objects.create(
+            name='Other', target_profit_margin=Decimal('0.3333'), marketplace_fee_rate=Decimal('0.1234')
+        )
+        results = [self.result]
+        for index, (usa_cost, mx_price) in enumerate([
+            (Decimal('355.00'), Decimal('9000.00')),
+            (Decimal('7.99'), Decimal('0')),
+            (Decimal('1234.56'), Decimal('25000.00')),
+            (Decimal('0.01'), Decimal('1.00')),
+        ]):
+            result = self.create_result(f'B00000001{index}', usa_cost=usa_cost, mx_price=mx_price)
+            if index % 2:
+                result.analysis_config = other_config
+                result.save()
+            results.append(result)
+        service = RepricingService(exchange_rate=Decimal('20.025'))
+        calculator = PricingCalculator()
+
+        repriced_rows = service.reprice_many(results)
+
+        for result, repriced in zip(results, repriced_rows):
+            config = result.analysis_config
+            breakdown = calculator.calculate_break_even(
+                result.usa_cost.amount, Decimal('20.025'), result.shipping_cost_used.amount, config,
+                PricingAnalysisService._get_usa_tax_multiplier(result.usa_keepa_data, result.product),
+            )
+            competitiveness = calculator.analyze_competitiveness(
+                breakdown['break_even_price'], result.current_mx_amazon_price.amount, config
+            )
+            self.assertEqual(repriced['config'], config)
+            self.assertEqual(repriced['breakdown'], breakdown)
+            self.assertEqual(repriced['competitiveness'], competitiveness)
+            self.assertEqual(
+                repriced['recommended_price'],
+                calculator.calculate_recommended_price(
+                    breakdown['break_even_price'], config.target_profit_margin
+                ),
+            )
+
+    def test_blocked_brand_is_not_feasible(self):
+        """Brand restrictions still apply when repricing."""
+        result = self.create_result(
+            'B000000002', usa_cost=Decimal('20.00'), mx_price=Decimal('1500.00'), brand='Acme'
+        )
+        BrandRestriction.objects.create(name='Acme', is_allowed=False)
+
+        repriced = RepricingService().reprice(result)
+
+        self.assertFalse(repriced['competitiveness']['is_feasible'])
+        self.assertEqual(repriced['blocked_brand'], 'Acme')
+
+    def test_command_previews_by_default(self):
+        """The command reports the impact without storing anything."""
+        out = StringIO()
+
+        call_command('reprice_results', '--exchange-rate', '60', stdout=out)
+
+        self.assertIn('No longer feasible: 1', out.getvalue())
+        self.assertEqual(PricingAnalysisResult.objects.count(), 1)
@@ -0,0 +1,76 @@
+"""Tests for the Keepa raw_data serializer."""
+
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from apps.pricing_analysis.management.commands.benchmark_keepa_serializer import (
+    build_products,
+    legacy_convert,
+)
+from apps.pricing_analysis.services.serialization import to_json_compatible
+
+
+class ToJsonCompatibleTest(SimpleTestCase):
+    """Test to_json_compatible."""
+
+    def test_numpy_values(self):
+        """Arrays and scalars become plain values, NaN/inf become None."""
+        data = {
+            'ints': np.array([1, 2, -1]),
+            'floats': np.array([1.5, np.nan, np.inf]),
+            'scalar': np.float64(2.5),
+            'nan_scalar': np.float64('nan'),
+            'count': np.int64(3),
+        }
+
+        self.assertEqual(to_json_compatible(data), {
+            'ints': [1, 2, -1],
+            'floats': [1.5, None, None],
+            'scalar': 2.5,
+            'nan_scalar': None,
+            'count': 3,
+        })
+
+    def test_datetimes_match_django_encoder(self):
+        """Datetimes are formatted like DjangoJSONEncoder."""
+        times = [datetime.datetime(2024, 1, 1, 10, 0), datetime.datetime(2024, 1, 1, 10, 0, 0, 123456)]
+        data = {
+            'objects': np.array(times, dtype=object),
+            'datetime64': np.array(times, dtype='datetime64[us]'),
+            'with_nat': np.array(['2024-01-01T10:00', 'NaT'], dtype='datetime64[m]'),
+            'date': datetime.date(2024, 1, 2),
+            'price': Decimal('10.50'),
+        }
+
+        self.assertEqual(to_json_compatible(data), {
+            'objects': ['2024-01-01T10:00:00', '2024-01-01T10:00:00.123'],
+            'datetime64': ['2024-01-01T10:00:00', '2024-01-01T10:00:00.123'],
+            'with_nat': ['2024-01-01T10:00:00', None],
+            'date': '2024-01-02',
+            'price': '10.50',
+        })
+
+    def test_pandas_and_keys(self):
+        """DataFrames become column lists and non-string keys become strings."""
+        frame = pd.DataFrame({'value': [1.0, np.nan]}, index=pd.to_datetime(['2024-01-01', '2024-01-02']))
+
+        result = to_json_compatible({1: frame, 'series': pd.Series([1, 2])})
+
+        self.assertEqual(result, {'1': {'value': [1.0, None]}, 'series': [1, 2]})
+
+    def test_unserializable_keeps_images(self):
+        """Unknown types fall back to the product images only."""
+        with mock.patch('builtins.print'):
+            result = to_json_compatible({'imagesCSV': 'a.jpg', 'other': object()})
+
+        self.assertEqual(result, {'imagesCSV': 'a.jpg'})
+
+    def test_matches_legacy_serializer(self):
+        """Parsed Keepa products serialize exactly like the previous implementation."""
+        for product in build_products(50):
+            self.assertEqual(to_json_compatible(product), legacy_convert(product))
@@ -1,6 +1,7 @@
 from datetime import datetime
 from decimal import Decimal
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
 from django.shortcuts import redirect, render
 from django.views import View
 import csv
@@ -8,7 +9,9 @@ import io
 from django.urls import reverse
 from django.views.generic import DetailView, ListView
 from .models import PricingAnalysisResult, BrandRestriction
-from .services.analysis_service import PricingAnalysisService
+from .services.exceptions import AnalysisConfigNotFoundError
+from .services.job_queue import submit_batch
+from .services.reference_data import ReferenceSnapshot, bump_reference_generation, get_reference_snapshot
 from .forms import BrandRestrictionForm, BrandRestrictionToggleForm, BrandRestrictionUploadForm
 
 IMPUESTOS_AMERICANOS = Decimal('1.0825')
@@ -32,26 +35,14 @@ def _normalize_brand(brand: str) -> str:
     return (brand or '').strip().lower()
 
 
-def _get_brand_status(analysis: PricingAnalysisResult) -> dict:
+def _get_brand_status(analysis: PricingAnalysisResult, reference: ReferenceSnapshot) -> dict:
     brand = ''
     if analysis.usa_keepa_data and analysis.usa_keepa_data.brand:
         brand = analysis.usa_keepa_data.brand
     elif analysis.product and getattr(analysis.product, 'brand', None):
         brand = analysis.product.brand
 
-    normalized = _normalize_brand(brand)
-    if not normalized:
-        return {'brand': '', 'is_allowed': True, 'is_blocked': False}
-
-    restriction = BrandRestriction.objects.filter(normalized_name=normalized).first()
-    if restriction is None:
-        return {'brand': brand, 'is_allowed': True, 'is_blocked': False}
-
-    return {
-        'brand': brand,
-        'is_allowed': restriction.is_allowed,
-        'is_blocked': not restriction.is_allowed,
-    }
+    return reference.get_brand_status(brand)
 
 
 def _get_first_image_url(analysis: PricingAnalysisResult) -> str:
@@ -103,8 +94,8 @@ class PricingAnalysisPanoramaView(LoginRequiredMixin, ListView):
     login_url = '/admin/login/'
 
     def get_queryset(self):
-        """Optimiza queries con select_related."""
-        return PricingAnalysisResult.objects.select_related(
+        """Resultado actual de cada ASIN, optimizado con select_related."""
+        return PricingAnalysisResult.objects.filter(is_latest=True).select_related(
             'product',
             'usa_keepa_data',
             'analysis_config',
@@ -114,6 +105,7 @@ class PricingAnalysisPanoramaView(LoginRequiredMixin, ListView):
         """Agrega datos calculados para columnas dinamicas."""
         context = super().get_context_data(**kwargs)
         rows = []
+        reference = get_reference_snapshot()
 
         for analysis in context['analyses']:
             config = analysis.analysis_config
@@ -121,7 +113,7 @@ class PricingAnalysisPanoramaView(LoginRequiredMixin, ListView):
             import_fees = None
             import_taxes = None
             import_taxes_usd = None
-            brand_status = _get_brand_status(analysis)
+            brand_status = _get_brand_status(analysis, reference)
             image_url = _get_first_image_url(analysis)
 
             if analysis.usa_cost and analysis.exchange_rate:
@@ -261,6 +253,8 @@ class BrandRestrictionListView(LoginRequiredMixin, View):
                 brand_id = form.cleaned_data['brand_id']
                 is_allowed = bool(form.cleaned_data.get('is_allowed'))
                 BrandRestriction.objects.filter(id=brand_id).update(is_allowed=is_allowed)
+                # update() sends no signals
+                transaction.on_commit(bump_reference_generation)
 
         elif action == 'upload':
             form = BrandRestrictionUploadForm(request.POST, request.FILES)
@@ -358,12 +352,19 @@ class PricingAnalysisBatchView(LoginRequiredMixin, View):
                     'shipping_cost_mxn': shipping_raw,
                 })
 
-        service = PricingAnalysisService()
-        batch = service.analyze_multiple_asins(
-            asins=asins,
-            batch_name=batch_name,
-            shipping_cost_mxn=shipping_cost,
-        )
+        try:
+            submit_batch(
+                asins=asins,
+                batch_name=batch_name,
+                shipping_cost_mxn=shipping_cost,
+            )
+        except AnalysisConfigNotFoundError as e:
+            return render(request, self.template_name, {
+                'error': str(e),
+                'batch_name': batch_name,
+                'asins': asin_input,
+                'shipping_cost_mxn': shipping_raw,
+            })
 
         return redirect('pricing_analysis:panorama')
 
@@ -401,7 +402,7 @@ class PricingAnalysisResultDetailView(LoginRequiredMixin, DetailView):
         context['metrics'] = self._calculate_display_metrics(analysis)
 
         # Estado de marca
-        context['brand_status'] = _get_brand_status(analysis)
+        context['brand_status'] = _get_brand_status(analysis, get_reference_snapshot())
         context['image_url'] = _get_first_image_url(analysis)
         context['bought_past_month_us'] = (
             _get_stat_value(analysis.usa_keepa_data.raw_data, ['buyBoxCount', 'buyBoxCount30'])
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+KEEPA_SKU_PREFIX = 'KEEPA-'
+
+
+def merge_duplicate_keepa_products(apps, schema_editor):
+    """Keep the oldest Keepa product per ASIN and repoint references to it."""
+    Product = apps.get_model('products', 'Product')
+    keepa_products = Product.objects.filter(sku__startswith=KEEPA_SKU_PREFIX)
+    relations = [
+        relation for relation in Product._meta.related_objects
+        if relation.one_to_many
+    ]
+
+    duplicated = (
+        keepa_products.values('external_id')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('external_id', flat=True)
+    )
+    for external_id in list(duplicated):
+        ids = list(
+            keepa_products.filter(external_id=external_id).order_by('id').values_list('id', flat=True)
+        )
+        keep_id, duplicate_ids = ids[0], ids[1:]
+        for relation in relations:
+            field_name = relation.field.name
+            relation.related_model.objects.filter(
+                **{f'{field_name}__in': duplicate_ids}
+            ).update(**{field_name: keep_id})
+        Product.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_alter_productprice_amount_currency'),
+        # Every model referencing Product, so their rows are repointed
+        ('pricing_analysis', '0007_keepaproductdata_fetch_profile'),
+        ('purchases_orders', '0004_alter_purchaseorder_amount_currency_and_more'),
+        ('sales_orders', '0006_alter_salesorder_total_amount_currency_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_keepa_products, migrations.RunPython.noop),
+    ]
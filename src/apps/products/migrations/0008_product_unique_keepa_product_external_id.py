@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_merge_duplicate_keepa_products'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('sku__startswith', 'KEEPA-')),
+                fields=('external_id',),
+                name='unique_keepa_product_external_id',
+            ),
+        ),
+    ]
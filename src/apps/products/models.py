@@ -26,6 +26,14 @@ class Product(BaseModel):
     class Meta:
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
+        constraints = [
+            # Products auto-created from Keepa (sku KEEPA-<ASIN>) exist once per ASIN
+            models.UniqueConstraint(
+                fields=['external_id'],
+                condition=models.Q(sku__startswith='KEEPA-'),
+                name='unique_keepa_product_external_id',
+            ),
+        ]
 
 
 class ProductPrice(BaseModel):
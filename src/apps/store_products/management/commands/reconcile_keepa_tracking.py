@@ -0,0 +1,55 @@
+"""
+Reconcile Keepa trackings with StoreProduct.
+
+Pulls the full Keepa tracking list once, checks it is complete, diffs it
+against the store products (tracking_enabled, keepa_tracking_id) and applies
+the adds, removes and tracking id updates in bulk. An incomplete list aborts
+the command before anything is changed.
+
+Usage:
+    python manage.py reconcile_keepa_tracking
+    python manage.py reconcile_keepa_tracking --dry-run
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.store_products.services.keepa_tracking_service import KeepaTrackingListError
+from apps.store_products.services.tracking_reconciliation import TrackingReconciliation
+
+
+class Command(BaseCommand):
+    help = 'Diff the Keepa tracking list against StoreProduct and fix the drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the drift, do not change Keepa or the database',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = TrackingReconciliation().run(apply=not options['dry_run'])
+        except KeepaTrackingListError as exc:
+            raise CommandError(f'{exc}. Nothing was changed.') from exc
+
+        missing = sum(len(asins) for asins in report['to_add'].values())
+        self.stdout.write(f'Keepa trackings: {report["remote_count"]}')
+        self.stdout.write(f'Missing in Keepa: {missing}')
+        self.stdout.write(f'Orphaned in Keepa: {len(report["to_remove"])}')
+        self.stdout.write(f'Tracking ids out of date: {len(report["id_updates"])}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes applied'))
+            return
+
+        self.stdout.write(
+            f'Added: {report["added"]} | Removed: {report["removed"]} | '
+            f'Ids updated: {report["ids_updated"]}'
+        )
+        for asin, error in sorted(report['failed'].items()):
+            self.stderr.write(self.style.ERROR(f'{asin}: {error}'))
+        if report['failed']:
+            self.stdout.write(self.style.WARNING(f'{len(report["failed"])} ASINs failed'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Keepa tracking reconciled'))
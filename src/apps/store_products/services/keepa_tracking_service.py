@@ -1,8 +1,42 @@
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
-from apps.pricing_analysis.models import KeepaConfiguration, KeepaAPILog
+from apps.pricing_analysis.models import KeepaConfiguration
+from apps.pricing_analysis.services.api_log import log_keepa_api_call
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def get_tracking_session() -> requests.Session:
+    """
+    Get the process-wide HTTP session for Keepa tracking calls.
+
+    The session keeps connections to api.keepa.com alive, so consecutive
+    (and concurrent) tracking calls reuse TLS connections instead of opening
+    a new one per request.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=max(1, settings.KEEPA_TRACKING_MAX_CONCURRENCY),
+            )
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+class KeepaTrackingListError(Exception):
+    """The Keepa tracking list could not be fetched completely."""
+
 
 class KeepaTrackingService:
     BASE_URL = 'https://api.keepa.com/tracking'
@@ -12,6 +46,9 @@ class KeepaTrackingService:
 
     def __init__(self, api_key: str | None = None):
         self.api_key = self.get_api_key()
+        self.session = get_tracking_session()
+        self.chunk_size = max(1, settings.KEEPA_TRACKING_CHUNK_SIZE)
+        self.max_concurrency = max(1, settings.KEEPA_TRACKING_MAX_CONCURRENCY)
 
     def get_api_key(self) -> str | None:
         keepa_configuration = KeepaConfiguration.objects.last()
@@ -20,7 +57,7 @@ class KeepaTrackingService:
         return None
 
     def _log(self, method: str, params: dict, payload, response, elapsed_ms: int, error: str = ''):
-        """Persist request/response to KeepaAPILog for debugging."""
+        """Queue request/response in the buffered KeepaAPILog writer for debugging."""
         safe_params = {k: v for k, v in params.items() if k != 'key'}
         request_data = {'method': method, 'params': safe_params}
         if payload is not None:
@@ -35,7 +72,7 @@ class KeepaTrackingService:
         if isinstance(response_data, dict):
             tokens = response_data.get('tokensConsumed', 0)
 
-        KeepaAPILog.objects.create(
+        log_keepa_api_call(
             endpoint=f'tracking/{safe_params.get("type", "")}',
             request_params=request_data,
             response_status=response.status_code if response is not None else None,
@@ -53,7 +90,7 @@ class KeepaTrackingService:
         response = None
         start = time.monotonic()
         try:
-            response = requests.post(self.BASE_URL, params=params, json=payload, timeout=30)
+            response = self.session.post(self.BASE_URL, params=params, json=payload, timeout=30)
             response.raise_for_status()
             data = response.json()
             self._log('POST', params, payload, response, int((time.monotonic() - start) * 1000))
@@ -71,7 +108,7 @@ class KeepaTrackingService:
         response = None
         start = time.monotonic()
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=30)
+            response = self.session.get(self.BASE_URL, params=params, timeout=30)
             response.raise_for_status()
             data = response.json()
             self._log('GET', params, None, response, int((time.monotonic() - start) * 1000))
@@ -107,6 +144,43 @@ class KeepaTrackingService:
         """
         return self._get({'type': 'webhook'})
 
+    def _run_chunks(self, items: list, call, chunk_size: int | None = None) -> list[tuple]:
+        """
+        Call `call` once per fixed-size chunk of items, concurrently.
+
+        Args:
+            items: Items to split into chunks
+            call: Function receiving one chunk and returning a Keepa response
+            chunk_size: Items per chunk (defaults to self.chunk_size)
+
+        Returns:
+            List of (chunk, response, error) in chunk order; a failed chunk has
+            response None and the raised exception as error
+        """
+        chunk_size = chunk_size or self.chunk_size
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        def run(chunk):
+            try:
+                return chunk, call(chunk), None
+            except Exception as exc:
+                return chunk, None, exc
+
+        if len(chunks) <= 1:
+            return [run(chunk) for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks))) as executor:
+            return list(executor.map(run, chunks))
+
+    @staticmethod
+    def _chunk_error(response: dict | None, error: Exception | None) -> str:
+        """Error message of a chunk call (exception or Keepa error body), or ''."""
+        if error is not None:
+            return str(error)
+        body_error = (response or {}).get('error')
+        if isinstance(body_error, dict):
+            return body_error.get('message') or json.dumps(body_error)
+        return str(body_error) if body_error else ''
+
     def add_tracking(
         self,
         asins: list[str],
@@ -121,6 +195,10 @@ class KeepaTrackingService:
         """
         Add product tracking to Keepa.
 
+        ASINs are sent in chunks of KEEPA_TRACKING_CHUNK_SIZE, up to
+        KEEPA_TRACKING_MAX_CONCURRENCY chunks at a time. A failed chunk does
+        not stop the others.
+
         Args:
             asins: List of ASINs to track
             tracking_type: 'regular' or 'marketplace'
@@ -133,7 +211,9 @@ class KeepaTrackingService:
             is_drop: True to notify on price drops, False for price increases
 
         Returns:
-            Keepa API response with trackings array
+            Dictionary with the 'trackings' of every successful chunk, the
+            'failed' ASINs (ASIN -> error message), 'tokensConsumed' and, if
+            any chunk failed, an 'error' summary
         """
         domain_id = self.DOMAIN_US if marketplace == 'US' else self.DOMAIN_MX
         # Default: NEW (any seller), AMAZON (direct), BUY_BOX_SHIPPING
@@ -143,9 +223,9 @@ class KeepaTrackingService:
         if list_name:
             params['list'] = list_name
 
-        def build_payload() -> list[dict]:
+        def build_payload(chunk: list[str]) -> list[dict]:
             payload = []
-            for asin in asins:
+            for asin in chunk:
                 # NotificationType array: only enable API notifications (index 5)
                 # Array must have 8 elements according to Keepa API documentation
                 notification_type = [False] * 8
@@ -200,10 +280,121 @@ class KeepaTrackingService:
                     return self._get(params_with_tracking)
                 raise
 
-        return post_or_get(build_payload())
+        trackings = []
+        failed = {}
+        tokens_consumed = 0
+        for chunk, response, error in self._run_chunks(
+            list(asins), lambda chunk: post_or_get(build_payload(chunk))
+        ):
+            message = self._chunk_error(response, error)
+            if message:
+                failed.update({asin: message for asin in chunk})
+                continue
+            trackings.extend(response.get('trackings') or [])
+            tokens_consumed += response.get('tokensConsumed', 0)
+
+        result = {'trackings': trackings, 'failed': failed, 'tokensConsumed': tokens_consumed}
+        if failed:
+            result['error'] = (
+                f'{len(failed)} of {len(asins)} ASINs could not be tracked: '
+                f'{next(iter(failed.values()))}'
+            )
+        return result
+
+    def list_trackings(self, list_name: str | None = None) -> list[dict]:
+        """
+        Get every tracking of the account (or of a named list).
+
+        Keepa returns the whole list in one response (the endpoint has no
+        paging), so a response without a 'trackings' list is an error rather
+        than an empty account.
+
+        Returns:
+            List of Keepa tracking objects
+
+        Raises:
+            KeepaTrackingListError: If Keepa answered with an error or no list
+        """
+        params = {'type': 'list'}
+        if list_name:
+            params['list'] = list_name
+        response = self._get(params)
+        message = self._chunk_error(response, None)
+        trackings = response.get('trackings')
+        if message or not isinstance(trackings, list):
+            raise KeepaTrackingListError(
+                f'Keepa tracking list is incomplete: {message or "no trackings in response"}'
+            )
+        return trackings
 
     def get_tracking(self, asin: str, list_name: str | None = None) -> dict:
         params = {'type': 'get', 'asin': asin}
         if list_name:
             params['list'] = list_name
         return self._get(params)
+
+    def find_tracked(self, asins: list[str], list_name: str | None = None) -> list[str]:
+        """
+        Ask Keepa, one ASIN at a time, which of the ASINs are tracked.
+
+        Args:
+            asins: ASINs to check
+            list_name: Optional named list
+
+        Returns:
+            The ASINs Keepa reports as tracked
+
+        Raises:
+            KeepaTrackingListError: If any ASIN could not be checked
+        """
+        tracked = []
+        outcomes = self._run_chunks(
+            list(asins), lambda chunk: self.get_tracking(chunk[0], list_name), chunk_size=1
+        )
+        for chunk, response, error in outcomes:
+            message = self._chunk_error(response, error)
+            if message:
+                raise KeepaTrackingListError(f'Could not check tracking of {chunk[0]}: {message}')
+            if any(
+                (tracking.get('asin') or '').strip().upper() == chunk[0]
+                for tracking in response.get('trackings') or []
+            ):
+                tracked.append(chunk[0])
+        return tracked
+
+    def remove_tracking(self, asins: list[str]) -> dict:
+        """
+        Remove product trackings from Keepa.
+
+        Keepa removes one ASIN per request, so the requests are sent
+        concurrently (up to KEEPA_TRACKING_MAX_CONCURRENCY) over the pooled
+        session.
+
+        Args:
+            asins: ASINs to stop tracking
+
+        Returns:
+            Dictionary with the 'removed' ASINs, the 'failed' ASINs
+            (ASIN -> error message) and, if any removal failed, an 'error' summary
+        """
+        removed = []
+        failed = {}
+        outcomes = self._run_chunks(
+            list(asins),
+            lambda chunk: self._get({'type': 'remove', 'asin': chunk[0]}),
+            chunk_size=1,
+        )
+        for chunk, response, error in outcomes:
+            message = self._chunk_error(response, error)
+            if message:
+                failed[chunk[0]] = message
+            else:
+                removed.append(chunk[0])
+
+        result = {'removed': removed, 'failed': failed}
+        if failed:
+            result['error'] = (
+                f'{len(failed)} of {len(asins)} ASINs could not be removed: '
+                f'{next(iter(failed.values()))}'
+            )
+        return result
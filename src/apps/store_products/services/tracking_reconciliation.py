@@ -0,0 +1,188 @@
+"""
+Keepa Tracking Reconciliation
+
+Diffs the Keepa tracking list against StoreProduct and repairs the drift:
+- Tracking-enabled products Keepa does not track are added
+- Trackings of disabled or deleted store products are removed
+- keepa_tracking_id is updated in bulk from what Keepa reports
+"""
+
+from collections import defaultdict
+
+from apps.store_products.models import StoreProduct
+from apps.store_products.services.keepa_tracking_service import (
+    KeepaTrackingListError,
+    KeepaTrackingService,
+)
+
+# metaData prefix set by KeepaTrackingService.add_tracking
+STORE_PRODUCT_METADATA_PREFIX = 'StoreProduct_'
+
+
+def _tracking_id(tracking: dict) -> str:
+    """Tracking id of a Keepa tracking object ('' if Keepa sent none)."""
+    return str(tracking.get('trackingId') or tracking.get('id') or '')
+
+
+class TrackingReconciliation:
+    """Compare Keepa trackings with StoreProduct rows and apply the differences."""
+
+    UPDATE_BATCH_SIZE = 500
+
+    def __init__(self, service: KeepaTrackingService | None = None):
+        self.service = service or KeepaTrackingService()
+
+    def diff(self, trackings: list[dict]) -> dict:
+        """
+        Compute the drift between Keepa and the database.
+
+        Args:
+            trackings: Keepa tracking objects (KeepaTrackingService.list_trackings)
+
+        Returns:
+            Dictionary with:
+            - to_add: {(tracking_type, marketplace): [asin, ...]} enabled products Keepa does not track
+            - to_remove: ASINs tracked by Keepa for disabled or deleted store products
+            - id_updates: {asin: keepa_tracking_id} stored ids that differ from Keepa
+        """
+        remote = {}
+        for tracking in trackings:
+            asin = (tracking.get('asin') or '').strip().upper()
+            if asin:
+                remote[asin] = tracking
+
+        to_add = defaultdict(list)
+        to_remove = []
+        id_updates = {}
+        local = set()
+        for asin, enabled, tracking_id, tracking_type, marketplace in StoreProduct.objects.values_list(
+            'asin', 'tracking_enabled', 'keepa_tracking_id', 'tracking_type', 'keepa_marketplace'
+        ):
+            local.add(asin)
+            tracking = remote.get(asin)
+            if enabled and tracking is None:
+                to_add[(tracking_type, marketplace)].append(asin)
+                if tracking_id:
+                    id_updates[asin] = ''
+            elif not enabled and tracking is not None:
+                to_remove.append(asin)
+                if tracking_id:
+                    id_updates[asin] = ''
+            elif enabled:
+                remote_id = _tracking_id(tracking)
+                if remote_id and remote_id != tracking_id:
+                    id_updates[asin] = remote_id
+            elif tracking_id:
+                id_updates[asin] = ''
+
+        # Trackings created for store products that no longer exist; trackings
+        # created outside this app (no StoreProduct metadata) are left alone
+        for asin, tracking in remote.items():
+            metadata = tracking.get('metaData') or ''
+            if asin not in local and metadata.startswith(STORE_PRODUCT_METADATA_PREFIX):
+                to_remove.append(asin)
+
+        return {'to_add': dict(to_add), 'to_remove': to_remove, 'id_updates': id_updates}
+
+    def run(self, apply: bool = True) -> dict:
+        """
+        Reconcile Keepa trackings with StoreProduct.
+
+        Args:
+            apply: Apply the changes (False only reports the drift)
+
+        Returns:
+            Drift report: the diff plus the counts of trackings fetched, added,
+            removed and ids updated, and the ASINs that failed (ASIN -> error)
+
+        Raises:
+            KeepaTrackingListError: If the tracking list is incomplete
+        """
+        trackings = self.service.list_trackings()
+        self._check_complete(trackings)
+        drift = self.diff(trackings)
+        report = {
+            **drift,
+            'remote_count': len(trackings),
+            'added': 0,
+            'removed': 0,
+            'ids_updated': 0,
+            'failed': {},
+        }
+        if not apply:
+            return report
+
+        id_updates = dict(drift['id_updates'])
+        for (tracking_type, marketplace), asins in drift['to_add'].items():
+            response = self.service.add_tracking(
+                asins,
+                tracking_type=tracking_type,
+                marketplace=marketplace,
+                update_interval_hours=1,
+            )
+            report['failed'].update(response.get('failed', {}))
+            for tracking in response.get('trackings', []):
+                asin = (tracking.get('asin') or '').strip().upper()
+                if asin:
+                    report['added'] += 1
+                    if _tracking_id(tracking):
+                        id_updates[asin] = _tracking_id(tracking)
+
+        if drift['to_remove']:
+            response = self.service.remove_tracking(drift['to_remove'])
+            report['failed'].update(response.get('failed', {}))
+            report['removed'] = len(response.get('removed', []))
+
+        report['ids_updated'] = self._update_tracking_ids(id_updates)
+        return report
+
+    def _check_complete(self, trackings: list[dict]) -> None:
+        """
+        Make sure the tracking list is not truncated before diffing it.
+
+        Enabled products that have a stored keepa_tracking_id but are missing
+        from the list are checked one by one; if Keepa still tracks any of
+        them the list is incomplete and acting on it would re-add trackings.
+
+        Args:
+            trackings: Keepa tracking objects (KeepaTrackingService.list_trackings)
+
+        Raises:
+            KeepaTrackingListError: If a missing ASIN is still tracked by Keepa
+        """
+        remote = {(tracking.get('asin') or '').strip().upper() for tracking in trackings}
+        missing = [
+            asin
+            for asin in StoreProduct.objects.filter(tracking_enabled=True)
+            .exclude(keepa_tracking_id='')
+            .values_list('asin', flat=True)
+            if asin not in remote
+        ]
+        if not missing:
+            return
+        tracked = self.service.find_tracked(missing)
+        if tracked:
+            raise KeepaTrackingListError(
+                f'Keepa tracking list is incomplete: {len(trackings)} trackings listed '
+                f'but {len(tracked)} missing ASINs are still tracked (e.g. {tracked[0]})'
+            )
+
+    def _update_tracking_ids(self, id_updates: dict) -> int:
+        """
+        Store keepa_tracking_id values with bulk updates.
+
+        Args:
+            id_updates: {asin: keepa_tracking_id}
+
+        Returns:
+            Number of products updated
+        """
+        if not id_updates:
+            return 0
+        products = list(StoreProduct.objects.filter(asin__in=id_updates).only('id', 'asin'))
+        for product in products:
+            product.keepa_tracking_id = id_updates[product.asin]
+        StoreProduct.objects.bulk_update(
+            products, ['keepa_tracking_id'], batch_size=self.UPDATE_BATCH_SIZE
+        )
+        return len(products)
@@ -0,0 +1,116 @@
+"""Tests for KeepaTrackingService."""
+
+import threading
+from unittest import mock
+
+import requests
+from django.test import TestCase, override_settings
+
+from apps.pricing_analysis.models import KeepaConfiguration
+from apps.store_products.services.keepa_tracking_service import (
+    KeepaTrackingListError,
+    KeepaTrackingService,
+)
+
+
+def make_response(data, status_code=200):
+    """Build a requests.Response carrying a JSON body."""
+    response = mock.Mock(status_code=status_code)
+    response.json.return_value = data
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(response=response)
+    return response
+
+
+@override_settings(KEEPA_TRACKING_CHUNK_SIZE=2, KEEPA_TRACKING_MAX_CONCURRENCY=3)
+class KeepaTrackingServiceTest(TestCase):
+    """Test chunked, concurrent tracking calls."""
+
+    def setUp(self):
+        """Set up config, a mocked session and no API log writes."""
+        KeepaConfiguration.objects.create(api_key='test_key', is_active=True, daily_token_limit=1000)
+        patcher = mock.patch('apps.store_products.services.keepa_tracking_service.log_keepa_api_call')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = KeepaTrackingService()
+        self.service.session = mock.Mock()
+
+    def test_add_tracking_sends_fixed_size_chunks(self):
+        """Every chunk is one POST and the trackings are merged."""
+        self.service.session.post.side_effect = lambda url, params, json, timeout: make_response({
+            'trackings': [{'asin': item['asin'], 'trackingId': item['asin'].lower()} for item in json],
+            'tokensConsumed': len(json),
+        })
+
+        response = self.service.add_tracking(['A1', 'A2', 'A3', 'A4', 'A5'])
+
+        sizes = sorted(len(call.kwargs['json']) for call in self.service.session.post.call_args_list)
+        self.assertEqual(sizes, [1, 2, 2])
+        self.assertEqual(sorted(t['asin'] for t in response['trackings']), ['A1', 'A2', 'A3', 'A4', 'A5'])
+        self.assertEqual(response['tokensConsumed'], 5)
+        self.assertEqual(response['failed'], {})
+        self.assertNotIn('error', response)
+
+    def test_chunks_run_concurrently(self):
+        """Chunks are sent in parallel, not one after another."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def post(url, params, json, timeout):
+            barrier.wait()
+            return make_response({'trackings': []})
+
+        self.service.session.post.side_effect = post
+
+        response = self.service.add_tracking(['A1', 'A2', 'A3', 'A4', 'A5', 'A6'])
+
+        self.assertEqual(response['failed'], {})
+
+    def test_partial_failure_is_reported(self):
+        """A failed chunk reports its ASINs without dropping the others."""
+        def post(url, params, json, timeout):
+            if json[0]['asin'] == 'A3':
+                raise requests.ConnectionError('connection reset')
+            return make_response({'trackings': [{'asin': item['asin']} for item in json]})
+
+        self.service.session.post.side_effect = post
+
+        response = self.service.add_tracking(['A1', 'A2', 'A3', 'A4'])
+
+        self.assertEqual([t['asin'] for t in response['trackings']], ['A1', 'A2'])
+        self.assertEqual(response['failed'], {'A3': 'connection reset', 'A4': 'connection reset'})
+        self.assertTrue(response['error'].startswith('2 of 4 ASINs'))
+
+    def test_remove_tracking(self):
+        """Each ASIN is removed with its own request."""
+        def get(url, params, timeout):
+            if params['asin'] == 'A2':
+                return make_response({'error': {'message': 'NOT_FOUND'}})
+            return make_response({})
+
+        self.service.session.get.side_effect = get
+
+        response = self.service.remove_tracking(['A1', 'A2', 'A3'])
+
+        self.assertEqual(sorted(response['removed']), ['A1', 'A3'])
+        self.assertEqual(response['failed'], {'A2': 'NOT_FOUND'})
+
+    def test_list_trackings_error_is_not_an_empty_list(self):
+        """An error or a body without trackings raises instead of listing nothing."""
+        self.service.session.get.return_value = make_response({'error': {'message': 'TIMEOUT'}})
+        with self.assertRaisesMessage(KeepaTrackingListError, 'TIMEOUT'):
+            self.service.list_trackings()
+
+        self.service.session.get.return_value = make_response({'tokensLeft': 10})
+        with self.assertRaises(KeepaTrackingListError):
+            self.service.list_trackings()
+
+    def test_find_tracked(self):
+        """Only the ASINs Keepa returns a tracking for are reported."""
+        def get(url, params, timeout):
+            if params['asin'] == 'A2':
+                return make_response({'trackings': [{'asin': 'A2'}]})
+            return make_response({'trackings': []})
+
+        self.service.session.get.side_effect = get
+
+        self.assertEqual(self.service.find_tracked(['A1', 'A2', 'A3']), ['A2'])
@@ -0,0 +1,103 @@
+"""Tests for the Keepa tracking reconciliation."""
+
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from apps.store_products.models import StoreProduct
+from apps.store_products.services.keepa_tracking_service import KeepaTrackingListError
+from apps.store_products.services.tracking_reconciliation import TrackingReconciliation
+
+
+class TrackingReconciliationTest(TestCase):
+    """Test TrackingReconciliation."""
+
+    def setUp(self):
+        """Set up store products and a mocked tracking service."""
+        StoreProduct.objects.create(asin='A1', keepa_tracking_id='old-1')
+        StoreProduct.objects.create(asin='A2', keepa_tracking_id='t-2')
+        StoreProduct.objects.create(asin='A3', keepa_marketplace='MX')
+        StoreProduct.objects.create(asin='A4', tracking_enabled=False, keepa_tracking_id='t-4')
+        self.service = mock.Mock()
+        self.service.list_trackings.return_value = [
+            {'asin': 'A1', 'trackingId': 't-1'},
+            {'asin': 'A2', 'trackingId': 't-2'},
+            {'asin': 'A4', 'trackingId': 't-4'},
+            {'asin': 'GONE', 'metaData': 'StoreProduct_GONE_regular'},
+            {'asin': 'FOREIGN', 'metaData': 'Other'},
+        ]
+        self.service.add_tracking.return_value = {
+            'trackings': [{'asin': 'A3', 'trackingId': 't-3'}],
+            'failed': {},
+        }
+        self.service.remove_tracking.return_value = {'removed': ['A4', 'GONE'], 'failed': {}}
+        self.reconciliation = TrackingReconciliation(service=self.service)
+
+    def test_diff(self):
+        """Missing, orphaned and outdated trackings are detected."""
+        drift = self.reconciliation.diff(self.service.list_trackings())
+
+        self.assertEqual(drift['to_add'], {('regular', 'MX'): ['A3']})
+        self.assertEqual(sorted(drift['to_remove']), ['A4', 'GONE'])
+        self.assertEqual(drift['id_updates'], {'A1': 't-1', 'A4': ''})
+
+    def test_run_applies_drift_in_bulk(self):
+        """Adds and removes are single bulk calls and ids are updated."""
+        report = self.reconciliation.run()
+
+        self.service.add_tracking.assert_called_once_with(
+            ['A3'], tracking_type='regular', marketplace='MX', update_interval_hours=1
+        )
+        self.service.remove_tracking.assert_called_once()
+        self.assertEqual((report['added'], report['removed'], report['ids_updated']), (1, 2, 3))
+        self.assertEqual(
+            dict(StoreProduct.objects.values_list('asin', 'keepa_tracking_id')),
+            {'A1': 't-1', 'A2': 't-2', 'A3': 't-3', 'A4': ''},
+        )
+
+    def test_truncated_list_aborts_before_diffing(self):
+        """Tracked ASINs missing from the list abort the run without changes."""
+        self.service.list_trackings.return_value = [{'asin': 'A1', 'trackingId': 't-1'}]
+        self.service.find_tracked.return_value = ['A2']
+
+        with self.assertRaises(KeepaTrackingListError):
+            self.reconciliation.run()
+
+        self.service.find_tracked.assert_called_once_with(['A2'])
+        self.service.add_tracking.assert_not_called()
+        self.service.remove_tracking.assert_not_called()
+        self.assertEqual(StoreProduct.objects.get(asin='A1').keepa_tracking_id, 'old-1')
+
+    def test_untracked_missing_asins_are_re_added(self):
+        """Missing ASINs Keepa confirms as untracked are still re-added."""
+        self.service.list_trackings.return_value = [{'asin': 'A1', 'trackingId': 't-1'}]
+        self.service.find_tracked.return_value = []
+
+        drift = self.reconciliation.run(apply=False)
+
+        self.assertEqual(drift['to_add'], {('regular', 'US'): ['A2'], ('regular', 'MX'): ['A3']})
+
+    def test_command_fails_on_incomplete_list(self):
+        """The command turns an incomplete list into a CommandError."""
+        self.service.list_trackings.side_effect = KeepaTrackingListError('truncated')
+        with mock.patch(
+            'apps.store_products.management.commands.reconcile_keepa_tracking.TrackingReconciliation',
+            return_value=self.reconciliation,
+        ):
+            with self.assertRaisesMessage(CommandError, 'truncated'):
+                call_command('reconcile_keepa_tracking', stdout=StringIO())
+
+    def test_dry_run_command(self):
+        """The command reports drift without changing anything."""
+        out = StringIO()
+        with mock.patch(
+            'apps.store_products.management.commands.reconcile_keepa_tracking.TrackingReconciliation',
+            return_value=self.reconciliation,
+        ):
+            call_command('reconcile_keepa_tracking', '--dry-run', stdout=out)
+
+        self.assertIn('Missing in Keepa: 1', out.getvalue())
+        self.service.add_tracking.assert_not_called()
+        self.assertEqual(StoreProduct.objects.get(asin='A1').keepa_tracking_id, 'old-1')
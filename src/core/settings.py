@@ -256,3 +256,60 @@ CITIES_LIGHT_INCLUDE_COUNTRIES = ['US', 'MX']
 # Keepa Configuration
 KEEPA_API_KEY = env('KEEPA_API_KEY', default='')
 KEEPA_DAILY_TOKEN_LIMIT = env.int('KEEPA_DAILY_TOKEN_LIMIT', default=5000)
+
+# Minutes a KeepaProductData row is served from the database before being refetched.
+# Set to 0 to always query Keepa for that marketplace.
+KEEPA_DATA_TTL_MINUTES = {
+    'US': env.int('KEEPA_DATA_TTL_MINUTES_US', default=60),
+    'MX': env.int('KEEPA_DATA_TTL_MINUTES_MX', default=60),
+}
+
+# Maximum number of Keepa requests sent concurrently (US/MX fetches and batch chunks).
+# The actual concurrency is lowered to the requests the token buckets can afford.
+KEEPA_MAX_CONCURRENCY = env.int('KEEPA_MAX_CONCURRENCY', default=8)
+
+# Maximum seconds to wait for Keepa's token bucket to refill before failing a request.
+# Only background job workers wait this long; web requests (analyze, refresh, sync)
+# wait at most KEEPA_INTERACTIVE_TOKEN_WAIT_SECONDS (well below gunicorn's --timeout)
+# and answer 429 with a Retry-After header instead.
+KEEPA_MAX_TOKEN_WAIT_SECONDS = env.int('KEEPA_MAX_TOKEN_WAIT_SECONDS', default=300)
+KEEPA_INTERACTIVE_TOKEN_WAIT_SECONDS = env.int('KEEPA_INTERACTIVE_TOKEN_WAIT_SECONDS', default=10)
+
+# Keepa API logging: entries are buffered in memory and written in batches by a
+# background thread. Errors are always logged; successful calls are sampled.
+KEEPA_API_LOG_ENABLED = env.bool('KEEPA_API_LOG_ENABLED', default=True)
+KEEPA_API_LOG_SAMPLE_RATE = env.float('KEEPA_API_LOG_SAMPLE_RATE', default=1.0)
+KEEPA_API_LOG_BATCH_SIZE = env.int('KEEPA_API_LOG_BATCH_SIZE', default=50)
+KEEPA_API_LOG_FLUSH_SECONDS = env.float('KEEPA_API_LOG_FLUSH_SECONDS', default=5.0)
+KEEPA_API_LOG_MAX_BODY_CHARS = env.int('KEEPA_API_LOG_MAX_BODY_CHARS', default=2000)
+
+# Single-flight Keepa fetches: workers fetching the same ASIN/marketplace at the same
+# time wait for the first one instead of spending tokens on an identical query.
+# A lease older than KEEPA_FETCH_LEASE_SECONDS is considered abandoned, so it must
+# outlast a full token wait plus the request and its retries (default: wait + 5 min).
+KEEPA_FETCH_LEASE_SECONDS = env.int(
+    'KEEPA_FETCH_LEASE_SECONDS', default=KEEPA_MAX_TOKEN_WAIT_SECONDS + 300
+)
+KEEPA_FETCH_WAIT_SECONDS = env.int('KEEPA_FETCH_WAIT_SECONDS', default=30)
+
+# Keepa failure handling: transient errors (connection errors, timeouts, 5xx) are
+# retried with jittered exponential backoff, and after KEEPA_CIRCUIT_FAILURE_THRESHOLD
+# consecutive failures Keepa calls fail fast for KEEPA_CIRCUIT_RESET_SECONDS.
+KEEPA_RETRY_MAX_ATTEMPTS = env.int('KEEPA_RETRY_MAX_ATTEMPTS', default=3)
+KEEPA_RETRY_BASE_DELAY_SECONDS = env.float('KEEPA_RETRY_BASE_DELAY_SECONDS', default=1.0)
+KEEPA_RETRY_MAX_DELAY_SECONDS = env.float('KEEPA_RETRY_MAX_DELAY_SECONDS', default=30.0)
+KEEPA_CIRCUIT_FAILURE_THRESHOLD = env.int('KEEPA_CIRCUIT_FAILURE_THRESHOLD', default=5)
+KEEPA_CIRCUIT_RESET_SECONDS = env.float('KEEPA_CIRCUIT_RESET_SECONDS', default=60.0)
+
+# Keepa tracking: ASINs are added in chunks of KEEPA_TRACKING_CHUNK_SIZE, sent
+# concurrently (up to KEEPA_TRACKING_MAX_CONCURRENCY) over a pooled keep-alive session.
+KEEPA_TRACKING_CHUNK_SIZE = env.int('KEEPA_TRACKING_CHUNK_SIZE', default=100)
+KEEPA_TRACKING_MAX_CONCURRENCY = env.int('KEEPA_TRACKING_MAX_CONCURRENCY', default=4)
+
+# Pricing batch queue (manage.py run_pricing_worker): idle workers poll every
+# PRICING_JOB_POLL_SECONDS; a running job whose worker sent no heartbeat for
+# PRICING_JOB_STALE_SECONDS (longer than KEEPA_MAX_TOKEN_WAIT_SECONDS) is assumed
+# abandoned and resumed by another worker, up to PRICING_JOB_MAX_ATTEMPTS times.
+PRICING_JOB_POLL_SECONDS = env.float('PRICING_JOB_POLL_SECONDS', default=5.0)
+PRICING_JOB_STALE_SECONDS = env.int('PRICING_JOB_STALE_SECONDS', default=900)
+PRICING_JOB_MAX_ATTEMPTS = env.int('PRICING_JOB_MAX_ATTEMPTS', default=3)